@@ -0,0 +1,315 @@
+"""
+Memory footprint benchmark and regression guard.
+
+Loads levels from the bundled ones up to a generated map of a million
+tiles, each in a fresh interpreter, and measures with tracemalloc and the
+resident set size (RSS):
+    - the peak and the retained memory of `load_level`,
+    - the model after some turns were played (steady state),
+    - the Tk views (DungeonMap and DungeonInfo drawn for the model), when
+      a display is available and the map is small enough to draw,
+and breaks the model down by type: tiles, weapons, slugs, the player,
+tuples, dicts, lists, arrays and the rest, with the bytes per object.
+
+Fails if a traced figure grew past the stored baseline by more than the
+tolerance. RSS is reported, but it depends on the allocator too much to be
+guarded.
+
+Usage:
+    python bench_memory.py [--cases NAME ...] [--tolerance T]
+                           [--update-baseline]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import types
+from array import array
+from typing import Optional
+
+from core import (Tile, Weapon, Slug, Entity, WEAPON_TYPES, SLUG_TYPES,
+                  ATTACK_KEY, load_level)
+from constants import (FLOOR_TILE, WALL_TILE, GOAL_TILE, PLAYER_SYMBOL,
+                       DUNGEON_MAP_SIZE, SLUG_INFO_SIZE)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "memory_baseline.json")
+TOLERANCE = 0.10  # allowed growth over the baseline
+TURNS = 50  # turns played before the steady-state measurement
+VIEW_TILE_LIMIT = 256 * 256  # larger maps are not drawn in the Tk views
+
+# Level files, or (rows, cols) of generated maps
+CASES = {
+    "level1": os.path.join(HERE, "levels", "level1.txt"),
+    "level2": os.path.join(HERE, "levels", "level2.txt"),
+    "small": (16, 16),
+    "medium": (64, 64),
+    "large": (256, 256),
+    "huge": (1024, 1024),
+}
+# Traced figures compared against the baseline
+GUARDED = ("load_peak", "loaded", "played", "views")
+
+# The model breakdown, first matching class wins
+CATEGORIES = (("Tile", Tile), ("Weapon", Weapon), ("Slug", Slug),
+              ("Player", Entity), ("tuple", tuple), ("dict", dict),
+              ("list", list), ("array", array))
+# Shared objects that are not part of any model
+_SKIPPED = (type, types.ModuleType, types.FunctionType, types.MethodType,
+            types.BuiltinFunctionType, type(None), bool)
+
+
+def generate_level(rows: int, cols: int, seed: int = 0) -> list[str]:
+    """
+    The lines of a level file with a wall border, 10% walls, 1% slugs, 0.5%
+    weapons, one goal and the player, placed at random.
+    """
+    rng = random.Random(seed)
+    cells = [[WALL_TILE if row in (0, rows - 1) or col in (0, cols - 1)
+              or rng.random() < 0.1 else FLOOR_TILE for col in range(cols)]
+             for row in range(rows)]
+    free = [(row, col) for row in range(rows) for col in range(cols)
+            if cells[row][col] == FLOOR_TILE]
+    rng.shuffle(free)
+    symbols = [PLAYER_SYMBOL, GOAL_TILE]
+    symbols += rng.choices(list(SLUG_TYPES), k=len(free) // 100)
+    symbols += rng.choices(list(WEAPON_TYPES), k=len(free) // 200)
+    for symbol, (row, col) in zip(symbols, free):
+        cells[row][col] = symbol
+    return ["1000\n"] + ["".join(row) + "\n" for row in cells]
+
+
+def breakdown(root) -> dict[str, dict]:
+    """
+    The objects reachable from `root`, by category: their "count", "bytes"
+    and "per_object" bytes. An instance's __dict__ counts towards the
+    instance; classes, modules and functions are not counted.
+    """
+    totals: dict[str, list[int]] = {}
+    seen: set[int] = set()
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED):
+            continue
+        seen.add(id(obj))
+        category = next((name for name, kind in CATEGORIES
+                         if isinstance(obj, kind)), "other")
+        size = sys.getsizeof(obj)
+        attributes = getattr(obj, "__dict__", None)
+        if isinstance(attributes, dict) and id(attributes) not in seen:
+            seen.add(id(attributes))
+            size += sys.getsizeof(attributes)
+            stack.extend(attributes.values())
+        entry = totals.setdefault(category, [0, 0])
+        entry[0] += 1
+        entry[1] += size
+        stack.extend(gc.get_referents(obj))
+    return {name: {"count": count, "bytes": size,
+                   "per_object": round(size / count, 1)}
+            for name, (count, size) in sorted(totals.items(),
+                                              key=lambda item: -item[1][1])}
+
+
+def rss_bytes() -> Optional[int]:
+    """The resident set size of this process, if it can be read"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def probe(level: str, turns: int, views: bool) -> dict:
+    """
+    Measure one level in this interpreter, which should be a fresh one.
+
+    Return value:
+        dict: "load_peak" (peak traced bytes during load_level), "loaded"
+        and "played" (traced bytes kept by the model after loading and
+        after `turns` turns), "views" (traced bytes of the Tk views, or
+        None if they were not drawn), the RSS growth of each step, the
+        "tiles" and "slugs" counts and the model "breakdown".
+    """
+    tracemalloc.start()
+    gc.collect()
+    base, _ = tracemalloc.get_traced_memory()
+    base_rss = rss_bytes()
+    tracemalloc.reset_peak()
+
+    model = load_level(level)
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    loaded, _ = tracemalloc.get_traced_memory()
+    loaded_rss = rss_bytes()
+    for _ in range(turns):
+        if model.has_won() or model.has_lost():
+            break
+        model.handle_action(ATTACK_KEY)
+    gc.collect()
+    played, _ = tracemalloc.get_traced_memory()
+    played_rss = rss_bytes()
+    tracemalloc.stop()  # the breakdown walk allocates a lot
+
+    rows, cols = model.get_dimensions()
+    result = {
+        "tiles": rows * cols,
+        "slugs": len(model.get_slugs()),
+        "load_peak": peak - base,
+        "loaded": loaded - base,
+        "played": played - base,
+        "views": None,
+        "rss": {"loaded": _delta(loaded_rss, base_rss),
+                "played": _delta(played_rss, loaded_rss), "views": None},
+        "breakdown": breakdown(model),
+    }
+    if views and rows * cols <= VIEW_TILE_LIMIT:
+        _probe_views(model, result)
+    return result
+
+
+def _probe_views(model, result: dict) -> None:
+    """Draw the model in the Tk views, if there is a display"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return  # no display
+    root.withdraw()
+    from a2 import DungeonMap, DungeonInfo
+    tracemalloc.start()
+    gc.collect()
+    base, _ = tracemalloc.get_traced_memory()
+    base_rss = rss_bytes()
+
+    dungeon_map = DungeonMap(root, model.get_dimensions(), DUNGEON_MAP_SIZE)
+    dungeon_map.redraw(model.get_tiles(), model.get_player_position(),
+                       model.get_slugs(), model.get_field_of_view())
+    slug_info = DungeonInfo(root, (7, 5), SLUG_INFO_SIZE)
+    slug_info.redraw({
+        position: {"name": slug.get_name(),
+                   "weapon": str(slug.get_weapon()) if slug.get_weapon()
+                   else "None",
+                   "health": slug.get_health(), "poison": slug.get_poison()}
+        for position, slug in model.get_slugs().items()})
+    root.update_idletasks()
+
+    gc.collect()
+    drawn, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["views"] = drawn - base
+    result["rss"]["views"] = _delta(rss_bytes(), base_rss)
+    result["canvas_items"] = len(dungeon_map.find_all())
+    root.destroy()
+
+
+def _delta(after: Optional[int], before: Optional[int]) -> Optional[int]:
+    return None if after is None or before is None else after - before
+
+
+def measure(name: str, level: str, turns: int = TURNS,
+            views: bool = True) -> dict:
+    """Run `probe` for one level in a fresh interpreter"""
+    code = (f"import json, bench_memory; print(json.dumps("
+            f"bench_memory.probe({level!r}, {turns}, {views})))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                            capture_output=True, text=True,
+                            check=True).stdout
+    result = json.loads(output)
+    result["case"] = name
+    return result
+
+
+def compare(results: list[dict], baseline: dict,
+            tolerance: float) -> list[str]:
+    """The guarded figures that grew past the baseline"""
+    failures = []
+    for result in results:
+        expected = baseline.get("cases", {}).get(result["case"], {})
+        for key in GUARDED:
+            if result.get(key) is None or expected.get(key) is None:
+                continue
+            limit = expected[key] * (1 + tolerance)
+            if result[key] > limit:
+                failures.append(
+                    f"{result['case']} {key}: {result[key]} bytes, baseline "
+                    f"{expected[key]} (+{tolerance:.0%} = {limit:.0f})")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES),
+                        default=list(CASES))
+    parser.add_argument("--turns", type=int, default=TURNS)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--no-views", action="store_true",
+                        help="do not measure the Tk views")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    parser.add_argument("--json", action="store_true",
+                        help="print the full results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.cases:
+            level = CASES[name]
+            if isinstance(level, tuple):
+                lines = generate_level(*level)
+                level = os.path.join(directory, f"{name}.txt")
+                with open(level, "w") as file:
+                    file.writelines(lines)
+            results.append(measure(name, level, args.turns,
+                                   not args.no_views))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'case':8} {'tiles':>8} {'slugs':>6} {'peak KiB':>10} "
+              f"{'loaded KiB':>11} {'played KiB':>11} {'views KiB':>10} "
+              f"{'B/tile':>7} {'B/slug':>7}")
+        for result in results:
+            parts = result["breakdown"]
+            views = "-" if result["views"] is None \
+                else f"{result['views'] / 1024:.0f}"
+            print(f"{result['case']:8} {result['tiles']:8} "
+                  f"{result['slugs']:6} {result['load_peak'] / 1024:10.0f} "
+                  f"{result['loaded'] / 1024:11.0f} "
+                  f"{result['played'] / 1024:11.0f} {views:>10} "
+                  f"{parts.get('Tile', {}).get('per_object', 0):7.0f} "
+                  f"{parts.get('Slug', {}).get('per_object', 0):7.0f}")
+
+    if args.update_baseline:
+        baseline = {"python": sys.version.split()[0],
+                    "turns": args.turns,
+                    "cases": {result["case"]: {key: result[key]
+                                               for key in GUARDED}
+                              for result in results}}
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=2)
+            file.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --update-baseline")
+        return 1
+    failures = compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Startup-time check for headless processes.
+
+Measures, in fresh interpreters, how long `import core` plus
+`load_level(...)` takes, and fails if the median exceeds the target or if
+tkinter got imported along the way.
+
+Usage:
+    python bench_startup.py [level file] [--runs N] [--target-ms MS]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Target for `import core` + `load_level` in a headless worker
+STARTUP_TARGET_MS = 25.0
+DEFAULT_LEVEL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "levels", "level2.txt")
+
+# Runs in the child interpreter; timing starts before the first game import
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import core
+imported = time.perf_counter()
+core.load_level(sys.argv[1])
+loaded = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "total_ms": (loaded - start) * 1000,
+    "tkinter": "tkinter" in sys.modules,
+}))
+"""
+
+
+def measure(level: str, runs: int) -> list[dict]:
+    """
+    Time `import core` + `load_level(level)` in `runs` fresh interpreters.
+
+    parameter:
+        level (str): The level file to load.
+        runs (int): Number of processes to start.
+
+    Return value:
+        list[dict]: One result per run with "import_ms", "total_ms" and
+        whether "tkinter" was imported.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE, level], cwd=here,
+            capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("level", nargs="?", default=DEFAULT_LEVEL)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--target-ms", type=float, default=STARTUP_TARGET_MS)
+    args = parser.parse_args()
+
+    results = measure(args.level, args.runs)
+    import_ms = statistics.median(result["import_ms"] for result in results)
+    total_ms = statistics.median(result["total_ms"] for result in results)
+    print(f"import core:              {import_ms:7.2f} ms (median)")
+    print(f"import core + load_level: {total_ms:7.2f} ms (median), "
+          f"target {args.target_ms:.2f} ms")
+
+    failed = False
+    if any(result["tkinter"] for result in results):
+        print("FAIL: tkinter was imported by the headless core")
+        failed = True
+    if total_ms > args.target_ms:
+        print("FAIL: headless startup is over target")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Chunked, lazily materialized dungeon storage.
+
+`ChunkedTiles` stores the map as square chunks of Tile objects in a sparse
+dict. A chunk is only built (loaded from a level file, or generated) the
+first time one of its tiles is accessed. Chunks that have not been accessed
+for a while are written back and evicted, and so are the least recently
+used ones once too many are loaded.
+
+It stands in for the `list[list[Tile]]` a SlugDungeonModel is built from:
+`tiles[row][col]`, `len(tiles)` and `len(tiles[0])` all work, so
+`get_tile`, `get_dimensions`, `is_valid_position` and the slug neighbour
+checks work unchanged on maps far too large to hold in memory.
+"""
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+from constants import FLOOR_TILE, PLAYER_SYMBOL, WALL_TILE
+from core import (SlugDungeonModel, Tile, Player, create_tile, SLUG_TYPES,
+                  WEAPON_TYPES)
+
+
+CHUNK_SIZE = 64
+MAX_LOADED_CHUNKS = 256
+MAX_IDLE_SECONDS = 30.0  # chunks not accessed for this long are evicted
+
+# load_chunk(chunk_row, chunk_col) -> rows of tiles for that chunk
+ChunkLoader = Callable[[int, int], list[list[Tile]]]
+# save_chunk(chunk_row, chunk_col, tiles) is called before a chunk is evicted
+ChunkSaver = Callable[[int, int, list[list[Tile]]], None]
+
+
+class ChunkedTiles:
+    """
+    A (possibly huge) map of tiles, materialized chunk by chunk.
+
+    Every chunk is stamped with the time it was last accessed (with
+    `time.monotonic`). Whenever a lookup moves to another chunk, the chunks
+    idle for more than `max_idle` seconds are evicted.
+
+    Attribute:
+        chunk_size (int): Width and height of a chunk, in cells.
+        max_loaded (int): How many chunks may be loaded at once.
+        max_idle (Optional[float]): Seconds after its last access that a
+        chunk is evicted, None to keep chunks until `max_loaded` is reached.
+
+    Methods:
+        get_tile(position) -> Tile: The tile at (row, col).
+        get_dimensions() -> tuple[int, int]: (#rows, #columns) of the map.
+        loaded_chunks() -> int: Number of chunks currently in memory.
+        evict(count) -> None: Write back and drop least recently used chunks.
+        evict_idle(now) -> None: Write back and drop the idle chunks.
+        flush() -> None: Write back every loaded chunk.
+    """
+    def __init__(self, dimensions: tuple[int, int], load_chunk: ChunkLoader,
+                 save_chunk: Optional[ChunkSaver] = None,
+                 chunk_size: int = CHUNK_SIZE,
+                 max_loaded: int = MAX_LOADED_CHUNKS,
+                 max_idle: Optional[float] = MAX_IDLE_SECONDS) -> None:
+        """
+        parameter:
+            dimensions (tuple[int, int]): (#rows, #columns) of the map.
+            load_chunk (ChunkLoader): Builds the tiles of a chunk the first
+            time it is needed, or again after it was evicted.
+            save_chunk (Optional[ChunkSaver]): Persists a chunk before it is
+            evicted, so changes such as dropped weapons survive. Without it,
+            evicted chunks are rebuilt from `load_chunk` as they were.
+            chunk_size (int): Width and height of a chunk, in cells.
+            max_loaded (int): How many chunks may be loaded at once.
+            max_idle (Optional[float]): Seconds after its last access that a
+            chunk is evicted, None for no limit.
+        """
+        self._dimensions = dimensions
+        self._load_chunk = load_chunk
+        self._save_chunk = save_chunk
+        self.chunk_size = chunk_size
+        self.max_loaded = max_loaded
+        self.max_idle = max_idle
+        # Loaded chunks from least to most recently accessed
+        self._chunks: OrderedDict[tuple[int, int], list[list[Tile]]] = \
+            OrderedDict()
+        self._accessed: dict[tuple[int, int], float] = {}  # last accesses
+        self._last_key: Optional[tuple[int, int]] = None
+        self._last_chunk: Optional[list[list[Tile]]] = None
+
+    def get_dimensions(self) -> tuple[int, int]:
+        return self._dimensions
+
+    def get_tile(self, position: tuple[int, int]) -> Tile:
+        """
+        Returns the tile at `position`, loading its chunk if needed.
+
+        Raises:
+            IndexError: If `position` is outside the map.
+        """
+        row, col = position
+        rows, cols = self._dimensions
+        if not (0 <= row < rows and 0 <= col < cols):
+            raise IndexError(f"{position} is outside the map")
+        size = self.chunk_size
+        key = (row // size, col // size)
+        if key == self._last_key:
+            # Consecutive lookups mostly hit the same chunk; skip the LRU
+            # bookkeeping for them. The chunk is stamped when lookups move
+            # on to another one.
+            return self._last_chunk[row % size][col % size]
+        now = time.monotonic()
+        chunks, accessed = self._chunks, self._accessed
+        if self._last_key is not None:
+            # Still the most recently accessed chunk, so _chunks stays in
+            # order of access
+            accessed[self._last_key] = now
+        if self.max_idle is not None and chunks \
+                and accessed[next(iter(chunks))] < now - self.max_idle:
+            self.evict_idle(now)
+        chunk = chunks.get(key)
+        if chunk is None:
+            chunk = self._load(key)
+        else:
+            chunks.move_to_end(key)
+        accessed[key] = now
+        self._last_key, self._last_chunk = key, chunk
+        return chunk[row % size][col % size]
+
+    def loaded_chunks(self) -> int:
+        return len(self._chunks)
+
+    def evict(self, count: int) -> None:
+        """Write back and drop the `count` least recently used chunks"""
+        for _ in range(min(count, len(self._chunks))):
+            self._evict_first()
+        self._last_key = self._last_chunk = None
+
+    def evict_idle(self, now: Optional[float] = None) -> None:
+        """Write back and drop the chunks last accessed more than
+        `max_idle` seconds before `now` (by default, the current time)"""
+        if self.max_idle is None or not self._chunks:
+            return
+        if now is None:
+            now = time.monotonic()
+            if self._last_key is not None:
+                self._accessed[self._last_key] = now
+        deadline = now - self.max_idle
+        chunks, accessed = self._chunks, self._accessed
+        while chunks and accessed[next(iter(chunks))] < deadline:
+            self._evict_first()
+        if self._last_key not in chunks:
+            self._last_key = self._last_chunk = None
+
+    def flush(self) -> None:
+        """Write back every loaded chunk, keeping them loaded"""
+        if self._save_chunk is not None:
+            for (chunk_row, chunk_col), chunk in self._chunks.items():
+                self._save_chunk(chunk_row, chunk_col, chunk)
+
+    def _evict_first(self) -> None:
+        """Write back and drop the least recently used chunk"""
+        key, chunk = self._chunks.popitem(last=False)
+        del self._accessed[key]
+        if self._save_chunk is not None:
+            self._save_chunk(key[0], key[1], chunk)
+
+    def _load(self, key: tuple[int, int]) -> list[list[Tile]]:
+        """Build the chunk at `key`, evicting the least recently used chunk
+        first if the cache is full"""
+        if len(self._chunks) >= self.max_loaded:
+            self.evict(1)
+        chunk = self._load_chunk(*key)
+        self._chunks[key] = chunk
+        return chunk
+
+    # list[list[Tile]] facade used by SlugDungeonModel
+
+    def __len__(self) -> int:
+        return self._dimensions[0]
+
+    def __getitem__(self, row: int) -> "_ChunkedRow":
+        if not 0 <= row < self._dimensions[0]:
+            raise IndexError(f"row {row} is outside the map")
+        return _ChunkedRow(self, row)
+
+    def __iter__(self) -> Iterator["_ChunkedRow"]:
+        # Walking every row materializes the whole map; only sensible for
+        # maps that fit in memory
+        for row in range(self._dimensions[0]):
+            yield _ChunkedRow(self, row)
+
+
+class _ChunkedRow:
+    """One row of a ChunkedTiles, indexable like list[Tile]"""
+    __slots__ = ("_tiles", "_row")
+
+    def __init__(self, tiles: ChunkedTiles, row: int) -> None:
+        self._tiles = tiles
+        self._row = row
+
+    def __len__(self) -> int:
+        return self._tiles.get_dimensions()[1]
+
+    def __getitem__(self, col: int) -> Tile:
+        return self._tiles.get_tile((self._row, col))
+
+    def __iter__(self) -> Iterator[Tile]:
+        for col in range(len(self)):
+            yield self._tiles.get_tile((self._row, col))
+
+
+class LevelChunkSource:
+    """
+    Backing store that reads chunks straight from a level file.
+
+    Only the byte offsets of the map lines are kept in memory, plus the
+    weapons of chunks written back, so dropped and picked up weapons are
+    kept. Columns are characters, not bytes, so symbols outside ASCII do not
+    shift the columns after them.
+
+    Attribute:
+        health (int): The player's max health, from the first line.
+        player_position (Optional[tuple[int, int]]): Where "P" is.
+        slugs (dict[tuple[int, int], str]): The symbol of each slug.
+        rows (int), cols (int): Size of the map. Short lines are padded with
+        walls up to the longest one.
+
+    Methods:
+        load_chunk(chunk_row, chunk_col) -> list[list[Tile]]
+        save_chunk(chunk_row, chunk_col, tiles) -> None
+    """
+    def __init__(self, filename: str, chunk_size: int = CHUNK_SIZE) -> None:
+        """
+        Scan the level file line by line, noting where each map line is and
+        where the player and the slugs are.
+
+        parameter:
+            filename (str): The path to the file containing the level data.
+            chunk_size (int): Width and height of a chunk, in cells.
+        """
+        self._filename = filename
+        self.chunk_size = chunk_size
+        self.player_position: Optional[tuple[int, int]] = None
+        self.slugs: dict[tuple[int, int], str] = {}
+        # The byte range of each map line, without its line ending, and its
+        # length in characters; the two lengths match for ASCII lines
+        self._starts = array("q")
+        self._ends = array("q")
+        self._lengths = array("q")
+        # Weapon symbols of the cells of written back chunks, by chunk
+        self._weapons: dict[tuple[int, int], dict[tuple[int, int], str]] = {}
+
+        entities = (PLAYER_SYMBOL, *SLUG_TYPES)
+        with open(filename, "rb") as file:
+            first = file.readline()
+            self.health = int(first.strip())
+            offset = len(first)
+            for row, line in enumerate(file):
+                data = line.rstrip(b"\r\n")
+                text = data.decode()
+                self._starts.append(offset)
+                self._ends.append(offset + len(data))
+                self._lengths.append(len(text))
+                offset += len(line)
+                for symbol in entities:
+                    col = text.find(symbol)
+                    while col >= 0:
+                        if symbol == PLAYER_SYMBOL:
+                            self.player_position = (row, col)
+                        else:
+                            self.slugs[(row, col)] = symbol
+                        col = text.find(symbol, col + 1)
+        # Slugs in the order load_level lists them, which shows in the game
+        self.slugs = dict(sorted(self.slugs.items()))
+        self.rows = len(self._starts)
+        self.cols = max(self._lengths, default=0)
+
+    def load_chunk(self, chunk_row: int, chunk_col: int) -> list[list[Tile]]:
+        size = self.chunk_size
+        first_col = chunk_col * size
+        last_col = min(first_col + size, self.cols)
+        weapons = self._weapons.get((chunk_row, chunk_col))
+        chunk = []
+        with open(self._filename, "rb") as file:
+            for row in range(chunk_row * size,
+                             min((chunk_row + 1) * size, self.rows)):
+                start, end = self._starts[row], self._ends[row]
+                if end - start == self._lengths[row]:
+                    # ASCII: a byte per character, so read only the chunk
+                    file.seek(start + first_col)
+                    text = file.read(max(0, min(end - start, last_col)
+                                         - first_col)).decode()
+                else:
+                    file.seek(start)
+                    text = file.read(end - start).decode()[first_col:last_col]
+                text = text.ljust(last_col - first_col, WALL_TILE)
+                tile_row = []
+                for col, symbol in enumerate(text, first_col):
+                    if weapons is None:
+                        # Entities stand on floor, and so do unknown symbols
+                        tile_row.append(create_tile(symbol))
+                        continue
+                    # Written back: the saved weapons replace the file's
+                    tile = create_tile(FLOOR_TILE if symbol in WEAPON_TYPES
+                                       else symbol)
+                    weapon = weapons.get((row, col))
+                    if weapon is not None:
+                        tile.set_weapon(WEAPON_TYPES[weapon]())
+                    tile_row.append(tile)
+                chunk.append(tile_row)
+        return chunk
+
+    def save_chunk(self, chunk_row: int, chunk_col: int,
+                   tiles: list[list[Tile]]) -> None:
+        size = self.chunk_size
+        weapons = {}
+        for row, tile_row in enumerate(tiles, chunk_row * size):
+            for col, tile in enumerate(tile_row, chunk_col * size):
+                weapon = tile.get_weapon()
+                if weapon is not None:
+                    weapons[(row, col)] = weapon.get_symbol()
+        self._weapons[(chunk_row, chunk_col)] = weapons
+
+
+def load_chunked_level(filename: str, chunk_size: int = CHUNK_SIZE,
+                       max_loaded: int = MAX_LOADED_CHUNKS,
+                       max_idle: Optional[float] = MAX_IDLE_SECONDS
+                       ) -> SlugDungeonModel:
+    """
+    Load a level like `load_level`, but keep its tiles in a ChunkedTiles
+    read from the file by a LevelChunkSource, so only recently used chunks
+    exist as Tile objects and the map is never in memory as a whole.
+
+    parameter:
+        filename (str): The path to the file containing the level data.
+        chunk_size (int): Width and height of a chunk, in cells.
+        max_loaded (int): How many chunks may be loaded at once.
+        max_idle (Optional[float]): Seconds after its last access that a
+        chunk is evicted, None for no limit.
+
+    Return value:
+        SlugDungeonModel: The loaded level.
+    """
+    source = LevelChunkSource(filename, chunk_size)
+    slugs = {position: SLUG_TYPES[symbol]()
+             for position, symbol in source.slugs.items()}
+    tiles = ChunkedTiles((source.rows, source.cols), source.load_chunk,
+                         source.save_chunk, chunk_size, max_loaded, max_idle)
+    return SlugDungeonModel(tiles, slugs, Player(source.health),
+                            source.player_position)
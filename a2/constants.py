@@ -0,0 +1,53 @@
+"""Game constants shared by the headless core and the Tk frontend.
+
+This module must not import tkinter (see core.py).
+"""
+
+
+Position = tuple[int, int]
+
+WEAPON_SYMBOL = "W"
+POISON_DART_SYMBOL = "D"
+POISON_SWORD_SYMBOL = "S"
+HEALING_ROCK_SYMBOL = "H"
+WALL_TILE = "#"
+FLOOR_TILE = " "
+GOAL_TILE = "G"
+ENTITY_SYMBOL = "E"
+PLAYER_SYMBOL = "P"
+SLUG_SYMBOL = "M"
+NICE_SLUG_SYMBOL = "N"  # :)
+ANGRY_SLUG_SYMBOL = "A"  # >:(
+SCARED_SLUG_SYMBOL = "L"  # :O
+
+# Slug speeds (Slug.move_every): a slug moves on turns where its turn count
+# is a multiple of its speed
+SLUG_SPEED_FAST = 1
+SLUG_SPEED_NORMAL = 2
+SLUG_SPEED_SLOW = 4
+
+DUNGEON_MAP_SIZE = (500, 500)
+SLUG_INFO_SIZE = (400, 500)
+MAX_SLUGS = 6
+PLAYER_INFO_SIZE = (900, 100)
+PLAYER_COLOUR = "#81b7e3"
+SLUG_COLOUR = "green"
+GOAL_COLOUR = "#f0d005"
+WALL_COLOUR = "#2e2208"
+FLOOR_COLOUR = "#f5efc9"
+FOG_COLOUR = "black"  # cells never seen in fog-of-war mode
+FOG_STIPPLE = "gray50"  # dims cells remembered but not in view
+
+# Key toggling fog of war, and how far the player sees when it is on
+FOG_KEY = "f"
+FOG_RADIUS = 4
+
+POSITION_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+TITLE_FONT = ("Arial", 20, "bold")
+REGULAR_FONT = ("Arial", 14)
+
+WIN_TITLE = "You won!"
+WIN_MESSAGE = "Congratulations, you won! Play again?"
+LOSE_TITLE = "You lost!"
+LOSE_MESSAGE = "You lost! Better luck next time. Play again?"
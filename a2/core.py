@@ -0,0 +1,2092 @@
+"""
+Pure-Python core of Slug Dungeon: weapons, tiles, entities, the game model
+and level loading.
+
+This module has no GUI imports, so headless workers (bots, environments,
+servers) can import it without paying for, or even having, tkinter. The Tk
+frontend in a2.py builds on top of it.
+"""
+import copy
+from array import array
+from collections import deque
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Union
+
+from constants import *
+from events import (Moved, Died, WeaponDropped, WeaponPickedUp, Won, Lost,
+                    Subscriber, health_events)
+from policies import (STAY, PolicyMismatchError, compile_policy,
+                      policy_index)
+
+if TYPE_CHECKING:
+    # concurrent.futures pulls in logging and fov pulls in fractions; only
+    # annotations need them here
+    from concurrent.futures import Executor
+    from fov import FieldOfView
+
+
+"""
+4.1.1 Weapon()
+"""
+
+
+class Weapon:
+    def __init__(self):
+        self._name = "AbstractWeapon"
+        self._symbol = "W"
+        self._effect = {}
+        self._range = 0
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_symbol(self) -> str:
+        return self._symbol  # Ensure this returns the correct symbol
+
+    def get_effect(self) -> dict[str, int]:
+        return self._effect
+
+    def get_targets(self, position: tuple[int, int]) -> list[tuple[int, int]]:
+        """Returns the target position within range based on the
+        current position of the weapon
+        parameter:
+        position (tuple[int, int]): The current coordinates
+        (x, y) of the weapon.
+        Return value:
+        list[tuple[int, int]]: List of target coordinates (x, y)
+        within the weapon attack range."""
+        targets = []
+
+        # If the range is greater than 0, generate target positions of
+        # up, down, left, and right
+        if self._range > 0:
+            x, y = position  # Get the current weapon position
+            for i in range(1, self._range + 1):
+                targets.append((x, y - i))  # up
+                targets.append((x, y + i))  # down
+                targets.append((x - i, y))  # left
+                targets.append((x + i, y))  # right
+
+        return targets
+
+    def __str__(self) -> str:
+        return self.get_name()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}()"
+
+
+"""
+4.1.2 PoisonDart(Weapon)
+"""
+
+
+class PoisonDart(Weapon):
+    """
+    Attribute:
+        _name (str): Weapon name, set to "PoisonDart".
+        _symbol (str): symbols "D"。
+        _effect (dict): A dictionary containing weapon effects. Defaults to
+        {"poison": 2}, meaning 2 points of poison effect are applied per attack.
+        _range (int): The weapon's attack range, set to 2.
+    """
+    def __init__(self):
+        super().__init__()
+        self._name = "PoisonDart"
+        self._symbol = "D"
+        self._effect = {"poison": 2}
+        self._range = 2
+
+
+"""
+4.1.3 PoisonSword(Weapon)
+"""
+
+
+class PoisonSword(Weapon):
+    """。
+    Attribute:
+        _name (str): Weapon name, set to "PoisonSword".
+        _symbol (str): Corresponds to the symbol "S".
+        _effect (dict): A dictionary containing weapon effects, defaults to
+        {"damage": 2, "poison": 1}, meaning 2 points of damage and 1 point of
+        poison effect are applied per attack.
+        _range (int): The weapon's attack range, set to 1.
+    """
+    def __init__(self):
+        super().__init__()
+        self._name = "PoisonSword"
+        self._symbol = "S"
+        self._effect = {"damage": 2, "poison": 1}
+        self._range = 1
+
+
+"""
+4.1.4 HealingRock(Weapon)
+"""
+
+
+class HealingRock(Weapon):
+    """
+    Attribute:
+        _name (str): Weapon name, set to "HealingRock".
+        _symbol (str): Corresponds to the symbol "H".
+        _effect (dict): A dictionary containing weapon effects,
+        which defaults to {"healing": 2},
+        meaning that each use restores 2 health points.
+        _range (int): The weapon's area of effect, set to 2.
+    """
+    def __init__(self):
+        super().__init__()
+        self._name = "HealingRock"
+        self._symbol = "H"
+        self._effect = {"healing": 2}
+        self._range = 2
+
+
+"""
+4.1.5 Tile()
+"""
+
+
+class Tile:
+    """
+    Represents a tile in the map that may or may not block movement,
+    and may contain weapons.
+
+    Attribute:
+        _symbol (str): Symbolic representation of the tile (such as wall
+        "#" or open space " ").
+        _is_blocking (bool): Whether to block movement, True means blocking.
+        _weapon (Optional[Weapon]): Weapons that may be included on the tile,
+        defaults to None.
+
+    Methods:
+        is_blocking() -> bool: Returns whether this tile blocks movement.
+        get_symbol() -> str: Returns the symbol of the tile.
+        get_weapon() -> Optional[Weapon]: Returns the weapon on the tile
+        (if any).
+        set_weapon(weapon: Weapon) -> None: Set the weapon on this tile.
+        remove_weapon() -> None: Removes weapons from tiles.
+    """
+    def __init__(self, symbol: str, is_blocking: bool) -> None:
+        self._symbol = symbol
+        self._is_blocking = is_blocking
+        self._weapon = None  # The new tile does not contain weapon
+
+    def is_blocking(self) -> bool:
+        return self._is_blocking
+
+    def get_symbol(self) -> str:
+        return self._symbol
+
+    def get_weapon(self) -> Optional[Weapon]:
+        return self._weapon
+
+    def set_weapon(self, weapon: Weapon) -> None:
+        self._weapon = weapon
+
+    def remove_weapon(self) -> None:
+        self._weapon = None
+
+    def __str__(self) -> str:
+        return self._symbol
+
+    def __repr__(self) -> str:
+        return f"Tile('{self._symbol}', {self._is_blocking})"
+
+
+"""
+4.1.6 create_tile(symbol: str)-> Tile
+"""
+
+
+def create_tile(symbol: str) -> Tile:
+    """
+    Create and return the corresponding Tile object based on the input symbol.
+
+    Symbols are looked up in the symbol registry (see `register_tile` and
+    `register_weapon`):
+        A terrain symbol ("#", " " or "G" by default) creates a Tile of
+        that symbol, blocking movement if it was registered as blocking.
+        A weapon symbol ("D", "S" or "H" by default) creates a floor Tile
+        holding a new weapon of the registered type.
+        For other symbols, returns an empty Tile that does not block movement.
+
+    parameter:
+        symbol (str): Symbol indicating which type of Tile should be created.
+
+    Return value:
+        Tile: Tile objects created from symbols.
+    """
+    blocking = TILE_TYPES.get(symbol)
+    if blocking is not None:
+        return Tile(symbol, blocking)
+    tile = Tile(FLOOR_TILE, False)
+    weapon_type = WEAPON_TYPES.get(symbol)
+    if weapon_type is not None:
+        # A non-blocking ground tile holding the corresponding weapon
+        tile.set_weapon(weapon_type())
+    return tile
+
+
+"""
+4.1.7 Entity()
+"""
+
+
+class Entity:
+    """
+    Represents an entity in the game with attributes of maximum health and
+    current health.
+
+    Attribute:
+        _max_health (int): The entity's maximum health.
+        _current_health (int): The entity's current health value,
+        initially set to its maximum health value.
+
+    Methods:
+        get_health() -> int: Returns the current health value.
+        is_alive() -> bool: Determine whether the entity is alive.
+        take_damage(amount: int) -> None: Causes damage to entities,
+        reducing their health.
+        heal(amount: int) -> None: Restore health to the entity.
+    """
+    def __init__(self, max_health: int):
+        self._max_health = max_health  # max health
+        self._current_health = max_health  # initial current max health
+        self._poison_stat = 0  # initial poison
+        self._weapon: Optional[Weapon] = None  # initial no weapon
+        self._name = "Entity"  # default name
+        self._symbol = "E"  # default symbol
+
+    def get_symbol(self) -> str:
+        return self._symbol
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_health(self) -> int:
+        return self._current_health
+
+    def get_poison(self) -> int:
+        return self._poison_stat
+
+    def get_weapon(self) -> Optional[Weapon]:
+        return self._weapon
+
+    def equip(self, weapon: Weapon) -> None:
+        """Equip weapons, replace existing weapons"""
+        self._weapon = weapon
+
+    def get_weapon_targets(self, position: tuple[int, int]) -> list[tuple[int, int]]:
+        """Returns the target position that the weapon can attack"""
+        if self._weapon:
+            return self._weapon.get_targets(position)
+        return []
+
+    def get_weapon_effect(self) -> dict[str, int]:
+        """Returns the effect of the current weapon. If there is no weapon,
+        returns an empty dictionary."""
+        if self._weapon:
+            return self._weapon.get_effect()
+        return {}
+
+    def apply_effects(self, effects: dict[str, int]) -> None:
+        """Apply damage, healing and poison effects"""
+        if "healing" in effects:
+            self._current_health = min(self._max_health, self._current_health + effects["healing"])
+        if "damage" in effects:
+            self._current_health = max(0, self._current_health - effects["damage"])
+        if "poison" in effects:
+            self._poison_stat += effects["poison"]
+
+    def apply_poison(self) -> None:
+        """Apply poison effect every turn"""
+        if self._poison_stat > 0:
+            self._current_health = max(0, self._current_health - self._poison_stat)
+            self._poison_stat = max(0, self._poison_stat - 1)
+
+    def is_alive(self) -> bool:
+        """Determine whether the entity is still alive"""
+        return self._current_health > 0
+
+    def __str__(self) -> str:
+        """Return entity name"""
+        return self.get_name()
+
+    def __repr__(self) -> str:
+        """Returns a string constructible in the REPL"""
+        return f"{self.__class__.__name__}({self._max_health})"
+
+
+"""
+4.1.8 Player(Entity)
+"""
+
+
+class Player(Entity):
+    """
+    Represents the player entity in the game, inherited from the Entity class.
+
+    Players have their own maximum health and have unique symbols and names.
+
+    Properties inherited from Entity class:
+        _max_health (int)
+        _current_health (int)
+        _poison_stat (int)
+        _weapon (Optional[Weapon])
+
+    Methods:
+        get_symbol() -> str: Returns the symbol "P" representing the player.
+        get_name() -> str: Returns the player's name "Player".
+    """
+    def __init__(self, max_health: int) -> None:
+        super().__init__(max_health)
+
+    def get_symbol(self) -> str:
+        return "P"
+
+    def get_name(self) -> str:
+        return "Player"
+
+
+"""
+SlugStore: struct-of-arrays storage of slug stats
+"""
+
+
+class SlugStore:
+    """
+    Keeps the mutable stats of many slugs in parallel typed arrays, so that
+    per-turn bookkeeping (poison ticks, the death sweep and area effects) runs
+    as one loop over plain integers instead of one method call per slug.
+
+    Every Slug owns a row in a store and reads and writes its stats through
+    it; a SlugDungeonModel adopts all of its slugs into a single store.
+
+    Attribute:
+        max_health, health, poison, turn_count (array[int]): One entry per
+        row. A slug's turn count is its turn_count entry plus `clock`.
+        clock (int): Added to every turn count, so a model ends the turn of
+        all its slugs by incrementing it once.
+        order (array[int]): Sequence numbers of the rows; a model keeps
+        them increasing in the order of its _slugs dict.
+        weapons (list[Optional[Weapon]]): The weapon of each row.
+        slugs (list[Optional[Slug]]): The slug owning each row, None for a
+        free row.
+        positions (list[Optional[tuple[int, int]]]): The map position of each
+        row, kept up to date by the model that owns the store.
+        journal (Optional[dict[int, tuple]]): While a model records a turn
+        for undo, the (slug, health, poison) of each row as it was before
+        the turn first changed it, by row index; otherwise None.
+
+    Methods:
+        add(slug) -> int: Allocate a zeroed row for `slug`.
+        adopt(slug, position) -> None: Move the row of `slug` into this store.
+        release(index) -> None: Free a row.
+        tick_poison() -> None: Apply one turn of poison to every row.
+        sweep_dead() -> list[int]: Rows of slugs that are no longer alive.
+        apply_effects(indices, effects) -> None: Apply weapon effects to rows.
+    """
+    def __init__(self) -> None:
+        self.max_health = array("i")
+        self.health = array("i")
+        self.poison = array("i")
+        self.turn_count = array("i")
+        self.order = array("q")
+        self.clock = 0
+        self.weapons: list[Optional[Weapon]] = []
+        self.slugs: list[Optional["Slug"]] = []
+        self.positions: list[Optional[tuple[int, int]]] = []
+        self.journal: Optional[dict[int, tuple]] = None
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.slugs) - len(self._free)
+
+    def add(self, slug: "Slug") -> int:
+        """Allocate a zeroed row owned by `slug` and return its index"""
+        if self._free:
+            index = self._free.pop()
+            self.slugs[index] = slug
+            return index
+        for column in (self.max_health, self.health, self.poison,
+                       self.turn_count, self.order):
+            column.append(0)
+        self.weapons.append(None)
+        self.slugs.append(slug)
+        self.positions.append(None)
+        return len(self.slugs) - 1
+
+    def adopt(self, slug: "Slug", position: tuple[int, int]) -> None:
+        """Move the stats of `slug` from its current store into this one"""
+        old, old_index = slug._store, slug._index
+        if old is self:
+            self.positions[old_index] = position
+            return
+        index = self.add(slug)
+        self.max_health[index] = old.max_health[old_index]
+        self.health[index] = old.health[old_index]
+        self.poison[index] = old.poison[old_index]
+        self.turn_count[index] = (old.turn_count[old_index] + old.clock
+                                  - self.clock)
+        self.weapons[index] = old.weapons[old_index]
+        self.positions[index] = position
+        old.release(old_index)
+        slug._store, slug._index = self, index
+
+    def release(self, index: int) -> None:
+        """Free a row. Its stats are zeroed so bulk operations skip it"""
+        self.health[index] = 0
+        self.poison[index] = 0
+        self.weapons[index] = None
+        self.slugs[index] = None
+        self.positions[index] = None
+        self._free.append(index)
+
+    def tick_poison(self) -> None:
+        """Apply one turn of poison to every row, like Entity.apply_poison"""
+        health, poison, journal = self.health, self.poison, self.journal
+        for index in range(len(poison)):
+            amount = poison[index]
+            if amount > 0:
+                if journal is not None and index not in journal:
+                    journal[index] = (self.slugs[index], health[index],
+                                      amount)
+                remaining = health[index] - amount
+                health[index] = remaining if remaining > 0 else 0
+                poison[index] = amount - 1
+
+    def sweep_dead(self) -> list[int]:
+        """Returns the rows of slugs whose health has dropped to 0"""
+        health, slugs = self.health, self.slugs
+        return [index for index in range(len(slugs))
+                if health[index] <= 0 and slugs[index] is not None]
+
+    def apply_effects(self, indices: list[int],
+                      effects: dict[str, int]) -> None:
+        """Apply weapon effects to the given rows, like
+        Entity.apply_effects"""
+        healing = effects.get("healing")
+        damage = effects.get("damage")
+        poison = effects.get("poison")
+        journal = self.journal
+        for index in indices:
+            if journal is not None and index not in journal:
+                journal[index] = (self.slugs[index], self.health[index],
+                                  self.poison[index])
+            if healing is not None:
+                self.health[index] = min(self.max_health[index],
+                                         self.health[index] + healing)
+            if damage is not None:
+                self.health[index] = max(0, self.health[index] - damage)
+            if poison is not None:
+                self.poison[index] += poison
+
+
+"""
+4.1.9 Slug(Entity)
+"""
+
+
+class Slug(Entity):
+    """
+    Represents the slug entity in the game, inherited from the Entity class.
+
+    The slug entity has a turn counter to determine whether
+    it can move during the current turn. This category serves as a base class,
+    and specific movement and attack logic needs to be implemented
+    by subclasses.
+
+    Properties inherited from Entity class:
+        _max_health (int):
+        _current_health (int):
+        _poison_stat (int):
+        _weapon (Optional[Weapon]):
+
+    New attributes:
+        turn_count (int): Round counter, used to determine
+        whether the slug can move in the current round.
+        move_every (int): The slug's speed: it can move on turns where
+        turn_count is a multiple of it. Set per slug type, e.g. to
+        SLUG_SPEED_FAST or SLUG_SPEED_SLOW.
+
+    All stats live in a row of a SlugStore (see `_store` and `_index`); the
+    attributes above are properties reading and writing that row.
+
+    Methods:
+        get_name() -> str: Returns the name of the slug "Slug".
+        get_symbol() -> str: Returns the symbol "M" for the slug.
+        end_turn() -> None: Executed at the end of each round,
+        updating the round count.
+        can_move() -> bool: Checks if the slug can move during the current turn.
+        move() -> None: The movement logic that should be implemented
+        in subclasses.
+        attack() -> None: Attack logic that should be implemented in subclasses.
+        choose_move() -> None: Select move logic that should be implemented
+        in subclasses.
+    """
+    move_every = SLUG_SPEED_NORMAL  # the slug moves every this many turns
+
+    def __init__(self, max_health: int) -> None:
+        # A private store until a model adopts this slug into its own
+        self._store = SlugStore()
+        self._index = self._store.add(self)
+        super().__init__(max_health)
+        self.turn_count = 0
+
+    @property
+    def _max_health(self) -> int:
+        return self._store.max_health[self._index]
+
+    @_max_health.setter
+    def _max_health(self, value: int) -> None:
+        self._store.max_health[self._index] = value
+
+    @property
+    def _current_health(self) -> int:
+        return self._store.health[self._index]
+
+    @_current_health.setter
+    def _current_health(self, value: int) -> None:
+        self._store.health[self._index] = value
+
+    @property
+    def _poison_stat(self) -> int:
+        return self._store.poison[self._index]
+
+    @_poison_stat.setter
+    def _poison_stat(self, value: int) -> None:
+        self._store.poison[self._index] = value
+
+    @property
+    def _weapon(self) -> Optional[Weapon]:
+        return self._store.weapons[self._index]
+
+    @_weapon.setter
+    def _weapon(self, value: Optional[Weapon]) -> None:
+        self._store.weapons[self._index] = value
+
+    @property
+    def turn_count(self) -> int:
+        return self._store.turn_count[self._index] + self._store.clock
+
+    @turn_count.setter
+    def turn_count(self, value: int) -> None:
+        self._store.turn_count[self._index] = value - self._store.clock
+
+    def get_name(self) -> str:
+        """Return entity name 'Slug'"""
+        return "Slug"
+
+    def get_symbol(self) -> str:
+        """Return entity symbol 'M'"""
+        return "M"
+
+    def end_turn(self):
+        """Executed at the end of each round,
+        updating the round counter and deciding whether to move"""
+        self.turn_count += 1
+
+    def can_move(self) -> bool:
+        """Checks whether the entity can move during the current turn"""
+        return self.turn_count % self.move_every == 0
+
+    def move(self):
+        """should be implemented in subclasses"""
+        raise NotImplementedError("Slug subclasses must implement the move method")
+
+    def attack(self):
+        """should be implemented in subclasses"""
+        raise NotImplementedError("Slug subclasses must implement the attack method")
+
+    def choose_move(self, valid_positions: list,
+                    current_position: tuple[int, int],
+                    target_position: tuple[int, int]):
+        """Movement logic should be implemented in subclasses"""
+        raise NotImplementedError(
+            "Slug subclasses must implement a choose_move method.")
+
+
+"""
+4.1.10 NiceSlug(Slug)
+"""
+
+
+class NiceSlug(Slug):
+    """
+    Represents a NiceSlug, inherited from the Slug class.
+
+    NiceSlug always has a maximum health of 10 and comes
+    equipped with a HealingRock as a weapon.
+    Its action characteristic is that it will never move and will only stay at
+    its current location.
+
+    Properties inherited from Slug class:
+        turn_count (int): Round counter, used to determine whether the slug
+        can move in the current round.
+        _max_health (int): Max health, fixed to 10 for NiceSlug.
+        _weapon (Weapon): Equipped with HealingRock weapon.
+
+    Methods:
+        choose_move() -> tuple[int, int]: NiceSlug Does not move,
+        always returns to current location.
+        get_symbol() -> str: Returns the symbol "N" for NiceSlug.
+        get_name() -> str: Returns the name of NiceSlug "NiceSlug".
+        __repr__() -> str: Returns the type name of this object.
+    """
+    def __init__(self) -> None:
+        super().__init__(10)  # NiceSlug always has max_health of 10
+        self.equip(HealingRock())  # Equip HealingRock weapon
+
+    def choose_move(
+            self,
+            candidates: list[tuple[int, int]],
+            current_position: tuple[int, int],
+            target_position: tuple[int, int],
+    ) -> tuple[int, int]:
+        # NiceSlug always stays in its current position
+        return current_position
+
+    def get_symbol(self) -> str:
+        return "N"
+
+    def get_name(self) -> str:
+        return "NiceSlug"
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + "()"
+
+
+"""
+4.1.11 AngrySlug(Slug)
+"""
+
+
+class AngrySlug(Slug):
+    """
+    Represents an angry slug (AngrySlug), inherited from the Slug class.
+
+    AngrySlug has a maximum health of 5 and is equipped with a
+    PoisonSword as a weapon.
+    It selects the closest movement position based on the player's position and
+    uses squared distances for comparison, thus avoiding floating
+    point calculations.
+
+    Properties inherited from Slug class:
+        turn_count (int): Round counter, used to determine whether the slug
+        can move in the current round.
+        _max_health (int): Max health, fixed to 5 for AngrySlug.
+        _weapon (Weapon): Equipped with the PoisonSword weapon.
+
+    Methods:
+        choose_move() -> tuple[int, int]: Selects the closest movement position
+        based on the player's position.
+        squared_distance() -> int: Calculate the squared Euclidean distance
+        between two locations to avoid floating point calculations.
+        get_symbol() -> str: Returns the symbol "A" for AngrySlug.
+        get_name() -> str: Returns the name of the AngrySlug "AngrySlug".
+        __repr__() -> str: Returns the type name of this object.
+    """
+    def __init__(self) -> None:
+        super().__init__(5)  # AngrySlug always has max_health of 5
+        self.equip(PoisonSword())  # Equip PoisonSword weapon
+
+    def choose_move(
+            self,
+            candidates: list[tuple[int, int]],
+            current_position: tuple[int, int],
+            player_position: tuple[int, int]
+    ) -> tuple[int, int]:
+        # Use a lambda to determine the closest position and a tuple as a
+        # tiebreaker if the distance is the same
+        return min(
+            candidates + [current_position],
+            key=lambda pos: (self.squared_distance(pos, player_position), pos)
+        )
+
+    def squared_distance(self, pos1: tuple[int, int],
+                         pos2: tuple[int, int]) -> int:
+        # Calculate squared Euclidean distance to avoid floating point calculations
+        x1, y1 = pos1
+        x2, y2 = pos2
+        return (x1 - x2) ** 2 + (y1 - y2) ** 2
+
+    def get_symbol(self) -> str:
+        return "A"
+
+    def get_name(self) -> str:
+        return "AngrySlug"
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + "()"
+
+
+"""
+4.1.12 ScaredSlug(Slug)
+"""
+
+
+class ScaredSlug(Slug):
+    """
+    Represents a slug (ScaredSlug) that is afraid of the player, inherited
+    from the Slug class.
+
+    ScaredSlug has a maximum health of 3 and is equipped with a PoisonDart
+    as a weapon.s
+    It selects the farthest move position based on the player's position and
+    uses squared distances for comparison, thus avoiding floating point
+    calculations.
+
+    Properties inherited from Slug class:
+        turn_count (int): Round counter, used to determine whether the slug
+        can move in the current round.
+        _max_health (int): Max health, fixed to 3 for ScaredSlug.
+        _weapon (Weapon): Equipped with PoisonDart weapon.
+
+    Methods:
+        choose_move() -> tuple[int, int]: Choose the furthest movement location
+        based on the player's position.
+        squared_distance() -> int: Calculate the squared Euclidean distance
+        between two locations to avoid floating point calculations.
+        get_symbol() -> str: Returns the symbol "L" for ScaredSlug.
+        get_name() -> str: Returns the name of the ScaredSlug "ScaredSlug".
+        __repr__() -> str: Returns the type name of this object.
+    """
+    def __init__(self) -> None:
+        super().__init__(3)  # ScaredSlug always has max_health of 3
+        self.equip(PoisonDart())  # Equip PoisonDart weapon
+
+    def choose_move(
+            self,
+            candidates: list[tuple[int, int]],
+            current_position: tuple[int, int],
+            player_position: tuple[int, int]
+    ) -> tuple[int, int]:
+        # Use a lambda to determine the furthest position and a tuple as a
+        # tiebreaker if the distance is the same
+        return max(
+            candidates + [current_position],
+            key=lambda pos: (self.squared_distance(pos, player_position), pos)
+        )
+
+    def squared_distance(self, pos1: tuple[int, int],
+                         pos2: tuple[int, int]) -> int:
+        x1, y1 = pos1
+        x2, y2 = pos2
+        """
+        Use squared distance to compare distances 
+        without needing to take square root
+        """
+        return (x1 - x2) ** 2 + (y1 - y2) ** 2
+
+    def get_symbol(self) -> str:
+        return "L"
+
+    def get_name(self) -> str:
+        return "ScaredSlug"
+
+    def __repr__(self) -> str:
+        return self.__class__.__name__ + "()"
+
+
+"""
+Symbol registry
+"""
+
+# What each level file symbol creates, and how it is drawn. The loaders
+# (create_tile, parse_level, chunks, savestate) and DungeonMap only look
+# symbols up here, so new terrain, weapons and slugs only need registering.
+TILE_TYPES: dict[str, bool] = {}  # terrain symbol -> blocks movement
+TILE_COLOURS: dict[str, str] = {}  # terrain symbol -> fill colour
+WEAPON_TYPES: dict[str, type[Weapon]] = {}  # weapon symbol -> weapon type
+SLUG_TYPES: dict[str, type[Slug]] = {}  # slug symbol -> slug type
+SLUG_LABELS: dict[str, str] = {}  # slug symbol -> text drawn on the slug
+
+
+def register_tile(symbol: str, is_blocking: bool, colour: str) -> None:
+    """Register a terrain symbol, whether its tiles block movement and the
+    colour they are drawn in."""
+    TILE_TYPES[symbol] = is_blocking
+    TILE_COLOURS[symbol] = colour
+
+
+def register_weapon(weapon_type: type[Weapon]) -> None:
+    """Register a weapon type under its `get_symbol()`. It must be
+    constructible without arguments."""
+    WEAPON_TYPES[weapon_type().get_symbol()] = weapon_type
+
+
+def register_slug(slug_type: type[Slug], label: str) -> None:
+    """Register a slug type under its `get_symbol()`, with the text drawn
+    on it. It must be constructible without arguments."""
+    symbol = slug_type().get_symbol()
+    SLUG_TYPES[symbol] = slug_type
+    SLUG_LABELS[symbol] = label
+
+
+register_tile(FLOOR_TILE, False, FLOOR_COLOUR)
+register_tile(WALL_TILE, True, WALL_COLOUR)
+register_tile(GOAL_TILE, False, GOAL_COLOUR)
+register_weapon(PoisonDart)
+register_weapon(PoisonSword)
+register_weapon(HealingRock)
+register_slug(AngrySlug, "Angry\nSlug")
+register_slug(NiceSlug, "Nice\nSlug")
+register_slug(ScaredSlug, "Scared\nSlug")
+
+
+# Metrics sink of this process (see metrics.GameMetrics), None when off
+_metrics = None
+
+
+def set_metrics(metrics) -> None:
+    """Report turns, attacks and level loads of every model in this process
+    to `metrics`, or stop reporting if it is None."""
+    global _metrics
+    _metrics = metrics
+
+
+"""
+4.1.13 SlugDungeonModel()
+"""
+
+
+class SlugScheduler:
+    """
+    Hashed timing wheel of the turns on which slugs can move.
+
+    Each slug is filed under the store clock value of the next turn on which
+    its `can_move()` holds, so a turn only looks at the slugs due on it.
+    Slugs of types that override `can_move` are asked every turn instead.
+    Wheel entries of slugs that have died are left for the caller to skip;
+    polled slugs that have died are dropped without being asked.
+
+    Methods:
+        schedule(slug) -> None: File a slug under its next turn to move.
+        pop_due(clock) -> list[Slug]: Remove and return the slugs that can
+        move on the turn with that store clock.
+        clear() -> None: Forget every slug.
+    """
+    def __init__(self) -> None:
+        self._wheel: dict[int, list[Slug]] = {}
+        self._polled: list[Slug] = []
+
+    def schedule(self, slug: Slug) -> None:
+        if type(slug).can_move is not Slug.can_move:
+            self._polled.append(slug)
+            return
+        wait = -slug.turn_count % slug.move_every
+        self._wheel.setdefault(slug._store.clock + wait, []).append(slug)
+
+    def pop_due(self, clock: int) -> list[Slug]:
+        due = self._wheel.pop(clock, [])
+        if self._polled:
+            polled, self._polled = self._polled, []
+            for slug in polled:
+                if slug._store.slugs[slug._index] is not slug:
+                    continue  # died, its row was released
+                if slug.can_move():
+                    due.append(slug)
+                else:
+                    self._polled.append(slug)
+        return due
+
+    def clear(self) -> None:
+        self._wheel.clear()
+        self._polled.clear()
+
+
+# Keyboard actions understood by SlugDungeonModel.handle_action
+ACTION_DELTAS = {
+    "w": (-1, 0),  # move up
+    "s": (1, 0),  # move down
+    "a": (0, -1),  # move left
+    "d": (0, 1),  # move right
+}
+ATTACK_KEY = " "  # stay and attack from the current position
+# Every action key, in the order used by integer action codes
+ACTIONS = ("w", "a", "s", "d", ATTACK_KEY)
+UNDO_LIMIT = 1000  # default number of turns that can be undone
+DECISION_CHUNK = 64  # slugs per task of two-phase decisions on an executor
+
+
+class TurnTrace(NamedTuple):
+    """
+    What `SlugDungeonModel.apply_moves` played: the number of actions it
+    consumed, and one entry per turn played in each array, taken after
+    the turn.
+    """
+    actions: int
+    rows: array  # the player's position
+    cols: array
+    health: array  # the player's HP and poison
+    poison: array
+    slugs: array  # slugs left on the map
+
+
+class TurnDelta(NamedTuple):
+    """
+    What one turn changed, as kept for `SlugDungeonModel.undo` and `redo`.
+    Only the slugs and tiles the turn touched are listed.
+    """
+    clock: tuple[int, int]  # the store clock before and after the turn
+    player: Optional[tuple]  # _player_state before and after, or None
+    # (slug, position, order, new position, new order) of each slug put at
+    # the end of _slugs, in the order it happened
+    moves: list[tuple]
+    # (slug, position, order, turn_count row, max health, health, poison,
+    # weapon) of each slug that died, with its stats before the turn
+    deaths: list[tuple]
+    # (slug, (health, poison) before, after) of surviving slugs
+    stats: list[tuple]
+    weapons: list[tuple]  # (position, before, after) of tile weapons
+
+# Occupancy bits of a cell, see SlugDungeonModel._occupied
+PLAYER_CELL = 1
+SLUG_CELL = 2
+
+# Neighbour directions (up, down, left, right), in the order slugs consider
+# them, and the directions set in each 4-bit neighbour mask
+NEIGHBOUR_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+MASK_DIRECTIONS = tuple(
+    tuple(direction for direction in range(4) if mask >> direction & 1)
+    for mask in range(16))
+
+# Slug types whose choose_move is replaced by a lookup table on maps with cell
+# tables, see policies.py. Subclasses are left out, as they may override
+# choose_move.
+POLICY_SLUG_TYPES = (NiceSlug, AngrySlug, ScaredSlug)
+_policy_tables: dict[type, bytes] = {}
+_stationary_types: dict[type, bool] = {}
+
+
+def get_policy_table(slug_type: type) -> Optional[bytes]:
+    """Returns the policy table of a slug type, compiled on first use, or
+    None if moves of that type must go through choose_move."""
+    if slug_type not in POLICY_SLUG_TYPES:
+        return None
+    table = _policy_tables.get(slug_type)
+    if table is None:
+        table = compile_policy(slug_type, NEIGHBOUR_DELTAS)
+        _policy_tables[slug_type] = table
+    return table
+
+
+def snapshot_slug(slug: Slug) -> Slug:
+    """
+    A copy of `slug` whose stats are in a one-row store of its own, so it can
+    be handed to another thread or pickled for another process without the
+    store it shares with the rest of its model.
+    """
+    snapshot = copy.copy(slug)
+    store = SlugStore()
+    snapshot._store, snapshot._index = store, store.add(snapshot)
+    snapshot._max_health = slug._max_health
+    snapshot._current_health = slug._current_health
+    snapshot._poison_stat = slug._poison_stat
+    snapshot._weapon = slug._weapon
+    snapshot.turn_count = slug.turn_count
+    return snapshot
+
+
+def choose_moves(requests: list[tuple[Slug, list, tuple[int, int]]],
+                 target_position: tuple[int, int]) -> list[tuple[int, int]]:
+    """
+    The decide phase of two-phase moves for a batch of slugs: `choose_move`
+    of each (slug snapshot, valid positions, position). A module level
+    function, so process pools can run it.
+    """
+    return [slug.choose_move(valid_positions, position, target_position)
+            for slug, valid_positions, position in requests]
+
+
+def is_stationary(slug_type: type) -> bool:
+    """Whether slugs of this type always choose to stay where they are
+    (e.g. NiceSlug), so their moves need no evaluation"""
+    stationary = _stationary_types.get(slug_type)
+    if stationary is None:
+        table = get_policy_table(slug_type)
+        stationary = table is not None and table.count(STAY) == len(table)
+        _stationary_types[slug_type] = stationary
+    return stationary
+
+
+class SlugDungeonModel:
+    """
+    SlugDungeonModel Responsible for managing the game map, players,
+    slugs and game turn logic.
+
+    This category contains a variety of methods for managing game state,
+    including slug movement, attack, and turn end logic,
+    and handling player interaction with the map.
+
+    Property:
+        _tiles (list[list[Tile]]): A list of tiles on the map.
+        _slugs (dict[tuple[int, int], Slug]): A dictionary of the locations and
+        entities of all slugs on the map.
+        _player (Player): Player entity.
+        _player_position (tuple[int, int]): The player's current position
+        on the map.
+        _prev_player_position (tuple[int, int]): The player's position
+        during the previous turn, used to track player movement.
+        _store (SlugStore): The stats of all slugs on the map, updated in
+        bulk at the end of each turn.
+        _scheduler (SlugScheduler): When each slug can move next.
+        _next_order (int): The store order number of the next slug placed,
+        see `_move_slug`.
+        _attack_reach (Optional[int]): The longest weapon range of any slug,
+        so only slugs that close to the player are tried as attackers; None
+        if some slug weapon has other targets than the usual cross, and
+        every slug has to be tried. Slug weapons do not change in play, so
+        it is only recomputed when slugs are restored.
+        _fov (Optional[FieldOfView]): What the player sees in fog-of-war
+        mode, None when fog of war is off.
+        verify_policies (bool): Check every policy table move against
+        choose_move and raise PolicyMismatchError on a difference.
+        _two_phase (bool): Whether slugs move in two phases, see
+        `set_two_phase_moves`.
+        _executor (Optional[Executor]): Runs the decide phase of two-phase
+        moves, None to decide in this thread.
+        _undo (Optional[deque]): Deltas of the turns that can be undone,
+        None until `enable_undo` is called.
+        _redo (list): Deltas of the undone turns that can be redone.
+        _journal (Optional[TurnDelta]): The changes of the turn being
+        recorded for undo, None between turns.
+        _subscribers (list[Subscriber]): Called with the events of every
+        turn, see events.py.
+        _events (Optional[list]): The events of the turn being played, None
+        while nobody is subscribed so that no events are built.
+        _ended (bool): Whether the game was over after the latest turn
+        reported to the metrics or subscribers, so a win or loss is only
+        reported once.
+
+    Cells are also addressed by a packed index, row * #columns + col. For
+    maps given as a list of rows, the following tables are built at load
+    time so that move validation is a couple of array lookups:
+        _passable (bytearray): 1 for each cell that does not block movement.
+        _neighbour_masks (bytearray): For each cell, a 4-bit mask of which
+        neighbours (see NEIGHBOUR_DELTAS) are passable.
+        _occupied (bytearray): PLAYER_CELL and SLUG_CELL bits per cell.
+    Other maps (e.g. chunked ones) leave them as None and use the tuple
+    based lookups instead. Which tiles block never changes in play, so
+    _passable and _neighbour_masks are read only and shared by clones.
+    """
+    verify_policies = False
+
+    def __init__(self,
+                 tiles: list[list[Tile]],
+                 slugs: dict[tuple[int, int], Slug],
+                 player: Player,
+                 player_position: tuple[int, int],
+                 cell_tables: Optional[tuple[bytearray, bytearray]] = None
+                 ) -> None:
+        """
+        parameter:
+            cell_tables (Optional[tuple]): The _passable and _neighbour_masks
+            of a model with the same terrain, to share instead of building
+            them again (see `clone`).
+        """
+        self._tiles = tiles
+        self._slugs = slugs.copy()
+        self._player = player
+        self._player_position = player_position
+        self._prev_player_position = player_position
+        self._store = SlugStore()
+        for position, slug in self._slugs.items():
+            self._store.adopt(slug, position)
+        # Slugs only visit the scheduler on turns they can move on
+        self._next_order = 0
+        for slug in self._slugs.values():
+            self._store.order[slug._index] = self._next_order
+            self._next_order += 1
+        self._scheduler = SlugScheduler()
+        self._reschedule()
+        self._find_attack_reach()
+        self._two_phase = False  # slugs move one after another
+        self._executor: Optional["Executor"] = None
+        self._fov: Optional["FieldOfView"] = None  # fog of war is off
+        self._undo: Optional[deque] = None  # turns are not recorded
+        self._redo: list[TurnDelta] = []
+        self._journal: Optional[TurnDelta] = None  # the turn being recorded
+        self._subscribers: list[Subscriber] = []
+        self._events: Optional[list] = None
+        self._ended = False  # whether the latest turn left the game over
+
+        self._rows, self._cols = 0, 0
+        self._passable: Optional[bytearray] = None
+        self._neighbour_masks: Optional[bytearray] = None
+        self._occupied: Optional[bytearray] = None
+        if isinstance(tiles, list):
+            self._build_cell_tables(cell_tables)
+
+    def _build_cell_tables(
+            self, terrain: Optional[tuple[bytearray, bytearray]] = None
+    ) -> None:
+        """Build the packed cell index tables for a dense map, sharing the
+        terrain tables if given"""
+        rows, cols = self.get_dimensions()
+        self._rows, self._cols = rows, cols
+        if terrain is None:
+            terrain = self._build_terrain_tables(rows, cols)
+        self._passable, self._neighbour_masks = terrain
+        self._neighbour_offsets = (-cols, cols, -1, 1)
+        self._occupied = bytearray(rows * cols)
+        if self._player_position is not None:
+            self._occupied[self.get_cell_index(self._player_position)] |= \
+                PLAYER_CELL
+        for position in self._slugs:
+            self._occupied[self.get_cell_index(position)] |= SLUG_CELL
+
+    def _build_terrain_tables(self, rows: int, cols: int
+                              ) -> tuple[bytearray, bytearray]:
+        """Returns the _passable and _neighbour_masks tables of the map"""
+        passable = bytearray(rows * cols)
+        for row, tile_row in enumerate(self._tiles):
+            for col, tile in enumerate(tile_row[:cols]):
+                if not tile.is_blocking():
+                    passable[row * cols + col] = 1
+
+        masks = bytearray(rows * cols)
+        for cell in range(rows * cols):
+            row, col = divmod(cell, cols)
+            mask = 0
+            if row > 0 and passable[cell - cols]:
+                mask |= 1
+            if row < rows - 1 and passable[cell + cols]:
+                mask |= 2
+            if col > 0 and passable[cell - 1]:
+                mask |= 4
+            if col < cols - 1 and passable[cell + 1]:
+                mask |= 8
+            masks[cell] = mask
+        return passable, masks
+
+    def get_cell_index(self, position: tuple[int, int]) -> int:
+        """Returns the packed row * #columns + col index of a position"""
+        return position[0] * self._cols + position[1]
+
+    def get_cell_position(self, cell: int) -> tuple[int, int]:
+        """Returns the (row, col) position of a packed cell index"""
+        return divmod(cell, self._cols)
+
+    def get_tiles(self) -> list[list[Tile]]:
+        return self._tiles
+
+    def get_slugs(self) -> dict[tuple[int, int], Slug]:
+        return self._slugs
+
+    def get_player(self) -> Player:
+        return self._player
+
+    def get_player_position(self) -> tuple[int, int]:
+        return self._player_position
+
+    def get_tile(self, position: tuple[int, int]) -> Tile:
+        row, col = position
+        return self._tiles[row][col]
+
+    def get_dimensions(self) -> tuple[int, int]:
+        return len(self._tiles), len(self._tiles[0]) if self._tiles else 0
+
+    def get_slug_position(self, slug: Slug) -> tuple[int, int]:
+        """Get the current position of a specified slug from _slugs"""
+        if slug._store is self._store:
+            return self._store.positions[slug._index]
+        for pos, s in self._slugs.items():
+            if s is slug:
+                return pos
+        return None  # If not found, returns None
+
+    def get_valid_slug_positions(self, slug: Slug) -> list[tuple[int, int]]:
+        """
+        Returns a list of valid locations that the slug can move to.
+
+        If the slug cannot move, or its position is invalid, the current position is returned.
+
+        parameter:
+            slug (Slug): To calculate the effective position of the slug.
+
+        Return value:
+            list[tuple[int, int]]: List of locations that can be moved to.
+            If there is no valid position, return the current position.
+        """
+        if not slug.can_move():
+            return []
+
+        slug_position = self.get_slug_position(slug)
+        if slug_position is None:
+            return []
+
+        if self._occupied is not None:
+            return [divmod(cell, self._cols) for cell in
+                    self.get_valid_slug_cells(self.get_cell_index(
+                        slug_position))]
+
+        row, col = slug_position
+
+        potential_positions = [
+            (row, col),  # The current location is also considered a potential location
+            (row - 1, col),
+            (row + 1, col),
+            (row, col - 1),
+            (row, col + 1),
+        ]
+
+        valid_positions = []
+        max_row, max_col = self.get_dimensions()
+
+        for pos in potential_positions:
+            r, c = pos
+            if 0 <= r < max_row and 0 <= c < max_col:
+                tile = self.get_tile(pos)
+                # Check if the location is valid: no blockers, no other slugs, and not a player location
+                if not tile.is_blocking() and (
+                        pos not in self._slugs or pos == slug_position) and pos != self._player_position:
+                    valid_positions.append(pos)
+
+        return valid_positions if valid_positions else [
+            slug_position]  # Guaranteed to return at least the current position
+
+    def get_valid_slug_cells(self, cell: int) -> list[int]:
+        """
+        Packed-index version of `get_valid_slug_positions` for the slug at
+        `cell`, on maps with cell tables: the slug's own cell followed by
+        every passable, unoccupied neighbour.
+        """
+        occupied, offsets = self._occupied, self._neighbour_offsets
+        cells = [cell]
+        for direction in MASK_DIRECTIONS[self._neighbour_masks[cell]]:
+            neighbour = cell + offsets[direction]
+            if not occupied[neighbour]:
+                cells.append(neighbour)
+        return cells
+
+    def perform_attack(self, entity: Entity, position: tuple[int, int]) -> None:
+        weapon = entity.get_weapon()
+        if not weapon:
+            return
+
+        effect = entity.get_weapon_effect()
+        if isinstance(entity, Player):
+            # Area effect on every slug in range, applied in one bulk update
+            hits = [self._slugs[target_position]._index
+                    for target_position in weapon.get_targets(position)
+                    if target_position in self._slugs]
+            store = self._store
+            if self._events is None:
+                store.apply_effects(hits, effect)
+            else:
+                before = [(store.health[index], store.poison[index])
+                          for index in hits]
+                store.apply_effects(hits, effect)
+                for index, (health, poison) in zip(hits, before):
+                    health_events(store.slugs[index], store.positions[index],
+                                  health, poison, self._events)
+            if _metrics is not None:
+                _metrics.record_attacks(len(hits))
+            return
+
+        for target_position in weapon.get_targets(position):
+            if isinstance(entity,
+                          Slug) and target_position == self._player_position:
+                player = self._player
+                health, poison = player.get_health(), player.get_poison()
+                player.apply_effects(effect)  # Make sure the effect is applied to the player
+                if self._events is not None:
+                    health_events(player, target_position, health, poison,
+                                  self._events)
+                if _metrics is not None:
+                    _metrics.record_attacks(1)
+
+    def end_turn(self) -> None:
+        """
+        Handle logic at the end of each game round, including:
+            - Apply poison effect to player
+            - Move the movable slug
+            - Check for dead slugs and remove them
+            - Slugs attack
+
+        Return:
+            None: This method does not return any value.
+        """
+        metrics = _metrics
+        if metrics is not None:
+            started = perf_counter()
+
+        events = self._events
+
+        # Apply poison to player (Apply only once)
+        player = self._player
+        health, poison = player.get_health(), player.get_poison()
+        player.apply_poison()
+        if events is not None:
+            health_events(player, self._player_position, health, poison,
+                          events)
+
+        # Deal with toxins and death first, in bulk over the slug store
+        store = self._store
+        if events is None:
+            store.tick_poison()
+        else:
+            poisoned = [(index, store.health[index], store.poison[index])
+                        for index, slug in enumerate(store.slugs)
+                        if slug is not None and store.poison[index] > 0]
+            store.tick_poison()
+            for index, health, poison in poisoned:
+                health_events(store.slugs[index], store.positions[index],
+                              health, poison, events)
+        dead = store.sweep_dead()
+        for index in dead:
+            position = store.positions[index]
+            if events is not None:
+                events.append(Died(store.slugs[index], position))
+            # Drop weapon on the tile if slug dies
+            weapon = store.weapons[index]
+            if weapon:
+                self._set_tile_weapon(position, weapon)
+                if events is not None:
+                    events.append(WeaponDropped(weapon, position))
+            # Remove dead slugs
+            self._remove_slug(position)
+
+        # Move the movable slugs: only the ones the scheduler has due this
+        # turn, taken in the order of _slugs. The others neither move nor
+        # change places in _slugs, so they need not be visited at all.
+        # Due slugs walled off from the player are not put to sleep: each
+        # is re-inserted at the end of _slugs, which shows in its order,
+        # and still roams its own pocket, so skipping them would change
+        # the game
+        due = [slug for slug in self._scheduler.pop_due(store.clock)
+               if store.slugs[slug._index] is slug]
+        due.sort(key=lambda slug: store.order[slug._index])
+        origins = [store.positions[slug._index] for slug in due]
+        if self._two_phase:
+            self._move_two_phase(due, origins)
+        else:
+            for position, slug in zip(origins, due):
+                new_position = self._decide_move(slug, position)
+                if new_position is not None:
+                    # Update the slug's position
+                    self._move_slug(slug, position, new_position)
+                else:
+                    # If there is no moveable position, keep the slug in place
+                    self._slugs[position] = slug
+
+        # Each slug ends its turn: every turn_count goes up by one at once
+        store.clock += 1
+        for slug in due:
+            self._scheduler.schedule(slug)
+
+        if events is not None:
+            for position, slug in zip(origins, due):
+                new_position = store.positions[slug._index]
+                if new_position != position:
+                    events.append(Moved(slug, position, new_position))
+
+        # Slug performs attack. Only slugs with the player in range can hit,
+        # so they are looked up around the player rather than all tried
+        for position, slug in self._get_attackers():
+            self.perform_attack(slug, position)
+
+        if metrics is not None or events is not None:
+            # Wins and losses are reported once, by the turn ending the game
+            won, lost = self.has_won(), self.has_lost()
+            ended = (won or lost) and not self._ended
+            self._ended = won or lost
+        if metrics is not None:
+            moves = sum(store.positions[slug._index] != position
+                        for position, slug in zip(origins, due))
+            metrics.record_turn(self, perf_counter() - started,
+                                len(self._slugs), moves, len(dead),
+                                won and ended, lost and ended)
+
+        # Record the player's last position at the end of the round
+        self._prev_player_position = self._player_position
+
+        if events is not None:
+            self._publish_events(won and ended, lost and ended)
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """
+        Call `subscriber(model, events)` at the end of every turn with the
+        list of events of that turn (see events.py).
+        """
+        self._subscribers.append(subscriber)
+        if self._events is None:
+            self._events = []
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.remove(subscriber)
+        if not self._subscribers:
+            self._events = None
+
+    def _publish_events(self, won: bool, lost: bool) -> None:
+        """Finish the turn's batch of events, ending it with Won or Lost if
+        the turn ended the game, and hand it to subscribers"""
+        events = self._events
+        if won:
+            events.append(Won())
+        elif lost:
+            events.append(Lost())
+        self._events = []
+        for subscriber in list(self._subscribers):
+            subscriber(self, events)
+
+    def _decide_move(self, slug: Slug,
+                     position: tuple[int, int]) -> Optional[tuple[int, int]]:
+        """Where the due slug at `position` moves to, as the map stands now,
+        or None if it has no valid position"""
+        if is_stationary(type(slug)):
+            # Staying still still counts as a move: it is re-inserted
+            return position
+        table = get_policy_table(type(slug)) \
+            if self._occupied is not None else None
+        if table is not None:
+            # Fast path: one table lookup instead of choose_move
+            new_position = self._policy_move(table, position)
+            if self.verify_policies:
+                self._verify_policy_move(slug, position, new_position)
+            return new_position
+        # Get valid mobile location
+        valid_positions = self.get_valid_slug_positions(slug)
+        if not valid_positions:
+            return None
+        # Use choose_move to choose the slug's moving position, based on
+        # squared_distance
+        return slug.choose_move(valid_positions, position,
+                                self._prev_player_position)
+
+    def set_two_phase_moves(self, enabled: bool,
+                            executor: Optional["Executor"] = None) -> None:
+        """
+        Choose how slugs move. By default each due slug moves in turn, in
+        _slugs order, and sees the moves made before its own.
+
+        In two-phase mode every due slug first decides against the map as
+        it stands before any slug moves, so decisions are independent of
+        each other and `executor` (e.g. a thread or process pool) may run
+        the `choose_move` calls in parallel, DECISION_CHUNK slugs per task.
+        A single pass then applies the moves in _slugs order; a slug whose
+        target cell is still occupied when its turn comes, by a slug that
+        moved there or has not moved away yet, stays where it is. The
+        results do not depend on the executor.
+        """
+        self._two_phase = enabled
+        self._executor = executor
+
+    def _move_two_phase(self, due: list[Slug],
+                        origins: list[tuple[int, int]]) -> None:
+        """Move the due slugs in two phases, see `set_two_phase_moves`"""
+        # Decide: no slug has moved yet, so all of them see the same map.
+        # Policy tables are cheaper than handing the slug to the executor
+        executor = self._executor
+        dense = self._occupied is not None
+        decisions: list[Optional[tuple[int, int]]] = []
+        requests = []  # (decision slot, slug, valid positions, position)
+        for position, slug in zip(origins, due):
+            if executor is None or is_stationary(type(slug)) \
+                    or dense and get_policy_table(type(slug)) is not None:
+                decisions.append(self._decide_move(slug, position))
+                continue
+            valid_positions = self.get_valid_slug_positions(slug)
+            if valid_positions:
+                requests.append((len(decisions), snapshot_slug(slug),
+                                 valid_positions, position))
+            decisions.append(None)
+        if requests:
+            chunks = [requests[start:start + DECISION_CHUNK]
+                      for start in range(0, len(requests), DECISION_CHUNK)]
+            results = executor.map(
+                choose_moves,
+                [[request[1:] for request in chunk] for chunk in chunks],
+                [self._prev_player_position] * len(chunks))
+            for chunk, moves in zip(chunks, results):
+                for request, new_position in zip(chunk, moves):
+                    decisions[request[0]] = new_position
+
+        # Resolve: apply the moves in _slugs order
+        slugs = self._slugs
+        for position, slug, new_position in zip(origins, due, decisions):
+            if new_position is None:
+                slugs[position] = slug  # no valid position, as one by one
+                continue
+            if new_position != position and new_position in slugs:
+                new_position = position  # the cell is taken
+            self._move_slug(slug, position, new_position)
+
+    def _get_attackers(self) -> list[tuple[tuple[int, int], Slug]]:
+        """The slugs that can hit the player from where they stand, with
+        their positions, in _slugs order"""
+        reach = self._attack_reach
+        if reach is None:
+            return list(self._slugs.items())
+        slugs, store = self._slugs, self._store
+        row, col = self._player_position
+        attackers = []
+        for distance in range(1, reach + 1):
+            for position in ((row, col - distance), (row, col + distance),
+                             (row - distance, col), (row + distance, col)):
+                slug = slugs.get(position)
+                if slug is not None and slug.get_weapon() is not None \
+                        and slug.get_weapon()._range >= distance:
+                    attackers.append((position, slug))
+        attackers.sort(key=lambda item: store.order[item[1]._index])
+        return attackers
+
+    def _find_attack_reach(self) -> None:
+        reach = 0
+        for slug in self._slugs.values():
+            weapon = slug.get_weapon()
+            if weapon is None:
+                continue
+            if type(weapon).get_targets is not Weapon.get_targets:
+                reach = None
+                break
+            reach = max(reach, weapon._range)
+        self._attack_reach = reach
+
+    def _policy_move(self, table: bytes,
+                     position: tuple[int, int]) -> tuple[int, int]:
+        """Returns where the slug at `position` moves to according to its
+        policy table"""
+        row, col = position
+        cell = row * self._cols + col
+        occupied, offsets = self._occupied, self._neighbour_offsets
+        free = 0
+        for direction in MASK_DIRECTIONS[self._neighbour_masks[cell]]:
+            if not occupied[cell + offsets[direction]]:
+                free |= 1 << direction
+        target_row, target_col = self._prev_player_position
+        choice = table[policy_index(free, target_row - row, target_col - col)]
+        if choice == STAY:
+            return position
+        delta_row, delta_col = NEIGHBOUR_DELTAS[choice - 1]
+        return row + delta_row, col + delta_col
+
+    def _verify_policy_move(self, slug: Slug, position: tuple[int, int],
+                            new_position: tuple[int, int]) -> None:
+        """Check a policy table move against the slug's choose_move"""
+        expected = slug.choose_move(self.get_valid_slug_positions(slug),
+                                    position, self._prev_player_position)
+        if new_position != expected:
+            raise PolicyMismatchError(
+                f"{slug.get_name()} at {position} moved to {new_position} "
+                f"instead of {expected}")
+
+    def handle_player_move(self, position_delta: tuple[int, int]) -> None:
+        new_position = (self._player_position[0] + position_delta[0],
+                        self._player_position[1] + position_delta[1])
+
+        if self.is_valid_position(new_position):
+            if self._events is not None:
+                self._events.append(Moved(self._player, self._player_position,
+                                          new_position))
+            self._set_player_position(new_position)
+
+            tile = self.get_tile(new_position)
+            weapon = tile.get_weapon()
+            if weapon:
+                self._player.equip(weapon)
+                self._set_tile_weapon(new_position, None)
+                if self._events is not None:
+                    self._events.append(WeaponPickedUp(self._player, weapon,
+                                                       new_position))
+
+            if self._fov is not None:
+                # Visibility only changes when the player actually moves
+                self._fov.update(new_position, self._blocks_sight)
+
+            self.perform_attack(self._player, new_position)
+            self.end_turn()
+
+    def set_fog_of_war(self, radius: Optional[int]) -> None:
+        """
+        Turn the fog-of-war mode on or off.
+
+        parameter:
+            radius (Optional[int]): How far the player can see, in cells, or
+            None to turn fog of war off.
+        """
+        if radius is None:
+            self._fov = None
+            return
+        from fov import FieldOfView  # only fog-of-war games need it
+        self._fov = FieldOfView(radius)
+        self._fov.update(self._player_position, self._blocks_sight)
+
+    def get_field_of_view(self) -> Optional["FieldOfView"]:
+        """Returns what the player sees, or None if fog of war is off"""
+        return self._fov
+
+    def _blocks_sight(self, row: int, col: int) -> bool:
+        """Whether (row, col) blocks sight; everything off the map does"""
+        if row < 0 or col < 0 or row >= len(self._tiles):
+            return True
+        tile_row = self._tiles[row]
+        return col >= len(tile_row) or tile_row[col].is_blocking()
+
+    def handle_action(self, key: str) -> bool:
+        """
+        Play one turn for the given action key, using the same mapping as
+        the keyboard controls.
+
+        parameter:
+            key (str): One of "w", "a", "s", "d" (move) or " " (attack in
+            place). Upper case keys are accepted.
+
+        Return value:
+            bool: True if a turn was played. Moves into walls, slugs or off
+            the map are ignored, exactly like a key press in the GUI.
+        """
+        if self._undo is None:
+            return self._play_action(key)
+        self._capture_turn()
+        played = self._play_action(key)
+        delta = self._diff_turn()
+        if played:
+            self._undo.append(delta)
+            self._redo.clear()
+        return played
+
+    def _play_action(self, key: str) -> bool:
+        """handle_action without undo recording"""
+        key = key.lower()
+        if key in ACTION_DELTAS:
+            position = self._player_position
+            self.handle_player_move(ACTION_DELTAS[key])
+            return self._player_position != position
+        if key == ATTACK_KEY:
+            self.perform_attack(self._player, self._player_position)
+            self.end_turn()
+            return True
+        return False
+
+    def apply_moves(self, actions: Union[str, Iterable[int]]) -> TurnTrace:
+        """
+        Play a whole sequence of actions in one call, stopping early once
+        the game is won or lost.
+
+        parameter:
+            actions (str | Iterable[int]): Action keys as for
+            `handle_action`, or integer action codes indexing `ACTIONS`
+            (e.g. bytes or an array("B")).
+
+        Return value:
+            TurnTrace: The number of actions consumed and, for every turn
+            played, the player's row, column, HP and poison and the number
+            of slugs left. Actions that play no turn (e.g. moves into walls)
+            are consumed but add no entry.
+        """
+        if isinstance(actions, str):
+            keys = actions.lower()
+        else:
+            keys = [ACTIONS[code] for code in actions]
+        size = len(keys)
+        rows, cols, health, poison, slugs = (array("i", [0]) * size
+                                             for _ in range(5))
+
+        play = self._play_action if self._undo is None \
+            else self.handle_action
+        player = self._player
+        turns = consumed = 0
+        for key in keys:
+            if self.has_won() or self.has_lost():
+                break
+            consumed += 1
+            if not play(key):
+                continue
+            rows[turns], cols[turns] = self._player_position
+            health[turns] = player._current_health
+            poison[turns] = player._poison_stat
+            slugs[turns] = len(self._slugs)
+            turns += 1
+
+        for values in (rows, cols, health, poison, slugs):
+            del values[turns:]
+        return TurnTrace(consumed, rows, cols, health, poison, slugs)
+
+    def enable_undo(self, limit: int = UNDO_LIMIT) -> None:
+        """
+        Record the turns played with `handle_action` so they can be undone
+        and redone. Only the latest `limit` turns are kept.
+
+        Each turn is kept as a TurnDelta of the values that changed, before
+        and after: the store clock, the player's position, HP, poison and
+        weapon, and only the slugs that moved, died or were hurt or healed
+        and the tiles whose weapon changed. These are logged as the turn
+        changes them, so recording a turn costs time and memory in
+        proportion to what it changed.
+        """
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> bool:
+        """Take back the latest recorded turn. Returns False if there is
+        none."""
+        if not self._undo:
+            return False
+        delta = self._undo.pop()
+        self._apply_turn(delta, 0)
+        self._redo.append(delta)
+        return True
+
+    def redo(self) -> bool:
+        """Play the latest undone turn again. Returns False if there is
+        none."""
+        if not self._redo:
+            return False
+        delta = self._redo.pop()
+        self._apply_turn(delta, 1)
+        self._undo.append(delta)
+        return True
+
+    def _capture_turn(self) -> None:
+        """Start logging the changes of a turn, see TurnDelta"""
+        clock = self._store.clock
+        self._journal = TurnDelta((clock, clock), _player_state(self), [], [],
+                                  [], [])
+        self._store.journal = {}
+
+    def _diff_turn(self) -> TurnDelta:
+        """Stop logging and return the delta of the turn since
+        `_capture_turn`"""
+        delta, store = self._journal, self._store
+        rows, self._journal, store.journal = store.journal, None, None
+        stats = []
+        for index, (slug, health, poison) in rows.items():
+            if store.slugs[index] is slug:  # dead slugs are in deaths
+                after = (store.health[index], store.poison[index])
+                if after != (health, poison):
+                    stats.append((slug, (health, poison), after))
+        player = _player_state(self)
+        return delta._replace(
+            clock=(delta.clock[0], store.clock),
+            player=None if player == delta.player else (delta.player, player),
+            stats=stats)
+
+    def _apply_turn(self, delta: TurnDelta, side: int) -> None:
+        """Restore the state before (side 0) or after (side 1) a turn"""
+        store = self._store
+        slugs = None  # the slugs of _slugs, if that has to be rebuilt
+        changed = set()  # positions whose occupant changed
+        if delta.moves or delta.deaths:
+            slugs = list(self._slugs.values())
+        if side == 0:
+            for position, before, _ in reversed(delta.weapons):
+                self.get_tile(position).set_weapon(before)
+            for (slug, position, order, turn_count, max_health, health,
+                 poison, weapon) in delta.deaths:
+                index = slug._index = store.add(slug)
+                store.max_health[index] = max_health
+                store.health[index] = health
+                store.poison[index] = poison
+                store.turn_count[index] = turn_count
+                store.weapons[index] = weapon
+                store.positions[index] = position
+                store.order[index] = order
+                slugs.append(slug)
+                changed.add(position)
+            for slug, (health, poison), _ in delta.stats:
+                store.health[slug._index] = health
+                store.poison[slug._index] = poison
+            for slug, position, order, new_position, _ in \
+                    reversed(delta.moves):
+                store.positions[slug._index] = position
+                store.order[slug._index] = order
+                changed.update((position, new_position))
+        else:
+            for slug, position, _, new_position, order in delta.moves:
+                store.positions[slug._index] = new_position
+                store.order[slug._index] = order
+                changed.update((position, new_position))
+            for slug, _, (health, poison) in delta.stats:
+                store.health[slug._index] = health
+                store.poison[slug._index] = poison
+            dead = set()
+            for slug, position, *_ in delta.deaths:
+                store.release(slug._index)
+                dead.add(id(slug))
+                changed.add(position)
+            if dead:
+                slugs = [slug for slug in slugs if id(slug) not in dead]
+            for position, _, after in delta.weapons:
+                self.get_tile(position).set_weapon(after)
+        store.clock = delta.clock[side]
+        if slugs is not None:
+            self._rebuild_slugs(slugs, changed)
+        self._reschedule()  # turn counts were rewound or replayed
+        self._find_attack_reach()
+        if delta.player is not None:
+            (position, self._prev_player_position,
+             self._player._current_health, self._player._poison_stat,
+             self._player._weapon) = delta.player[side]
+            self._set_player_position(position)
+            if self._fov is not None:
+                self._fov.update(position, self._blocks_sight)
+        # Replaying a turn that ended the game reports the win or loss again
+        self._ended = self.has_won() or self.has_lost()
+
+    def _rebuild_slugs(self, slugs: list[Slug], changed: set) -> None:
+        """Rebuild _slugs from the store rows of `slugs`, in store order,
+        and update the occupancy bitmap at the `changed` positions"""
+        store = self._store
+        slugs.sort(key=lambda slug: store.order[slug._index])
+        self._slugs = {store.positions[slug._index]: slug for slug in slugs}
+        occupied = self._occupied
+        if occupied is not None:
+            for position in changed:
+                cell = self.get_cell_index(position)
+                if position in self._slugs:
+                    occupied[cell] |= SLUG_CELL
+                else:
+                    occupied[cell] &= ~SLUG_CELL
+
+    def _reschedule(self) -> None:
+        """File every slug under its next turn to move"""
+        scheduler = self._scheduler
+        scheduler.clear()
+        for slug in self._slugs.values():
+            scheduler.schedule(slug)
+
+    def _set_player_position(self, position: tuple[int, int]) -> None:
+        """Move the player, keeping the occupancy bitmap in sync"""
+        occupied = self._occupied
+        if occupied is not None:
+            occupied[self.get_cell_index(self._player_position)] &= \
+                ~PLAYER_CELL
+            occupied[self.get_cell_index(position)] |= PLAYER_CELL
+        self._player_position = position
+
+    def _move_slug(self, slug: Slug, position: tuple[int, int],
+                   new_position: tuple[int, int]) -> None:
+        """Move a slug, re-inserting it at the end of _slugs like a fresh
+        placement, and keep the store and occupancy bitmap in sync"""
+        del self._slugs[position]
+        self._slugs[new_position] = slug
+        store = self._store
+        if self._journal is not None:
+            self._journal.moves.append((slug, position,
+                                        store.order[slug._index],
+                                        new_position, self._next_order))
+        store.positions[slug._index] = new_position
+        store.order[slug._index] = self._next_order
+        self._next_order += 1
+        occupied = self._occupied
+        if occupied is not None:
+            occupied[self.get_cell_index(position)] &= ~SLUG_CELL
+            occupied[self.get_cell_index(new_position)] |= SLUG_CELL
+
+    def _set_tile_weapon(self, position: tuple[int, int],
+                         weapon: Optional[Weapon]) -> None:
+        """Put a weapon on a tile, or take it off with None"""
+        tile = self.get_tile(position)
+        if self._journal is not None:
+            self._journal.weapons.append((position, tile.get_weapon(),
+                                          weapon))
+        tile.set_weapon(weapon)
+
+    def _remove_slug(self, position: tuple[int, int]) -> None:
+        """Remove a dead slug from the map and free its store row"""
+        slug = self._slugs.pop(position)
+        store, index = self._store, slug._index
+        if self._journal is not None:
+            # Its HP and poison before the turn, if the turn changed them
+            _, health, poison = store.journal.pop(
+                index, (slug, store.health[index], store.poison[index]))
+            self._journal.deaths.append(
+                (slug, position, store.order[index], store.turn_count[index],
+                 store.max_health[index], health, poison,
+                 store.weapons[index]))
+        store.release(index)
+        if self._occupied is not None:
+            self._occupied[self.get_cell_index(position)] &= ~SLUG_CELL
+
+    def is_valid_cell(self, cell: int) -> bool:
+        """Packed-index version of `is_valid_position`, on maps with cell
+        tables. `cell` must be on the map."""
+        return (self._passable[cell] == 1
+                and not self._occupied[cell] & SLUG_CELL)
+
+    def is_valid_position(self, position: tuple[int, int]) -> bool:
+        row, col = position
+        if self._occupied is not None:
+            return (0 <= row < self._rows and 0 <= col < self._cols
+                    and self.is_valid_cell(row * self._cols + col))
+        max_row, max_col = self.get_dimensions()
+        return (0 <= row < max_row and 0 <= col < max_col and
+                not self.get_tile(position).is_blocking() and
+                position not in self._slugs)
+
+    def clone(self) -> "SlugDungeonModel":
+        """
+        Returns an independent copy of the game state, e.g. to play
+        rollouts from it. Weapons hold no state, so they are shared, and so
+        are the read-only terrain tables. Slugs are copied with copy.copy, so
+        any attributes a slug type adds are shared with the original.
+
+        Raises:
+            TypeError: If the map is not a list of rows (e.g. a chunked map).
+        """
+        if not isinstance(self._tiles, list):
+            raise TypeError("Only maps given as a list of rows can be cloned")
+        tiles = []
+        for tile_row in self._tiles:
+            row = []
+            for tile in tile_row:
+                clone = Tile(tile._symbol, tile._is_blocking)
+                clone._weapon = tile._weapon
+                row.append(clone)
+            tiles.append(row)
+
+        player = Player(self._player._max_health)
+        _copy_stats(self._player, player)
+        # Slugs are shallow copies, so registered types whose constructor
+        # takes arguments clone too; the new model adopts their stats
+        slugs = {position: snapshot_slug(slug)
+                 for position, slug in self._slugs.items()}
+
+        cell_tables = None if self._passable is None \
+            else (self._passable, self._neighbour_masks)
+        model = SlugDungeonModel(tiles, slugs, player, self._player_position,
+                                 cell_tables)
+        model._prev_player_position = self._prev_player_position
+        model._ended = self._ended
+        model.set_two_phase_moves(self._two_phase, self._executor)
+        if self._fov is not None:
+            model._fov = self._fov.copy()
+        return model
+
+    def has_won(self) -> bool:
+        return not self._slugs and self.get_tile(self._player_position).__str__() == "G"
+
+    def has_lost(self) -> bool:
+        return not self._player.is_alive()
+
+
+def _player_state(model: SlugDungeonModel) -> tuple:
+    """The player values a turn can change, for undo"""
+    player = model._player
+    return (model._player_position, model._prev_player_position,
+            player._current_health, player._poison_stat, player._weapon)
+
+
+def _copy_stats(source: Entity, target: Entity) -> None:
+    """Copy health, poison and weapon from one entity to another"""
+    target._max_health = source._max_health
+    target._current_health = source._current_health
+    target._poison_stat = source._poison_stat
+    target._weapon = source._weapon
+
+
+"""
+4.1.14 load level(filename: str) -> SlugDungeonModel
+"""
+
+
+def load_level(filename: str) -> SlugDungeonModel:
+    """
+    Load the game level from the given file and create the
+    corresponding map model.
+
+    This function will read the level data from the specified file, generate
+    tiles, players and various Slug enemies on the map based on the symbols in
+    the file, and finally return a complete `SlugDungeonModel`
+
+    File format:
+    - The first line contains the player's maximum health.
+    - Starting from the second line, each line represents a line of the map,
+      and the corresponding map elements are generated based on the symbols:
+        - "#"：Wall tiles (blocking).
+        - "G"：Target tile (not blocking).
+        - "P"：The player's position.
+        - "A"：Generate AngrySlug.
+        - "N"：Generate NiceSlug.
+        - "L"：Generate ScaredSlug.
+        - Other symbols: Use the `create_tile` function to generate
+          corresponding tiles.
+
+    parameter:
+        filename (str): The path to the file containing the level data.
+
+    Return value:
+        SlugDungeonModel: Returns a model containing map tiles, slug enemies,
+        players, and player positions.
+    """
+    if _metrics is None:
+        return parse_level(read_level(filename))
+    started = perf_counter()
+    model = parse_level(read_level(filename))
+    _metrics.record_load(perf_counter() - started)
+    return model
+
+
+def read_level(filename: str) -> list[str]:
+    """
+    Read the raw lines of a level file, without building any game objects.
+
+    The returned lines can be passed to `parse_level` as many times as
+    needed, e.g. to restart a level without touching the file system again.
+
+    parameter:
+        filename (str): The path to the file containing the level data.
+
+    Return value:
+        list[str]: The lines of the level file, including line endings.
+    """
+    with open(filename, 'r') as file:
+        return file.readlines()
+
+
+def parse_level(lines: list[str]) -> SlugDungeonModel:
+    """
+    Build a fresh `SlugDungeonModel` from the lines of a level file.
+
+    See `load_level` for the file format. Every call creates new tiles,
+    weapons and entities, so the lines can be reused to restart a level.
+
+    parameter:
+        lines (list[str]): The lines of a level file, as returned by
+        `read_level`.
+
+    Return value:
+        SlugDungeonModel: A new model in the level's starting state.
+    """
+    tiles = []
+    slugs = {}
+    player = None
+    player_position = None
+
+    # The first line provides the player's max_health
+    player_max_health = int(lines[0].strip())
+    player = Player(player_max_health)
+
+    """
+    Starting from the second line, 
+    parse the map and check the positions of weapons and entities
+    """
+    for row_index, line in enumerate(lines[1:]):
+        tile_row = []
+        for col_index, symbol in enumerate(line.strip('\n')):
+            position = (row_index, col_index)
+
+            slug_type = SLUG_TYPES.get(symbol)
+            if slug_type is not None:
+                slugs[position] = slug_type()
+                symbol = FLOOR_TILE  # slugs stand on floor
+            elif symbol == PLAYER_SYMBOL:
+                player_position = position
+                symbol = FLOOR_TILE
+
+            # Terrain and weapons; unknown symbols become floor
+            tile_row.append(create_tile(symbol))
+        tiles.append(tile_row)
+
+    return SlugDungeonModel(tiles, slugs, player, player_position)
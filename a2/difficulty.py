@@ -0,0 +1,285 @@
+"""
+Monte Carlo difficulty estimate for levels.
+
+Plays many rollouts of a level with a stochastic player policy, in parallel
+worker processes, each rollout starting from a `clone()` of the level's
+starting model. Reports the win rate, the distribution of turns to win,
+the HP left at the end of won games and the damage dealt by each slug,
+with 95% confidence intervals. Rollouts are played in rounds, and stop as
+soon as the win rate interval is narrower than the tolerance.
+
+The policy attacks when a slug is in weapon range, and otherwise walks a
+shortest path towards a weapon (while it has none that harms slugs), a cell
+from which a slug is in range, or the goal once every slug is dead. It
+takes a random action with probability `epsilon`.
+
+Usage:
+    python difficulty.py LEVEL [--jobs N] [--tolerance T] [--max-rollouts N]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from constants import GOAL_TILE
+from core import (SlugDungeonModel, ACTIONS, ACTION_DELTAS, ATTACK_KEY,
+                  load_level)
+from savestate import encode_state, decode_state
+
+
+EPSILON = 0.2  # probability of a random action
+MAX_TURNS = 300  # rollouts longer than this count as losses
+BATCH_SIZE = 32  # rollouts per task handed to a worker
+MIN_ROLLOUTS = 256
+MAX_ROLLOUTS = 20000
+TOLERANCE = 0.02  # stop once the win rate is known within +/- this
+Z_95 = 1.959964  # normal quantile of a two-sided 95% interval
+
+# The level being estimated, decoded once per worker process
+_worker_state: Optional[bytes] = None
+_worker_model: Optional[SlugDungeonModel] = None
+
+
+def play_rollout(model: SlugDungeonModel, rng: random.Random,
+                 epsilon: float = EPSILON, max_turns: int = MAX_TURNS,
+                 labels: Optional[dict[int, str]] = None) -> dict:
+    """
+    Play one game on `model` (which is modified) until it is won, lost or
+    `max_turns` turns were played.
+
+    parameter:
+        labels (Optional[dict[int, str]]): Names for the slugs in damage
+        reports, keyed by id(slug). By default slugs are named after their
+        symbol and position at the start of the rollout.
+
+    Return value:
+        dict: "won", "turns", "health" (left at the end) and "damage", the
+        damage and poison dealt to the player by each slug.
+    """
+    if labels is None:
+        labels = {id(slug): f"{slug.get_symbol()}@{row},{col}"
+                  for (row, col), slug in model.get_slugs().items()}
+    damage: dict[str, int] = {}
+    player = model.get_player()
+    turns = 0
+    while turns < max_turns and not model.has_won() and not model.has_lost():
+        if rng.random() < epsilon:
+            key = rng.choice(ACTIONS)
+        else:
+            key = _policy_key(model)
+        if not model.handle_action(key):
+            continue  # blocked moves do not play a turn
+        turns += 1
+        # Attribute this turn's slug attacks geometrically: every slug with
+        # the player in weapon range after the turn hit them
+        position = model.get_player_position()
+        for slug_position, slug in model.get_slugs().items():
+            if position in slug.get_weapon_targets(slug_position):
+                effect = slug.get_weapon_effect()
+                dealt = effect.get("damage", 0) + effect.get("poison", 0)
+                if dealt:
+                    label = labels.get(id(slug), slug.get_name())
+                    damage[label] = damage.get(label, 0) + dealt
+    return {"won": model.has_won(), "turns": turns,
+            "health": player.get_health(), "damage": damage}
+
+
+def _policy_key(model: SlugDungeonModel) -> str:
+    """The greedy action: attack a slug in range; else walk to a weapon if
+    the player has none that harms slugs; else towards a cell from which a
+    slug is in range; else, once every slug is dead, towards the goal."""
+    position = model.get_player_position()
+    slugs = model.get_slugs()
+    weapon = model.get_player().get_weapon()
+    harmful = weapon is not None and ("damage" in weapon.get_effect()
+                                      or "poison" in weapon.get_effect())
+    if harmful and any(target in slugs
+                       for target in weapon.get_targets(position)):
+        return ATTACK_KEY
+
+    goals: set[tuple[int, int]] = set()
+    if slugs and not harmful:
+        goals = {(row, col) for row, tile_row in enumerate(model.get_tiles())
+                 for col, tile in enumerate(tile_row)
+                 if tile.get_weapon() is not None
+                 and "healing" not in tile.get_weapon().get_effect()}
+    if slugs and not goals and weapon is not None:
+        # Weapon ranges are symmetric: the cells a slug could hit are the
+        # cells from which it can be hit
+        goals = {target for slug_position in slugs
+                 for target in weapon.get_targets(slug_position)}
+    if not slugs:
+        goals = {(row, col) for row, tile_row in enumerate(model.get_tiles())
+                 for col, tile in enumerate(tile_row)
+                 if tile.get_symbol() == GOAL_TILE}
+    return _first_step(model, position, goals) or ATTACK_KEY
+
+
+def _first_step(model: SlugDungeonModel, start: tuple[int, int],
+                goals: set[tuple[int, int]]) -> Optional[str]:
+    """Breadth-first search from `start` to the nearest of `goals`, returning
+    the key of the first step, or None if none can be reached."""
+    if start in goals:
+        return None
+    first: dict[tuple[int, int], Optional[str]] = {start: None}
+    queue = deque([start])
+    while queue:
+        row, col = queue.popleft()
+        for key, (dr, dc) in ACTION_DELTAS.items():
+            position = (row + dr, col + dc)
+            if position in first or not model.is_valid_position(position):
+                continue
+            first[position] = first[(row, col)] or key
+            if position in goals:
+                return first[position]
+            queue.append(position)
+    return None
+
+
+def _run_batch(state: bytes, seeds: list[int], epsilon: float,
+               max_turns: int) -> list[dict]:
+    """Worker task: play one rollout per seed from the encoded state"""
+    global _worker_state, _worker_model
+    if state != _worker_state:
+        _worker_model, _ = decode_state(state)
+        _worker_state = state
+    labels = {id(slug): f"{slug.get_symbol()}@{row},{col}"
+              for (row, col), slug in _worker_model.get_slugs().items()}
+    results = []
+    for seed in seeds:
+        model = _worker_model.clone()
+        # Clones list their slugs in the same order as the original
+        clone_labels = {id(copy): labels[id(slug)] for copy, slug in
+                        zip(model.get_slugs().values(),
+                            _worker_model.get_slugs().values())}
+        results.append(play_rollout(model, random.Random(seed), epsilon,
+                                    max_turns, clone_labels))
+    return results
+
+
+def wilson_interval(successes: int, trials: int) -> tuple[float, float]:
+    """95% Wilson score interval of a binomial proportion"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + Z_95 ** 2 / trials
+    centre = (p + Z_95 ** 2 / (2 * trials)) / denominator
+    half = Z_95 * math.sqrt(p * (1 - p) / trials
+                            + Z_95 ** 2 / (4 * trials ** 2)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def mean_interval(values: list[float]) -> Optional[dict]:
+    """Mean of `values` with its 95% normal confidence interval. A single
+    value has no interval: its bounds are None, which stays valid JSON."""
+    if not values:
+        return None
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return {"mean": mean, "low": None, "high": None}
+    half = Z_95 * statistics.stdev(values) / math.sqrt(len(values))
+    return {"mean": mean, "low": mean - half, "high": mean + half}
+
+
+def summarize(results: list[dict]) -> dict:
+    """Aggregate rollout results into the difficulty report"""
+    count = len(results)
+    wins = [result for result in results if result["won"]]
+    low, high = wilson_interval(len(wins), count)
+    win_turns = sorted(result["turns"] for result in wins)
+    quantiles = statistics.quantiles(win_turns, n=10) \
+        if len(win_turns) > 1 else win_turns * 9
+
+    slugs = sorted({label for result in results
+                    for label in result["damage"]})
+    damage = {label: mean_interval([result["damage"].get(label, 0)
+                                    for result in results])
+              for label in slugs}
+    return {
+        "rollouts": count,
+        "win_rate": {"mean": len(wins) / count if count else 0.0,
+                     "low": low, "high": high},
+        "difficulty": 1 - len(wins) / count if count else 1.0,
+        "turns_to_win": {
+            **(mean_interval(win_turns) or {}),
+            "p10": quantiles[0] if quantiles else None,
+            "p50": quantiles[4] if quantiles else None,
+            "p90": quantiles[8] if quantiles else None,
+        },
+        "health_left_on_win": mean_interval([result["health"]
+                                             for result in wins]),
+        # Slugs ordered from most to least damage per rollout
+        "damage_per_rollout": dict(sorted(
+            damage.items(), key=lambda item: -item[1]["mean"])),
+    }
+
+
+def estimate(model: SlugDungeonModel, jobs: Optional[int] = None,
+             tolerance: float = TOLERANCE, min_rollouts: int = MIN_ROLLOUTS,
+             max_rollouts: int = MAX_ROLLOUTS, epsilon: float = EPSILON,
+             max_turns: int = MAX_TURNS, seed: int = 0) -> dict:
+    """
+    Estimate the difficulty of the game state `model` (not modified).
+
+    Rollouts are played in rounds of one batch per worker until at least
+    `min_rollouts` were played and the win rate interval is within
+    +/- `tolerance`, or `max_rollouts` were played.
+
+    Return value:
+        dict: The report of `summarize`, plus whether it "converged".
+    """
+    state = encode_state(model)
+    rng = random.Random(seed)
+    results: list[dict] = []
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(jobs) as pool:
+        while len(results) < max_rollouts:
+            batches = []
+            for _ in range(0, min(jobs * BATCH_SIZE,
+                                  max_rollouts - len(results)), BATCH_SIZE):
+                seeds = [rng.getrandbits(64) for _ in range(BATCH_SIZE)]
+                batches.append(pool.submit(_run_batch, state, seeds,
+                                           epsilon, max_turns))
+            for batch in batches:
+                results.extend(batch.result())
+            if len(results) >= min_rollouts and _converged(results,
+                                                           tolerance):
+                break
+    report = summarize(results)
+    report["converged"] = _converged(results, tolerance)
+    return report
+
+
+def _converged(results: list[dict], tolerance: float) -> bool:
+    low, high = wilson_interval(sum(result["won"] for result in results),
+                                len(results))
+    return (high - low) / 2 <= tolerance
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("level")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--max-rollouts", type=int, default=MAX_ROLLOUTS)
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument("--epsilon", type=float, default=EPSILON)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = estimate(load_level(args.level), args.jobs, args.tolerance,
+                      max_rollouts=args.max_rollouts, epsilon=args.epsilon,
+                      max_turns=args.max_turns, seed=args.seed)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Gym-style environment API for headless agents.
+
+`SlugDungeonEnv` wraps a single game with `reset`/`step`, and
+`VectorSlugDungeonEnv` steps K games in one call, writing observations,
+rewards and done flags into preallocated batch arrays.
+
+Actions are integers indexing `ACTIONS`, which map onto the same keys as
+`SlugDungeon.handle_key_press` (w/a/s/d move, space attacks in place).
+
+Observations are flat `array('b')` grids of length rows * cols (row-major),
+with one cell code per position (see `cell_codes`).
+"""
+from array import array
+from typing import Optional, Sequence, Union
+
+from constants import PLAYER_SYMBOL, WALL_TILE
+from core import (SlugDungeonModel, ACTIONS, SLUG_TYPES, TILE_TYPES,
+                  WEAPON_TYPES, read_level, parse_level)
+
+WIN_REWARD = 1.0
+LOSS_REWARD = -1.0
+STEP_REWARD = 0.0
+
+
+def cell_codes() -> dict[str, int]:
+    """
+    The cell code of each registered symbol (see `register_tile`,
+    `register_weapon` and `register_slug` in core.py): terrain symbols, then
+    weapons, the player and slugs, each in the order they were registered.
+    Entities are drawn over terrain, and weapons over the tile they lie on.
+
+    With only the built-in symbols these are floor 0, wall 1, goal 2,
+    PoisonDart 3, PoisonSword 4, HealingRock 5, player 6, AngrySlug 7,
+    NiceSlug 8 and ScaredSlug 9. Environments take the codes when they are
+    created, so register symbols before creating them.
+    """
+    symbols = [*TILE_TYPES, *WEAPON_TYPES, PLAYER_SYMBOL, *SLUG_TYPES]
+    return {symbol: code for code, symbol in enumerate(symbols)}
+
+
+class SlugDungeonEnv:
+    """
+    A single Slug Dungeon game with a `reset`/`step` interface.
+
+    The level is parsed once into a template that is never played; `reset`
+    clones it and copies its encoded terrain, so restarting neither touches
+    the disk nor parses the level again.
+
+    Attribute:
+        model (SlugDungeonModel): The game currently being played.
+        observation (array): Flat row-major grid of cell codes, reused
+        between steps.
+        steps (int): Number of steps taken since the last reset.
+
+    Methods:
+        reset() -> array: Restart the level and return the first observation.
+        step(action) -> tuple: Play one action and return
+        (observation, reward, done, info).
+    """
+    def __init__(self, level: Union[str, list[str]],
+                 max_steps: Optional[int] = None) -> None:
+        """
+        parameter:
+            level (str | list[str]): A level file name, or the lines of a
+            level as returned by `read_level`.
+            max_steps (Optional[int]): End the episode after this many steps,
+            None for no limit.
+        """
+        lines = read_level(level) if isinstance(level, str) else level
+        self._max_steps = max_steps
+        self._template = parse_level(lines)
+        self._codes = cell_codes()
+        self._start_terrain = _encode_terrain(self._template, self._codes)
+        self._cols = self._template.get_dimensions()[1]
+        self.model = self._template.clone()
+        self._terrain = array("b", self._start_terrain)
+        self.observation = array("b", self._terrain)
+        self.steps = 0
+
+    def get_dimensions(self) -> tuple[int, int]:
+        """Returns the (#rows, #columns) of the observation grid."""
+        return self.model.get_dimensions()
+
+    def reset(self) -> array:
+        """Restart the level from the template and return the first
+        observation."""
+        self.model = self._template.clone()
+        self._terrain[:] = self._start_terrain
+        self.steps = 0
+        _write_observation(self.model, self._codes, self._terrain,
+                           self._cols, self.observation, 0)
+        return self.observation
+
+    def step(self, action: int) -> tuple[array, float, bool, dict]:
+        """
+        Play one action.
+
+        parameter:
+            action (int): Index into `ACTIONS`.
+
+        Return value:
+            tuple: (observation, reward, done, info). `info["played"]` is
+            False when the action was a blocked move and no turn passed.
+        """
+        played, reward, done = _play(self.model, self._codes, self._terrain,
+                                     self._cols, action)
+        self.steps += 1
+        truncated = (self._max_steps is not None
+                     and self.steps >= self._max_steps)
+        _write_observation(self.model, self._codes, self._terrain,
+                           self._cols, self.observation, 0)
+        info = {"played": played, "won": self.model.has_won(),
+                "lost": self.model.has_lost(), "truncated": truncated}
+        return self.observation, reward, done or truncated, info
+
+
+class VectorSlugDungeonEnv:
+    """
+    K independent Slug Dungeon games stepped together.
+
+    All games share one observation shape, (#rows, #columns) of the largest
+    level, with smaller levels padded with walls. Results are written into
+    preallocated arrays that are returned from every call:
+
+        observations: array('b') of K * rows * cols cell codes
+        rewards: array('d') of K rewards
+        dones: array('B') of K done flags
+
+    Finished games are reset automatically at the end of `step`, by cloning
+    a template of their level parsed once, so `observations` already holds
+    the first state of the next episode for those games.
+
+    Methods:
+        reset() -> array: Restart every game and return the observations.
+        step(actions) -> tuple: Play one action per game and return
+        (observations, rewards, dones).
+    """
+    def __init__(self, levels: Sequence[Union[str, list[str]]],
+                 max_steps: Optional[int] = None) -> None:
+        """
+        parameter:
+            levels (Sequence[str | list[str]]): One level per game, as a file
+            name or the lines of a level. Repeat a level to run it K times;
+            each distinct file is only read once.
+            max_steps (Optional[int]): End an episode after this many steps,
+            None for no limit.
+        """
+        # One template per distinct level: a file name or a lines object
+        cache = {}
+        self._templates = []
+        for level in levels:
+            key = level if isinstance(level, str) else id(level)
+            if key not in cache:
+                cache[key] = parse_level(read_level(level)
+                                         if isinstance(level, str) else level)
+            self._templates.append(cache[key])
+
+        self._max_steps = max_steps
+        self.models = [template.clone() for template in self._templates]
+        self.num_envs = len(self.models)
+        self.rows = max(model.get_dimensions()[0] for model in self.models)
+        self.cols = max(model.get_dimensions()[1] for model in self.models)
+        self._cells = self.rows * self.cols
+
+        # The starting terrain of each template, and each game's own copy
+        self._codes = cell_codes()
+        start_terrain = {id(template): _encode_terrain(template, self._codes,
+                                                       self.rows, self.cols)
+                         for template in self._templates}
+        self._start_terrain = [start_terrain[id(template)]
+                               for template in self._templates]
+        self._terrain = [array("b", terrain)
+                         for terrain in self._start_terrain]
+        self.steps = array("L", [0]) * self.num_envs
+        self.observations = array("b", [0]) * (self.num_envs * self._cells)
+        self.rewards = array("d", [0.0]) * self.num_envs
+        self.dones = array("B", [0]) * self.num_envs
+
+    def reset(self) -> array:
+        """Restart every game and return the batch of observations."""
+        for index in range(self.num_envs):
+            self._reset_game(index)
+        for index in range(self.num_envs):
+            self.rewards[index] = 0.0
+            self.dones[index] = 0
+        return self.observations
+
+    def step(self, actions: Sequence[int]) -> tuple[array, array, array]:
+        """
+        Play one action in every game.
+
+        parameter:
+            actions (Sequence[int]): K indices into `ACTIONS`.
+
+        Return value:
+            tuple: (observations, rewards, dones), the preallocated batch
+            arrays of this environment.
+        """
+        max_steps = self._max_steps
+        codes = self._codes
+        for index, model in enumerate(self.models):
+            terrain = self._terrain[index]
+            _, reward, done = _play(model, codes, terrain, self.cols,
+                                    actions[index])
+            self.steps[index] += 1
+            if max_steps is not None and self.steps[index] >= max_steps:
+                done = True
+            self.rewards[index] = reward
+            self.dones[index] = done
+            if done:
+                self._reset_game(index)
+            else:
+                _write_observation(model, codes, terrain, self.cols,
+                                   self.observations, index * self._cells)
+        return self.observations, self.rewards, self.dones
+
+    def _reset_game(self, index: int) -> None:
+        """Restart game `index` from a clone of its level's template."""
+        model = self._templates[index].clone()
+        self.models[index] = model
+        self._terrain[index][:] = self._start_terrain[index]
+        self.steps[index] = 0
+        _write_observation(model, self._codes, self._terrain[index],
+                           self.cols, self.observations, index * self._cells)
+
+
+def _play(model: SlugDungeonModel, codes: dict[str, int], terrain: array,
+          cols: int, action: int) -> tuple[bool, float, bool]:
+    """Play `action` on `model` and keep the weapon layer of `terrain` in
+    sync. Returns (played, reward, done)."""
+    # Weapons only change where the player steps (pickup) and where a slug
+    # dies (drop), so only those cells need re-encoding after the turn.
+    touched = list(model.get_slugs())
+    played = model.handle_action(ACTIONS[action])
+    if played:
+        touched.append(model.get_player_position())
+        tiles = model.get_tiles()
+        for row, col in touched:
+            terrain[row * cols + col] = _encode_tile(tiles[row][col], codes)
+
+    if model.has_lost():
+        return played, LOSS_REWARD, True
+    if model.has_won():
+        return played, WIN_REWARD, True
+    return played, STEP_REWARD, False
+
+
+def _encode_tile(tile, codes: dict[str, int]) -> int:
+    """Returns the cell code of a tile and the weapon lying on it."""
+    weapon = tile.get_weapon()
+    if weapon is not None:
+        return codes[weapon.get_symbol()]
+    return codes[tile.get_symbol()]
+
+
+def _encode_terrain(model: SlugDungeonModel, codes: dict[str, int],
+                    rows: Optional[int] = None,
+                    cols: Optional[int] = None) -> array:
+    """Encode tiles and weapons of `model` into a flat grid of cell codes,
+    padding with walls up to (rows, cols)."""
+    model_rows, model_cols = model.get_dimensions()
+    rows = model_rows if rows is None else rows
+    cols = model_cols if cols is None else cols
+    terrain = array("b", [codes[WALL_TILE]]) * (rows * cols)
+    for row, tile_row in enumerate(model.get_tiles()):
+        offset = row * cols
+        for col, tile in enumerate(tile_row):
+            terrain[offset + col] = _encode_tile(tile, codes)
+    return terrain
+
+
+def _write_observation(model: SlugDungeonModel, codes: dict[str, int],
+                       terrain: array, cols: int, out: array,
+                       offset: int) -> None:
+    """Write the observation of `model` into `out` starting at `offset`,
+    using `cols` as the row stride of the (possibly padded) grid."""
+    out[offset:offset + len(terrain)] = terrain
+    for (row, col), slug in model.get_slugs().items():
+        out[offset + row * cols + col] = codes[slug.get_symbol()]
+    row, col = model.get_player_position()
+    out[offset + row * cols + col] = codes[PLAYER_SYMBOL]
@@ -0,0 +1,92 @@
+"""
+Events emitted by SlugDungeonModel as a turn is played.
+
+Subscribe with `SlugDungeonModel.subscribe(callback)`; at the end of every
+turn the callback is called once as `callback(model, events)` with the
+list of events of that turn, in the order they happened. While nobody is
+subscribed, no events are built at all.
+
+Entities are the model's own Player and Slug objects, and positions are
+(row, col) tuples.
+"""
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class Moved(NamedTuple):
+    """The player or a slug changed cell"""
+    entity: Any
+    old_position: tuple[int, int]
+    new_position: tuple[int, int]
+
+
+class Damaged(NamedTuple):
+    """An entity lost `amount` HP, from an attack or from poison"""
+    entity: Any
+    position: tuple[int, int]
+    amount: int
+
+
+class Healed(NamedTuple):
+    """An entity gained `amount` HP"""
+    entity: Any
+    position: tuple[int, int]
+    amount: int
+
+
+class Poisoned(NamedTuple):
+    """An entity's poison went up by `amount`"""
+    entity: Any
+    position: tuple[int, int]
+    amount: int
+
+
+class Died(NamedTuple):
+    """A slug died and was removed from the map"""
+    entity: Any
+    position: tuple[int, int]
+
+
+class WeaponDropped(NamedTuple):
+    """A dying slug left its weapon on its tile"""
+    weapon: Any
+    position: tuple[int, int]
+
+
+class WeaponPickedUp(NamedTuple):
+    """The player equipped the weapon lying on their new tile"""
+    entity: Any
+    weapon: Any
+    position: tuple[int, int]
+
+
+class Won(NamedTuple):
+    """The turn won the game; turns played after that do not repeat it"""
+
+
+class Lost(NamedTuple):
+    """The turn lost the game; turns played after that do not repeat it"""
+
+
+Event = Any  # one of the event types above
+Subscriber = Callable[[Any, list[Event]], None]
+
+
+def health_events(entity: Any, position: tuple[int, int], health: int,
+                  poison: int, events: list[Event],
+                  new_health: Optional[int] = None,
+                  new_poison: Optional[int] = None) -> None:
+    """
+    Append the Damaged, Healed and Poisoned events for an entity whose HP
+    and poison were `health` and `poison` before an effect was applied.
+    The new values default to the entity's current ones.
+    """
+    if new_health is None:
+        new_health = entity.get_health()
+    if new_poison is None:
+        new_poison = entity.get_poison()
+    if new_health < health:
+        events.append(Damaged(entity, position, health - new_health))
+    elif new_health > health:
+        events.append(Healed(entity, position, new_health - health))
+    if new_poison > poison:
+        events.append(Poisoned(entity, position, new_poison - poison))
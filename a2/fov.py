@@ -0,0 +1,130 @@
+"""
+Field of view for the fog-of-war mode.
+
+Visibility is computed with symmetric shadowcasting (Albert Ford's variant
+of the classic algorithm): a cell is visible from the player exactly when
+the player is visible from that cell, walls stop sight, and light does not
+leak through diagonal gaps. Results are kept as row bitsets, a dict from row
+to an int whose bit `col` is set when (row, col) is visible, so the cost of
+an update is proportional to the area within the radius, not to the map.
+"""
+import math
+from fractions import Fraction
+from typing import Callable
+
+
+class FieldOfView:
+    """
+    The cells the player currently sees, and all cells seen so far.
+
+    Attribute:
+        radius (int): How far the player can see, in cells.
+
+    Methods:
+        update(origin, is_blocking) -> None: Recompute visibility from a new
+        player position.
+        is_visible(position) -> bool: Whether a cell is currently in sight.
+        is_seen(position) -> bool: Whether a cell has ever been in sight.
+        get_visible() -> dict[int, int]: The visible row bitsets.
+        get_seen() -> dict[int, int]: The remembered row bitsets.
+        copy() -> FieldOfView: An independent copy.
+    """
+    def __init__(self, radius: int) -> None:
+        self.radius = radius
+        self._visible: dict[int, int] = {}
+        self._seen: dict[int, int] = {}
+
+    def is_visible(self, position: tuple[int, int]) -> bool:
+        row, col = position
+        return col >= 0 and (self._visible.get(row, 0) >> col) & 1 == 1
+
+    def is_seen(self, position: tuple[int, int]) -> bool:
+        row, col = position
+        return col >= 0 and (self._seen.get(row, 0) >> col) & 1 == 1
+
+    def get_visible(self) -> dict[int, int]:
+        return self._visible
+
+    def get_seen(self) -> dict[int, int]:
+        return self._seen
+
+    def copy(self) -> "FieldOfView":
+        fov = FieldOfView(self.radius)
+        fov._visible = dict(self._visible)
+        fov._seen = dict(self._seen)
+        return fov
+
+    def update(self, origin: tuple[int, int],
+               is_blocking: Callable[[int, int], bool]) -> None:
+        """
+        Recompute the visible cells around `origin` and remember them.
+
+        parameter:
+            origin (tuple[int, int]): The (row, col) the player sees from.
+            is_blocking (Callable[[int, int], bool]): Whether the cell at
+            (row, col) blocks sight. Must be True outside the map.
+        """
+        visible: dict[int, int] = {}
+
+        def reveal(row: int, col: int) -> None:
+            if col >= 0:  # cells left of the map are never visible
+                visible[row] = visible.get(row, 0) | (1 << col)
+
+        origin_row, origin_col = origin
+        reveal(origin_row, origin_col)
+        for transform in _quadrants(origin_row, origin_col):
+            _scan_quadrant(transform, is_blocking, reveal, self.radius)
+
+        self._visible = visible
+        seen = self._seen
+        for row, bits in visible.items():
+            seen[row] = seen.get(row, 0) | bits
+
+
+def _quadrants(origin_row: int, origin_col: int) -> list[Callable]:
+    """Returns functions mapping (depth, col) within each of the four
+    quadrants (north, south, east, west) to a (row, col) map position."""
+    return [
+        lambda depth, col: (origin_row - depth, origin_col + col),
+        lambda depth, col: (origin_row + depth, origin_col + col),
+        lambda depth, col: (origin_row + col, origin_col + depth),
+        lambda depth, col: (origin_row + col, origin_col - depth),
+    ]
+
+
+def _scan_quadrant(transform: Callable, is_blocking: Callable,
+                   reveal: Callable, radius: int) -> None:
+    """Shadowcast one quadrant, row by row, up to `radius` rows deep."""
+    radius_squared = radius * radius
+    # Rows still to scan, as (depth, start slope, end slope)
+    rows = [(1, Fraction(-1), Fraction(1))]
+    while rows:
+        depth, start_slope, end_slope = rows.pop()
+        if depth > radius:
+            continue
+        min_col = _round_ties_up(depth * start_slope)
+        max_col = _round_ties_down(depth * end_slope)
+        prev_wall = None  # None before the first cell of the row
+        for col in range(min_col, max_col + 1):
+            row, map_col = transform(depth, col)
+            wall = is_blocking(row, map_col)
+            symmetric = depth * start_slope <= col <= depth * end_slope
+            if ((wall or symmetric)
+                    and depth * depth + col * col <= radius_squared):
+                reveal(row, map_col)
+            if prev_wall is True and not wall:
+                start_slope = Fraction(2 * col - 1, 2 * depth)
+            if prev_wall is False and wall:
+                rows.append((depth + 1, start_slope,
+                             Fraction(2 * col - 1, 2 * depth)))
+            prev_wall = wall
+        if prev_wall is False:
+            rows.append((depth + 1, start_slope, end_slope))
+
+
+def _round_ties_up(value: Fraction) -> int:
+    return math.floor(value + Fraction(1, 2))
+
+
+def _round_ties_down(value: Fraction) -> int:
+    return math.ceil(value - Fraction(1, 2))
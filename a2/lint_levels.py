@@ -0,0 +1,200 @@
+"""
+Linter for directories of level files.
+
+Checks each level without building a SlugDungeonModel: the health line,
+ragged rows, unknown symbols, a single `P`, at least one `G`, whether a `G`
+can be reached from `P` and which slugs can be reached. Problems that stop
+a level from loading or being won are errors, the rest are warnings.
+
+Reachability is a flood fill over the wall grid kept as one int bitset (bit
+row * (cols + 1) + col, with a wall column between rows so shifts never
+wrap), where each step grows the whole frontier with four shifts and a mask.
+
+Levels are linted in parallel worker processes, and the report is written
+as one JSON object per level (JSON lines).
+
+Usage:
+    python lint_levels.py DIRECTORY [--jobs N] [--output REPORT.jsonl]
+"""
+import argparse
+import json
+import os
+import sys
+from multiprocessing import Pool
+from typing import Iterator, Optional
+
+from constants import GOAL_TILE, PLAYER_SYMBOL, WALL_TILE
+from core import TILE_TYPES, WEAPON_TYPES, SLUG_TYPES
+
+
+LEVEL_SUFFIX = ".txt"
+CHUNK_SIZE = 64  # levels handed to a worker at a time
+
+_PLAYER = PLAYER_SYMBOL.encode()
+_GOAL = GOAL_TILE.encode()
+_WALL = WALL_TILE.encode()
+_SLUGS = "".join(SLUG_TYPES).encode()
+_KNOWN = set("".join(TILE_TYPES) + "".join(WEAPON_TYPES) + "".join(SLUG_TYPES)
+             + PLAYER_SYMBOL)
+# Map bytes to "1" if a tile of that symbol can be walked on, else "0".
+# Unknown symbols load as floor, so they are walkable too
+_WALKABLE = bytes(ord("0") if TILE_TYPES.get(chr(byte)) else ord("1")
+                  for byte in range(256))
+
+
+def lint_level(filename: str) -> dict:
+    """
+    Lint one level file.
+
+    Return value:
+        dict: The report for the level: "file", "ok" (no errors), "errors"
+        and "warnings" (lists of {"code", "message"}), and when the map can
+        be read, its "rows", "cols", "slugs" and "reachable_slugs".
+    """
+    report = {"file": filename, "ok": True, "errors": [], "warnings": []}
+
+    def problem(kind: str, code: str, message: str) -> None:
+        report[kind].append({"code": code, "message": message})
+
+    try:
+        with open(filename, "rb") as file:
+            data = file.read()
+    except OSError as error:
+        problem("errors", "unreadable", str(error))
+        report["ok"] = False
+        return report
+
+    lines = data.splitlines()
+    if not lines:
+        problem("errors", "empty", "the file is empty")
+        report["ok"] = False
+        return report
+
+    try:
+        health = int(lines[0].strip())
+    except ValueError:
+        problem("errors", "bad-health",
+                f"health line {lines[0][:20].decode('latin-1')!r} is not an "
+                f"integer")
+    else:
+        if health <= 0:
+            problem("errors", "bad-health", f"health {health} is not positive")
+
+    rows = lines[1:]
+    cols = max((len(row) for row in rows), default=0)
+    report["rows"], report["cols"] = len(rows), cols
+    if not rows or not cols:
+        problem("errors", "no-map", "the level has no map")
+    ragged = [index + 2 for index, row in enumerate(rows) if len(row) != cols]
+    if ragged:
+        problem("errors", "ragged",
+                f"{len(ragged)} rows are shorter than {cols} columns, "
+                f"first on line {ragged[0]}")
+
+    unknown = set(b"".join(rows).decode("latin-1")) - _KNOWN
+    if unknown:
+        problem("warnings", "unknown-symbol",
+                f"symbols {''.join(sorted(unknown))!r} load as floor")
+
+    # One string for the whole map, each row padded with walls and followed
+    # by a wall column; character i is bit i of the bitsets
+    stride = cols + 1
+    grid = b"".join(row.ljust(cols, _WALL) + _WALL for row in rows)
+    walkable = int(grid.translate(_WALKABLE)[::-1] or b"0", 2)
+
+    players = _find_all(grid, _PLAYER)
+    goals = _find_all(grid, _GOAL)
+    slugs = [index for index, symbol in enumerate(grid) if symbol in _SLUGS]
+    report["slugs"] = len(slugs)
+    if not players:
+        problem("errors", "no-player", f"no {PLAYER_SYMBOL!r} on the map")
+    elif len(players) > 1:
+        problem("errors", "many-players",
+                f"{len(players)} {PLAYER_SYMBOL!r} on the map")
+    if not goals:
+        # Playable (e.g. as a survival challenge), but it cannot be won
+        problem("warnings", "no-goal", f"no {GOAL_TILE!r} on the map")
+
+    if len(players) == 1:
+        reach = flood_fill(walkable, players[0], stride)
+        if goals and not any(reach >> goal & 1 for goal in goals):
+            problem("errors", "goal-unreachable",
+                    f"no {GOAL_TILE!r} can be reached from the player")
+        reachable = [slug for slug in slugs if reach >> slug & 1]
+        report["reachable_slugs"] = len(reachable)
+        if len(reachable) < len(slugs):
+            first = next(slug for slug in slugs if not reach >> slug & 1)
+            problem("warnings", "slug-unreachable",
+                    f"{len(slugs) - len(reachable)} slugs cannot be walked "
+                    f"to, first at {divmod(first, stride)}")
+
+    report["ok"] = not report["errors"]
+    return report
+
+
+def flood_fill(walkable: int, start: int, stride: int) -> int:
+    """
+    Returns the bitset of cells reachable from bit `start` through the bits
+    of `walkable`, moving up, down, left and right on rows `stride` bits
+    long. Every row must end in a non-walkable bit.
+    """
+    reach = 1 << start
+    while True:
+        grown = (reach | reach << 1 | reach >> 1 | reach << stride
+                 | reach >> stride) & walkable
+        if grown == reach:
+            return reach
+        reach = grown
+
+
+def _find_all(data: bytes, symbol: bytes) -> list[int]:
+    found = []
+    index = data.find(symbol)
+    while index != -1:
+        found.append(index)
+        index = data.find(symbol, index + 1)
+    return found
+
+
+def find_levels(directory: str) -> Iterator[str]:
+    """Yield every level file under `directory`, recursively."""
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(LEVEL_SUFFIX):
+                yield os.path.join(root, name)
+
+
+def lint_directory(directory: str, jobs: Optional[int] = None
+                   ) -> Iterator[dict]:
+    """Lint every level under `directory` in `jobs` worker processes (one
+    per CPU by default), yielding reports as they complete."""
+    with Pool(jobs) as pool:
+        yield from pool.imap_unordered(lint_level, find_levels(directory),
+                                       CHUNK_SIZE)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directory")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--output", default=None,
+                        help="write the JSON lines report here, not stdout")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    levels = failed = 0
+    try:
+        for report in lint_directory(args.directory, args.jobs):
+            levels += 1
+            failed += not report["ok"]
+            output.write(json.dumps(report) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{levels} levels, {failed} with errors", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
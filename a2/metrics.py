@@ -0,0 +1,382 @@
+"""
+Metrics for headless runs (bots, servers, benchmarks).
+
+Install a GameMetrics with `core.set_metrics` and every model in the process
+reports to it: turns, turns per second and `end_turn` latency, `load_level`
+time, slugs alive, slug moves, attacks, deaths, wins and losses.
+
+Collection takes no lock. Each thread that plays turns writes plain ints
+and floats into a shard of its own, bumping the shard's sequence number
+before and after every update; `render`, the only place that
+synchronizes, adds the shards up and retries a shard it caught in the
+middle of an update, so the HTTP server thread or a TextfileWriter always
+read a consistent set of values. Rendering changes nothing, so any number
+of scrapers can read the same metrics. Worker processes never share state;
+each one writes its own Prometheus text file (named after its pid, with a
+`pid` label on every series) for the node exporter textfile collector to
+merge, or serves its metrics on a local HTTP endpoint.
+
+Usage:
+    metrics = GameMetrics()
+    core.set_metrics(metrics)
+    writer = TextfileWriter(metrics, "/var/lib/node_exporter")
+    ...  # play, calling writer.maybe_write() now and then
+"""
+import bisect
+import os
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import core
+
+
+PREFIX = "slug_dungeon"
+# Upper bounds, in seconds, of the latency histogram buckets
+TURN_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                0.01, 0.025, 0.05, 0.1)
+LOAD_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                1.0, 2.5)
+WRITE_INTERVAL = 15.0  # seconds between text file writes
+RATE_WINDOW = 10  # whole seconds averaged by the turns per second gauge
+
+
+class Counter:
+    """A monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        return [(self.name, "", self.value)]
+
+
+class Gauge(Counter):
+    """A value that can go up and down"""
+    kind = "gauge"
+
+
+class Histogram:
+    """Counts observations into buckets with fixed upper bounds"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str,
+                 buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow; not cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        samples = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            samples.append((self.name + "_bucket", f'le="{le}"', total))
+        samples.append((self.name + "_sum", "", self.sum))
+        samples.append((self.name + "_count", "", self.count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    A set of metrics rendered in the Prometheus text format.
+
+    Methods:
+        counter(name, help_text) -> Counter
+        gauge(name, help_text) -> Gauge
+        histogram(name, help_text, buckets) -> Histogram
+        render() -> str: Every metric in the text exposition format.
+    """
+    def __init__(self, labels: Optional[dict[str, str]] = None) -> None:
+        """
+        parameter:
+            labels (Optional[dict[str, str]]): Labels added to every sample,
+            by default the pid of this process.
+        """
+        if labels is None:
+            labels = {"pid": str(os.getpid())}
+        self._labels = ",".join(f'{key}="{value}"'
+                                for key, value in labels.items())
+        self._metrics: list = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._add(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: tuple[float, ...]) -> Histogram:
+        return self._add(Histogram(name, help_text, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                labels = ",".join(part for part in (self._labels, labels)
+                                  if part)
+                lines.append(f"{name}{{{labels}}} {value}" if labels
+                             else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Shard:
+    """
+    The counts recorded by one thread. Only that thread writes them; the
+    sequence number is odd while it is in the middle of an update.
+    """
+    def __init__(self) -> None:
+        self.sequence = 0
+        self.turns = 0
+        self.turn_counts = [0] * (len(TURN_BUCKETS) + 1)
+        self.turn_sum = 0.0
+        self.load_counts = [0] * (len(LOAD_BUCKETS) + 1)
+        self.load_sum = 0.0
+        self.slug_moves = 0
+        self.attacks = 0
+        self.deaths = 0
+        self.wins = 0
+        self.losses = 0
+        # Turns played in each of the latest whole seconds, by second % size
+        self.seconds = [-1] * (RATE_WINDOW + 1)
+        self.second_turns = [0] * (RATE_WINDOW + 1)
+
+    def read(self) -> tuple:
+        """A consistent copy of the counts, taken between two updates"""
+        while True:
+            sequence = self.sequence
+            if sequence % 2 == 0:
+                values = (self.turns, list(self.turn_counts), self.turn_sum,
+                          list(self.load_counts), self.load_sum,
+                          self.slug_moves, self.attacks, self.deaths,
+                          self.wins, self.losses, list(self.seconds),
+                          list(self.second_turns))
+                if self.sequence == sequence:
+                    return values
+            time.sleep(0)  # let the writer finish its update
+
+
+class GameMetrics:
+    """
+    The game metrics of one process, fed by `core` once installed with
+    `core.set_metrics`.
+
+    Slugs alive is summed over the games of the process: each game reports
+    its count after every turn, and drops out once it is garbage collected.
+
+    Methods:
+        record_turn(game, seconds, slugs, moves, deaths, won, lost) -> None
+        record_attacks(hits) -> None
+        record_load(seconds) -> None
+        render() -> str: The metrics in the Prometheus text format.
+    """
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry if registry is not None \
+            else MetricsRegistry()
+        add = self.registry
+        self.turns = add.counter(f"{PREFIX}_turns_total", "Turns played")
+        self.turns_per_second = add.gauge(
+            f"{PREFIX}_turns_per_second",
+            f"Turns played per second over the last {RATE_WINDOW} whole "
+            "seconds")
+        self.turn_seconds = add.histogram(
+            f"{PREFIX}_end_turn_seconds", "Latency of end_turn",
+            TURN_BUCKETS)
+        self.load_seconds = add.histogram(
+            f"{PREFIX}_load_level_seconds", "Time taken by load_level",
+            LOAD_BUCKETS)
+        self.slugs_alive = add.gauge(
+            f"{PREFIX}_slugs_alive",
+            "Slugs alive after the latest turn, summed over the games")
+        self.slug_moves = add.counter(
+            f"{PREFIX}_slug_moves_total", "Slugs that changed cell")
+        self.attacks = add.counter(
+            f"{PREFIX}_attack_hits_total",
+            "Attacks that hit, by the player or a slug")
+        self.deaths = add.counter(f"{PREFIX}_slug_deaths_total",
+                                  "Slugs that died")
+        self.wins = add.counter(f"{PREFIX}_wins_total", "Games won")
+        self.losses = add.counter(f"{PREFIX}_losses_total", "Games lost")
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        # Slugs alive after the latest turn of each game, by id(game)
+        self._games: dict[int, int] = {}
+        self._lock = threading.Lock()  # taken by render and new threads
+
+    def _shard(self) -> _Shard:
+        """The shard of the calling thread"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def record_turn(self, game: object, seconds: float, slugs: int,
+                    moves: int, deaths: int, won: bool, lost: bool) -> None:
+        """Record a turn of `game` (its model). `won` and `lost` are only
+        true for the turn that ended the game."""
+        games, key = self._games, id(game)
+        if key not in games:
+            # Forget the game's slugs once the game itself is gone
+            weakref.finalize(game, games.pop, key, None).atexit = False
+        games[key] = slugs
+        second = int(time.monotonic())
+        shard = self._shard()
+        shard.sequence += 1
+        shard.turns += 1
+        shard.turn_counts[bisect.bisect_left(TURN_BUCKETS, seconds)] += 1
+        shard.turn_sum += seconds
+        shard.slug_moves += moves
+        shard.deaths += deaths
+        if won:
+            shard.wins += 1
+        elif lost:
+            shard.losses += 1
+        slot = second % len(shard.seconds)
+        if shard.seconds[slot] != second:
+            shard.seconds[slot] = second
+            shard.second_turns[slot] = 0
+        shard.second_turns[slot] += 1
+        shard.sequence += 1
+
+    def record_attacks(self, hits: int) -> None:
+        shard = self._shard()
+        shard.sequence += 1
+        shard.attacks += hits
+        shard.sequence += 1
+
+    def record_load(self, seconds: float) -> None:
+        shard = self._shard()
+        shard.sequence += 1
+        shard.load_counts[bisect.bisect_left(LOAD_BUCKETS, seconds)] += 1
+        shard.load_sum += seconds
+        shard.sequence += 1
+
+    def render(self) -> str:
+        with self._lock:
+            self._collect()
+            return self.registry.render()
+
+    def _collect(self) -> None:
+        """Set the registry's metrics to the sums of the shards"""
+        now = int(time.monotonic())
+        totals = [0] * 6
+        turn_counts = [0] * (len(TURN_BUCKETS) + 1)
+        load_counts = [0] * (len(LOAD_BUCKETS) + 1)
+        turn_sum = load_sum = 0.0
+        recent = 0  # turns in the whole seconds of the rate window
+        for shard in self._shards:
+            (turns, shard_turn_counts, shard_turn_sum, shard_load_counts,
+             shard_load_sum, *counts, seconds, second_turns) = shard.read()
+            for index, value in enumerate((turns, *counts)):
+                totals[index] += value
+            for index, count in enumerate(shard_turn_counts):
+                turn_counts[index] += count
+            for index, count in enumerate(shard_load_counts):
+                load_counts[index] += count
+            turn_sum += shard_turn_sum
+            load_sum += shard_load_sum
+            recent += sum(count for second, count in zip(seconds, second_turns)
+                          if now - RATE_WINDOW <= second < now)
+        (self.turns.value, self.slug_moves.value, self.attacks.value,
+         self.deaths.value, self.wins.value, self.losses.value) = totals
+        self.turns_per_second.value = recent / RATE_WINDOW
+        self.slugs_alive.value = sum(list(self._games.values()))
+        for histogram, counts, total in (
+                (self.turn_seconds, turn_counts, turn_sum),
+                (self.load_seconds, load_counts, load_sum)):
+            histogram.counts = counts
+            histogram.sum = total
+            histogram.count = sum(counts)
+
+
+class TextfileWriter:
+    """
+    Periodically writes a GameMetrics to `<directory>/<PREFIX>_<pid>.prom`,
+    atomically, so the textfile collector never reads a partial file.
+
+    Methods:
+        maybe_write() -> bool: Write if `interval` seconds have passed.
+        write() -> None: Write now.
+    """
+    def __init__(self, metrics: GameMetrics, directory: str = ".",
+                 interval: float = WRITE_INTERVAL) -> None:
+        self.metrics = metrics
+        self.path = os.path.join(directory, f"{PREFIX}_{os.getpid()}.prom")
+        self.interval = interval
+        self._next_write = time.monotonic() + interval
+
+    def maybe_write(self) -> bool:
+        now = time.monotonic()
+        if now < self._next_write:
+            return False
+        self._next_write = now + self.interval
+        self.write()
+        return True
+
+    def write(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(self.metrics.render())
+        os.replace(tmp_path, self.path)
+
+
+def serve(metrics: GameMetrics, port: int,
+          host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the metrics at http://host:port/metrics from a daemon thread.
+
+    Return value:
+        ThreadingHTTPServer: The running server; call `shutdown()` to stop.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type",
+                             "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass  # keep scrapes out of the game's output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def install(metrics: Optional[GameMetrics] = None) -> GameMetrics:
+    """Install `metrics` (a new GameMetrics by default) for every model in
+    this process, and return it."""
+    if metrics is None:
+        metrics = GameMetrics()
+    core.set_metrics(metrics)
+    return metrics
@@ -0,0 +1,196 @@
+"""
+Incrementally updated NumPy observation planes for neural-net agents.
+
+`ObservationEncoder` writes a `SlugDungeonModel` into a caller-owned
+float32 array of shape (NUM_CHANNELS, rows, cols). The first `encode` fills
+every plane and subscribes to the model's events; afterwards `update` only
+rewrites the cells those events say were touched (moves, attacks, poison,
+deaths and weapons dropped or picked up), so the cost of an observation is
+proportional to the number of changed cells rather than to rows * cols,
+and nothing is allocated per step.
+
+NumPy is only needed by this module, not by the game itself.
+"""
+from typing import Optional
+
+import numpy as np
+
+from core import (SlugDungeonModel, AngrySlug, NiceSlug, ScaredSlug,
+                  PoisonDart, PoisonSword, HealingRock)
+from events import Moved
+
+
+# Channel layout of the observation planes
+WALL_CHANNEL = 0
+GOAL_CHANNEL = 1
+DART_CHANNEL = 2
+SWORD_CHANNEL = 3
+ROCK_CHANNEL = 4
+PLAYER_CHANNEL = 5
+ANGRY_CHANNEL = 6
+NICE_CHANNEL = 7
+SCARED_CHANNEL = 8
+HEALTH_CHANNEL = 9
+POISON_CHANNEL = 10
+NUM_CHANNELS = 11
+
+WEAPON_CHANNELS = {
+    PoisonDart: DART_CHANNEL,
+    PoisonSword: SWORD_CHANNEL,
+    HealingRock: ROCK_CHANNEL,
+}
+SLUG_CHANNELS = {
+    AngrySlug: ANGRY_CHANNEL,
+    NiceSlug: NICE_CHANNEL,
+    ScaredSlug: SCARED_CHANNEL,
+}
+
+# Channels that can change during a game; walls and the goal are static
+_DYNAMIC_CHANNELS = slice(DART_CHANNEL, NUM_CHANNELS)
+
+
+def make_buffer(model: SlugDungeonModel) -> np.ndarray:
+    """
+    Allocate an observation buffer sized for `model`.
+
+    parameter:
+        model (SlugDungeonModel): The game the buffer is for.
+
+    Return value:
+        np.ndarray: Zeroed float32 array of shape (NUM_CHANNELS, rows, cols).
+    """
+    rows, cols = model.get_dimensions()
+    return np.zeros((NUM_CHANNELS, rows, cols), dtype=np.float32)
+
+
+class ObservationEncoder:
+    """
+    Encodes a game into observation planes, updating only changed cells.
+
+    Typical use:
+
+        out = make_buffer(model)
+        encoder = ObservationEncoder()
+        encoder.encode(model, out)
+        while ...:
+            model.handle_action(key)
+            encoder.update(model, out)
+        encoder.close()
+
+    Slug types without their own channel are not drawn in a type channel,
+    but still get their health and poison written.
+
+    Methods:
+        encode(model, out) -> np.ndarray: Write every plane from scratch.
+        update(model, out) -> np.ndarray: Rewrite the cells touched since the
+        last `encode`/`update`.
+        close() -> None: Stop listening to the model's events.
+    """
+    def __init__(self) -> None:
+        # The encoded model, and the cells its turns touched since the
+        # previous encode or update
+        self._model: Optional[SlugDungeonModel] = None
+        self._dirty: set[tuple[int, int]] = set()
+
+    def encode(self, model: SlugDungeonModel, out: np.ndarray) -> np.ndarray:
+        """
+        Write the full observation of `model` into `out`.
+
+        Use this for the first observation of a game, and whenever `out` or
+        the model were changed outside of turns (e.g. after a reset or an
+        undo), as those changes publish no events.
+
+        parameter:
+            model (SlugDungeonModel): The game to encode.
+            out (np.ndarray): Buffer of shape (NUM_CHANNELS, rows, cols).
+
+        Return value:
+            np.ndarray: `out`.
+        """
+        if model is not self._model:
+            self.close()
+            model.subscribe(self._on_turn)
+            self._model = model
+        self._dirty.clear()
+
+        out.fill(0.0)
+        for row, tile_row in enumerate(model.get_tiles()):
+            for col, tile in enumerate(tile_row):
+                if tile.is_blocking():
+                    out[WALL_CHANNEL, row, col] = 1.0
+                elif str(tile) == "G":
+                    out[GOAL_CHANNEL, row, col] = 1.0
+                weapon = tile.get_weapon()
+                if weapon is not None and type(weapon) in WEAPON_CHANNELS:
+                    out[WEAPON_CHANNELS[type(weapon)], row, col] = 1.0
+
+        for (row, col), slug in model.get_slugs().items():
+            _write_entity(slug, SLUG_CHANNELS.get(type(slug)), row, col, out)
+        row, col = model.get_player_position()
+        _write_entity(model.get_player(), PLAYER_CHANNEL, row, col, out)
+        return out
+
+    def update(self, model: SlugDungeonModel, out: np.ndarray) -> np.ndarray:
+        """
+        Bring `out` up to date after one or more turns of `model`.
+
+        Every cell a turn changes is the position of one of its events:
+        both ends of a move, the cell of an entity whose health or poison
+        changed, of a slug that died, and of a weapon dropped or picked up.
+        Only those cells are rewritten, from the model as it is now.
+
+        parameter:
+            model (SlugDungeonModel): The game previously passed to
+            `encode`.
+            out (np.ndarray): The buffer previously passed to `encode`.
+
+        Return value:
+            np.ndarray: `out`.
+
+        Raises:
+            ValueError: If `model` is not the model last passed to `encode`.
+        """
+        if model is not self._model:
+            raise ValueError("update needs the model last passed to encode")
+        tiles, slugs = model.get_tiles(), model.get_slugs()
+        player_position = model.get_player_position()
+        for position in self._dirty:
+            row, col = position
+            out[_DYNAMIC_CHANNELS, row, col] = 0.0
+            weapon = tiles[row][col].get_weapon()
+            if weapon is not None and type(weapon) in WEAPON_CHANNELS:
+                out[WEAPON_CHANNELS[type(weapon)], row, col] = 1.0
+            if position == player_position:
+                _write_entity(model.get_player(), PLAYER_CHANNEL, row, col,
+                              out)
+            elif position in slugs:
+                slug = slugs[position]
+                _write_entity(slug, SLUG_CHANNELS.get(type(slug)), row, col,
+                              out)
+        self._dirty.clear()
+        return out
+
+    def close(self) -> None:
+        if self._model is not None:
+            self._model.unsubscribe(self._on_turn)
+            self._model = None
+
+    def _on_turn(self, model: SlugDungeonModel, events: list) -> None:
+        dirty = self._dirty
+        for event in events:
+            if isinstance(event, Moved):
+                dirty.add(event.old_position)
+                dirty.add(event.new_position)
+            else:
+                position = getattr(event, "position", None)  # not Won/Lost
+                if position is not None:
+                    dirty.add(position)
+
+
+def _write_entity(entity, channel: Optional[int], row: int, col: int,
+                  out: np.ndarray) -> None:
+    """Draw an entity over its cell's terrain and weapon planes."""
+    if channel is not None:
+        out[channel, row, col] = 1.0
+    out[HEALTH_CHANNEL, row, col] = entity.get_health()
+    out[POISON_CHANNEL, row, col] = entity.get_poison()
@@ -0,0 +1,106 @@
+"""
+Lookup-table slug policies.
+
+The built-in slugs decide where to move only from which of their four
+neighbours are free and from where the player is relative to them. A
+policy table stores that decision for every (free-neighbour mask, player
+offset) pair, so the model can replace the `choose_move` call, its list
+concatenation and its distance lambda with one table lookup.
+
+Player offsets are unbounded, but the comparisons `choose_move` makes
+between the slug's own cell and its neighbours only depend on the signs of
+dr, dc, dr - dc and dr + dc. `canonical_offset` maps every offset to a
+representative with the same signs inside [-2, 2] x [-2, 2], so a table
+has 16 * 25 entries and still reproduces `choose_move` exactly, including
+the tie-break on `pos`.
+"""
+OFFSET_SPAN = 2  # canonical offsets lie in [-OFFSET_SPAN, OFFSET_SPAN]
+_OFFSET_WIDTH = 2 * OFFSET_SPAN + 1
+TABLE_SIZE = 16 * _OFFSET_WIDTH * _OFFSET_WIDTH
+
+STAY = 0  # table value for staying put; direction d is stored as d + 1
+
+
+class PolicyMismatchError(Exception):
+    """Raised when a policy table disagrees with the slug's choose_move."""
+
+
+def canonical_offset(dr: int, dc: int) -> tuple[int, int]:
+    """
+    Map a player offset to the representative offset of its class.
+
+    The result has the same signs of dr, dc, dr - dc and dr + dc as the
+    input, with each coordinate in [-2, 2].
+    """
+    abs_dr, abs_dc = abs(dr), abs(dc)
+    sign_dr = (dr > 0) - (dr < 0)
+    sign_dc = (dc > 0) - (dc < 0)
+    return (sign_dr * (1 + (abs_dr > abs_dc)),
+            sign_dc * (1 + (abs_dc > abs_dr)))
+
+
+def policy_index(mask: int, dr: int, dc: int) -> int:
+    """Returns the table index for a free-neighbour mask and the offset
+    (dr, dc) from the slug to its target."""
+    dr, dc = canonical_offset(dr, dc)
+    return ((mask * _OFFSET_WIDTH + dr + OFFSET_SPAN) * _OFFSET_WIDTH
+            + dc + OFFSET_SPAN)
+
+
+def compile_policy(slug_type: type,
+                   deltas: tuple[tuple[int, int], ...]) -> bytes:
+    """
+    Build the policy table of a slug type from its `choose_move`.
+
+    parameter:
+        slug_type (type): A slug class whose `choose_move` only depends on
+        the free neighbours and the target offset. It must be constructible
+        without arguments.
+        deltas (tuple): The (dr, dc) of each neighbour direction, in mask
+        bit order.
+
+    Return value:
+        bytes: TABLE_SIZE entries, STAY or 1 + the chosen direction.
+    """
+    slug = slug_type()
+    table = bytearray(TABLE_SIZE)
+    origin = (0, 0)
+    for mask in range(16):
+        candidates = [origin] + [deltas[direction] for direction in range(4)
+                                 if mask >> direction & 1]
+        for dr in range(-OFFSET_SPAN, OFFSET_SPAN + 1):
+            for dc in range(-OFFSET_SPAN, OFFSET_SPAN + 1):
+                choice = slug.choose_move(list(candidates), origin, (dr, dc))
+                table[policy_index(mask, dr, dc)] = (
+                    STAY if choice == origin else deltas.index(choice) + 1)
+    return bytes(table)
+
+
+def verify_policy(slug_type: type, table: bytes,
+                  deltas: tuple[tuple[int, int], ...],
+                  span: int = 12) -> None:
+    """
+    Check a policy table against `choose_move` for every mask and every
+    player offset within `span`, at an arbitrary slug position.
+
+    Raises:
+        PolicyMismatchError: On the first disagreement.
+    """
+    slug = slug_type()
+    origin = (7, -3)
+    for mask in range(16):
+        candidates = [origin] + [
+            (origin[0] + deltas[direction][0], origin[1] + deltas[direction][1])
+            for direction in range(4) if mask >> direction & 1]
+        for dr in range(-span, span + 1):
+            for dc in range(-span, span + 1):
+                target = (origin[0] + dr, origin[1] + dc)
+                expected = slug.choose_move(list(candidates), origin, target)
+                choice = table[policy_index(mask, dr, dc)]
+                actual = origin if choice == STAY else (
+                    origin[0] + deltas[choice - 1][0],
+                    origin[1] + deltas[choice - 1][1])
+                if actual != expected:
+                    raise PolicyMismatchError(
+                        f"{slug_type.__name__} policy chose {actual} instead "
+                        f"of {expected} (mask {mask:04b}, offset {dr, dc})")
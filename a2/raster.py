@@ -0,0 +1,345 @@
+"""
+Headless rendering of game states to images, without tkinter or a display.
+
+`Rasterizer` draws a SlugDungeonModel into a reusable RGB byte buffer with
+the colours of the GUI: terrain, a marker for weapons, slugs and the player
+as discs, and the fog of war if it is on. Cells are only redrawn when what
+they show changed since the previous frame. A rasterizer that follows a
+model learns from the model's events which cells its turns touched, so a
+frame only looks at those, the entities and the cells whose visibility
+changed, and rendering a replay costs little more than the cells that
+moved. Frames are written as binary PPM or PNG (zlib only).
+
+Usage:
+    python raster.py LEVEL [--actions KEYS] [--out DIR] [--cell PX]
+    python raster.py SNAPSHOT.sav [--out DIR]  # replays its journal
+"""
+import argparse
+import os
+import struct
+import sys
+import zlib
+from typing import Iterable, Optional
+
+from constants import (WALL_COLOUR, FLOOR_COLOUR, PLAYER_COLOUR, SLUG_COLOUR,
+                       FOG_COLOUR)
+from core import SlugDungeonModel, TILE_COLOURS, load_level
+from events import Died, Moved, WeaponDropped, WeaponPickedUp
+
+
+CELL_SIZE = 16  # pixels per cell side
+MOVING_SLUG_COLOUR = "light pink"  # as DungeonMap draws slugs about to move
+WEAPON_COLOUR = "black"
+
+# The Tk colour names used by the game, which Tk takes from X11
+NAMED_COLOURS = {
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "green": (0, 255, 0),
+    "light pink": (255, 182, 193),
+}
+
+
+def parse_colour(colour: str) -> tuple[int, int, int]:
+    """Returns the (r, g, b) of a "#rrggbb" or known Tk colour name."""
+    if colour.startswith("#") and len(colour) == 7:
+        return (int(colour[1:3], 16), int(colour[3:5], 16),
+                int(colour[5:7], 16))
+    try:
+        return NAMED_COLOURS[colour.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown colour {colour!r}") from None
+
+
+class Rasterizer:
+    """
+    Renders model states into one RGB buffer, 3 bytes per pixel, row-major.
+
+    Attribute:
+        cell_size (int): Pixels per cell side.
+        width, height (int): Image size in pixels.
+        pixels (bytearray): The image of the latest frame.
+
+    Methods:
+        follow(model) -> None: Track the cells that turns of `model` change.
+        close() -> None: Stop following the model.
+        invalidate() -> None: Look at every cell in the next frame.
+        render(model) -> int: Draw the model, returning how many cells were
+        redrawn.
+        to_ppm() -> bytes: The latest frame as a binary PPM.
+        to_png() -> bytes: The latest frame as a PNG.
+    """
+    def __init__(self, dimensions: tuple[int, int],
+                 cell_size: int = CELL_SIZE) -> None:
+        self._rows, self._cols = dimensions
+        self.cell_size = cell_size
+        self.width = self._cols * cell_size
+        self.height = self._rows * cell_size
+        self.pixels = bytearray(self.width * self.height * 3)
+        # What each cell showed in the previous frame, None before the first
+        self._shown: list[Optional[tuple]] = [None] * (self._rows * self._cols)
+        self._disc = _disc_mask(cell_size)
+        self._colours: dict[str, tuple[int, int, int]] = {}
+        # The followed model, the cells its turns touched since the previous
+        # frame, and the field of view and visible cells drawn in it
+        self._model: Optional[SlugDungeonModel] = None
+        self._dirty: set[tuple[int, int]] = set()
+        self._fov = None
+        self._visible: dict[int, int] = {}
+        self._full = True
+
+    def follow(self, model: SlugDungeonModel) -> None:
+        """
+        Subscribe to the events of `model`, so frames of it only look at the
+        cells its turns changed instead of at every cell.
+
+        Changes made outside of turns (undo, editing the map, ...) publish no
+        events; call `invalidate` after them.
+        """
+        self.close()
+        self._model = model
+        model.subscribe(self._on_turn)
+        self.invalidate()
+
+    def close(self) -> None:
+        if self._model is not None:
+            self._model.unsubscribe(self._on_turn)
+            self._model = None
+
+    def invalidate(self) -> None:
+        self._full = True
+
+    def _on_turn(self, model: SlugDungeonModel, events: list) -> None:
+        dirty = self._dirty
+        for event in events:
+            if isinstance(event, Moved):
+                dirty.add(event.old_position)
+                dirty.add(event.new_position)
+            elif isinstance(event, (Died, WeaponDropped, WeaponPickedUp)):
+                dirty.add(event.position)
+        fov = model.get_field_of_view()
+        if fov is not None and fov is self._fov:
+            # Cells that came into or went out of sight; a newly seen cell
+            # is always a newly visible one
+            visible = fov.get_visible()
+            for row in self._visible.keys() | visible.keys():
+                changed = self._visible.get(row, 0) ^ visible.get(row, 0)
+                while changed:
+                    bit = changed & -changed
+                    dirty.add((row, bit.bit_length() - 1))
+                    changed ^= bit
+            self._visible = visible
+
+    def render(self, model: SlugDungeonModel) -> int:
+        """
+        Draw `model` over the previous frame, redrawing only the cells whose
+        terrain, weapon, occupant or fog state changed.
+
+        For the followed model only the cells its turns touched and the
+        cells of the player and the slugs (whose colour shows whether they
+        move next) are looked at; otherwise every cell is.
+
+        Return value:
+            int: The number of cells redrawn.
+        """
+        tiles = model.get_tiles()
+        slugs = model.get_slugs()
+        player_position = model.get_player_position()
+        fov = model.get_field_of_view()
+        shown = self._shown
+        redrawn = 0
+        if model is self._model and not self._full and fov is self._fov:
+            cells = self._dirty
+            cells.update(slugs)
+            cells.add(player_position)
+            for position in cells:
+                row, col = position
+                look = self._look(tiles[row][col], position, slugs,
+                                  player_position, fov)
+                cell = row * self._cols + col
+                if shown[cell] != look:
+                    shown[cell] = look
+                    self._draw_cell(row, col, *look)
+                    redrawn += 1
+            cells.clear()
+            return redrawn
+
+        for row in range(self._rows):
+            tile_row = tiles[row] if row < len(tiles) else ()
+            for col in range(self._cols):
+                position = (row, col)
+                if col >= len(tile_row):
+                    look = (WALL_COLOUR, False, None, False)
+                else:
+                    look = self._look(tile_row[col], position, slugs,
+                                      player_position, fov)
+                cell = row * self._cols + col
+                if shown[cell] != look:
+                    shown[cell] = look
+                    self._draw_cell(row, col, *look)
+                    redrawn += 1
+        self._dirty.clear()
+        self._fov = fov
+        self._visible = fov.get_visible() if fov is not None else {}
+        self._full = False
+        return redrawn
+
+    def _look(self, tile, position, slugs, player_position, fov) -> tuple:
+        """What a cell shows: (terrain colour, weapon, occupant colour, dim),
+        following the rules of DungeonMap.redraw."""
+        visible = fov is None or fov.is_visible(position)
+        if not visible and not fov.is_seen(position):
+            return (FOG_COLOUR, False, None, False)
+        terrain = TILE_COLOURS.get(tile.get_symbol())
+        if terrain is None:
+            terrain = WALL_COLOUR if tile.is_blocking() else FLOOR_COLOUR
+        occupant = None
+        if position == player_position:
+            occupant = PLAYER_COLOUR
+        elif visible and position in slugs:
+            occupant = MOVING_SLUG_COLOUR if slugs[position].can_move() \
+                else SLUG_COLOUR
+        weapon = visible and tile.get_weapon() is not None
+        return (terrain, weapon, occupant, not visible)
+
+    def _rgb(self, colour: str) -> tuple[int, int, int]:
+        rgb = self._colours.get(colour)
+        if rgb is None:
+            rgb = self._colours[colour] = parse_colour(colour)
+        return rgb
+
+    def _draw_cell(self, row: int, col: int, terrain: str, weapon: bool,
+                   occupant: Optional[str], dim: bool) -> None:
+        size = self.cell_size
+        background = self._rgb(terrain)
+        if dim:
+            # Remembered cells are drawn half way to the fog colour
+            fog = self._rgb(FOG_COLOUR)
+            background = tuple((a + b) // 2 for a, b in zip(background, fog))
+        background = bytes(background)
+        foreground = bytes(self._rgb(occupant)) if occupant else None
+        marker = bytes(self._rgb(WEAPON_COLOUR))
+        low, high = size * 3 // 8, size - size * 3 // 8
+
+        stride = self.width * 3
+        offset = row * size * stride + col * size * 3
+        pixels = self.pixels
+        for y in range(size):
+            line = bytearray(background * size)
+            if foreground is not None:
+                for x in self._disc[y]:
+                    line[x * 3:x * 3 + 3] = foreground
+            elif weapon and low <= y < high:
+                line[low * 3:high * 3] = marker * (high - low)
+            pixels[offset:offset + size * 3] = line
+            offset += stride
+
+    def to_ppm(self) -> bytes:
+        header = f"P6\n{self.width} {self.height}\n255\n".encode()
+        return header + bytes(self.pixels)
+
+    def to_png(self) -> bytes:
+        stride = self.width * 3
+        # Every scanline starts with filter type 0 (none)
+        raw = b"".join(b"\0" + self.pixels[y * stride:(y + 1) * stride]
+                       for y in range(self.height))
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0,
+                             0)
+        return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+                + _png_chunk(b"IDAT", zlib.compress(raw, 6))
+                + _png_chunk(b"IEND", b""))
+
+    def save(self, filename: str) -> None:
+        """Write the latest frame, as PNG if `filename` ends in .png and as
+        PPM otherwise."""
+        data = self.to_png() if filename.endswith(".png") else self.to_ppm()
+        with open(filename, "wb") as file:
+            file.write(data)
+
+
+def _disc_mask(size: int) -> list[range]:
+    """For each pixel row of a cell, the pixel columns inside the disc
+    inscribed in it."""
+    radius = size / 2 - 0.5
+    centre = (size - 1) / 2
+    mask = []
+    for y in range(size):
+        half = radius * radius - (y - centre) ** 2
+        if half < 0:
+            mask.append(range(0))
+            continue
+        half = half ** 0.5
+        mask.append(range(max(0, round(centre - half)),
+                          min(size, round(centre + half) + 1)))
+    return mask
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data)))
+
+
+def render_replay(model: SlugDungeonModel, keys: Iterable[str],
+                  directory: str, image_format: str = "png",
+                  cell_size: int = CELL_SIZE) -> int:
+    """
+    Render the starting state of `model` and then the state after every
+    turn played from `keys`, as numbered frames in `directory`.
+
+    Keys that do not play a turn (e.g. moves into walls) produce no frame.
+    Stops once the game is won or lost.
+
+    Return value:
+        int: The number of frames written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rasterizer = Rasterizer(model.get_dimensions(), cell_size)
+    rasterizer.follow(model)
+    frame = 0
+
+    def write_frame() -> None:
+        rasterizer.render(model)
+        rasterizer.save(os.path.join(directory,
+                                     f"frame{frame:05d}.{image_format}"))
+
+    try:
+        write_frame()
+        for key in keys:
+            if model.has_won() or model.has_lost():
+                break
+            if model.handle_action(key):
+                frame += 1
+                write_frame()
+    finally:
+        rasterizer.close()
+    return frame + 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="a level file, or a save state whose "
+                                       "journal is replayed")
+    parser.add_argument("--actions", default="",
+                        help="keys to play from a level, e.g. 'wwdd  s'")
+    parser.add_argument("--out", default="frames")
+    parser.add_argument("--cell", type=int, default=CELL_SIZE)
+    parser.add_argument("--format", choices=("png", "ppm"), default="png")
+    args = parser.parse_args()
+
+    if args.source.endswith(".sav"):
+        import savestate
+        with open(args.source, "rb") as file:
+            data = file.read()
+        model, _ = savestate.decode_state(data)
+        keys = savestate.read_journal(args.source + ".journal",
+                                      zlib.crc32(data))
+    else:
+        model = load_level(args.source)
+        keys = args.actions
+    frames = render_replay(model, keys, args.out, args.format, args.cell)
+    print(f"{frames} frames written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+Compact save states and a crash-safe autosave journal.
+
+A save state is a small versioned binary snapshot of a whole
+`SlugDungeonModel`: every tile with its dropped weapon, every slug with its
+health, poison, weapon and `turn_count`, the player, `_player_position` and
+`_prev_player_position`. Weapons and slugs are stored by their level-file
+symbol, so a state can be decoded by any copy of the game classes.
+
+Because turns are deterministic, the per-turn delta of the autosave journal
+is just the action that was played (one byte). `AutosaveJournal` appends one
+byte per turn to a journal next to the snapshot and fsyncs in batches, so
+autosaving costs microseconds per turn. Resuming loads the snapshot and
+replays only the journal tail written since the last checkpoint.
+"""
+import os
+import struct
+import zlib
+from typing import Optional
+
+from core import (SlugDungeonModel, Player, ACTIONS, SLUG_TYPES,
+                  WEAPON_TYPES, create_tile)
+
+
+STATE_MAGIC = b"SLUG"
+JOURNAL_MAGIC = b"SLGJ"
+STATE_VERSION = 1
+
+_HEADER = struct.Struct("<4sBI")  # magic, version, checksum of the body
+_JOURNAL_HEADER = struct.Struct("<4sBI")  # magic, version, snapshot checksum
+_DIMENSIONS = struct.Struct("<HH")  # rows, cols
+_POSITION = struct.Struct("<ii")  # row, col
+# max health, health, poison, weapon symbol
+_ENTITY = struct.Struct("<iiic")
+_SLUG = struct.Struct("<ciiiiiic")  # symbol, row, col, entity..., turn_count
+_LEVEL = struct.Struct("<H")  # length of the level name
+
+
+class SaveStateError(Exception):
+    """Raised when a save state or journal cannot be decoded."""
+
+
+def encode_state(model: SlugDungeonModel, level: str = "") -> bytes:
+    """
+    Encode the full state of `model` as a compact binary save state.
+
+    parameter:
+        model (SlugDungeonModel): The game to save.
+        level (str): Optional name of the level file the game was loaded
+        from, so a frontend can restart the same level after resuming.
+
+    Return value:
+        bytes: The encoded save state.
+
+    Raises:
+        ValueError: If a tile, weapon or slug symbol is not a single byte
+        (e.g. a non-ASCII symbol from the registry), or a row of tiles is
+        longer than the first one, as the layout has no room for either.
+    """
+    tiles = model.get_tiles()
+    rows, cols = model.get_dimensions()
+    parts = [_LEVEL.pack(len(level.encode())), level.encode(),
+             _DIMENSIONS.pack(rows, cols)]
+
+    # Two bytes per cell: the tile symbol and the symbol of its weapon
+    cells = bytearray()
+    for row, tile_row in enumerate(tiles):
+        if len(tile_row) > cols:
+            raise ValueError(f"Row {row} has {len(tile_row)} tiles, more "
+                             f"than the {cols} of the first row")
+        for tile in tile_row:
+            cells += _symbol_byte(str(tile), "tile")
+            cells += _weapon_symbol(tile.get_weapon())
+        cells += b"\0\0" * (cols - len(tile_row))  # pad ragged rows
+    parts.append(bytes(cells))
+
+    player = model.get_player()
+    parts.append(_pack_entity(player))
+    parts.append(_POSITION.pack(*model.get_player_position()))
+    parts.append(_POSITION.pack(*model._prev_player_position))
+
+    slugs = model.get_slugs()
+    parts.append(struct.pack("<I", len(slugs)))
+    for (row, col), slug in slugs.items():
+        parts.append(_SLUG.pack(
+            _symbol_byte(slug.get_symbol(), "slug"), row, col,
+            slug._max_health, slug.get_health(), slug.get_poison(),
+            slug.turn_count,
+            _weapon_symbol(slug.get_weapon())))
+
+    body = zlib.compress(b"".join(parts))
+    return _HEADER.pack(STATE_MAGIC, STATE_VERSION, zlib.crc32(body)) + body
+
+
+def decode_state(data: bytes) -> tuple[SlugDungeonModel, str]:
+    """
+    Decode a save state produced by `encode_state`.
+
+    parameter:
+        data (bytes): The encoded save state.
+
+    Return value:
+        tuple[SlugDungeonModel, str]: The restored game and the level name
+        stored with it ("" if none).
+
+    Raises:
+        SaveStateError: If the data is not a valid save state.
+    """
+    if len(data) < _HEADER.size:
+        raise SaveStateError("Save state is truncated")
+    magic, version, checksum = _HEADER.unpack_from(data)
+    if magic != STATE_MAGIC:
+        raise SaveStateError("Not a Slug Dungeon save state")
+    if version != STATE_VERSION:
+        raise SaveStateError(f"Unsupported save state version {version}")
+    body = data[_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise SaveStateError("Save state is corrupt")
+
+    try:
+        return _decode_body(zlib.decompress(body))
+    except (struct.error, zlib.error, KeyError, ValueError) as error:
+        raise SaveStateError(f"Save state is corrupt: {error}") from error
+
+
+def save_state(model: SlugDungeonModel, filename: str,
+               level: str = "") -> None:
+    """
+    Atomically write the save state of `model` to `filename`.
+
+    The state is written to a temporary file, fsync'd and renamed over
+    `filename`, so a crash never leaves a half-written save behind.
+    """
+    _write_atomic(filename, encode_state(model, level))
+
+
+def load_state(filename: str) -> tuple[SlugDungeonModel, str]:
+    """Read a save state written by `save_state`. Returns the game and the
+    level name stored with it."""
+    with open(filename, "rb") as file:
+        return decode_state(file.read())
+
+
+class AutosaveJournal:
+    """
+    Autosaves a game as a snapshot plus an append-only journal of actions.
+
+    Files:
+        filename: The latest snapshot, written by `checkpoint`.
+        filename + ".journal": One byte per turn played since that snapshot,
+        after a header naming the snapshot it belongs to.
+
+    Journal writes are buffered and fsync'd every `sync_every` turns, so a
+    crash loses at most that many turns. Every `checkpoint_every` turns a new
+    snapshot is written and the journal starts over, which bounds how much
+    has to be replayed on resume.
+
+    Attribute:
+        model (SlugDungeonModel): The game being journaled.
+        level (str): The level name stored in the snapshots.
+
+    Methods:
+        play(key) -> bool: Play an action on the model and journal it.
+        record(key) -> None: Journal an action already played on the model.
+        checkpoint() -> None: Write a new snapshot and restart the journal.
+        sync() -> None: Flush and fsync pending journal entries.
+        close() -> None: Sync and close the journal.
+        discard() -> None: Close the journal and delete the autosave.
+        resume(filename) -> AutosaveJournal: Restore a journaled game.
+    """
+    def __init__(self, filename: str, model: SlugDungeonModel,
+                 level: str = "", sync_every: int = 16,
+                 checkpoint_every: int = 1024) -> None:
+        self.model = model
+        self.level = level
+        self._filename = filename
+        self._sync_every = sync_every
+        self._checkpoint_every = checkpoint_every
+        self._journal = None
+        self._pending = 0  # turns written but not yet fsync'd
+        self._length = 0  # turns in the journal since the last checkpoint
+        self.checkpoint()
+
+    @classmethod
+    def resume(cls, filename: str, sync_every: int = 16,
+               checkpoint_every: int = 1024) -> "AutosaveJournal":
+        """
+        Restore the game saved by an `AutosaveJournal` and keep journaling.
+
+        Loads the snapshot, replays the journal written after it and starts a
+        new checkpoint from the restored state.
+
+        Raises:
+            SaveStateError: If the snapshot is missing parts or corrupt.
+            OSError: If the snapshot cannot be read.
+        """
+        with open(filename, "rb") as file:
+            data = file.read()
+        model, level = decode_state(data)
+        for key in read_journal(filename + ".journal", zlib.crc32(data)):
+            model.handle_action(key)
+        return cls(filename, model, level, sync_every, checkpoint_every)
+
+    def play(self, key: str) -> bool:
+        """Play `key` on the model with `handle_action` and journal it if a
+        turn was played. Returns whether a turn was played."""
+        played = self.model.handle_action(key)
+        if played:
+            self.record(key)
+        return played
+
+    def record(self, key: str) -> None:
+        """Journal an action that has already played a turn on the model."""
+        self._journal.write(bytes((ACTIONS.index(key.lower()),)))
+        self._pending += 1
+        self._length += 1
+        if self._length >= self._checkpoint_every:
+            self.checkpoint()
+        elif self._pending >= self._sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush and fsync the journal entries written so far."""
+        if self._pending:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._pending = 0
+
+    def checkpoint(self) -> None:
+        """Snapshot the current state and start an empty journal for it."""
+        data = encode_state(self.model, self.level)
+        _write_atomic(self._filename, data)
+        if self._journal is not None:
+            self._journal.close()
+        header = _JOURNAL_HEADER.pack(JOURNAL_MAGIC, STATE_VERSION,
+                                      zlib.crc32(data))
+        _write_atomic(self._filename + ".journal", header)
+        self._journal = open(self._filename + ".journal", "ab")
+        self._pending = 0
+        self._length = 0
+
+    def close(self) -> None:
+        """Sync and close the journal. The files stay on disk for resume."""
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+    def discard(self) -> None:
+        """Close the journal and delete the autosave, e.g. once the game
+        is over and there is nothing left to resume."""
+        self.close()
+        for filename in (self._filename, self._filename + ".journal"):
+            if os.path.exists(filename):
+                os.remove(filename)
+
+
+def read_journal(filename: str, snapshot_checksum: Optional[int] = None
+                 ) -> list[str]:
+    """
+    Read the action keys recorded in a journal file.
+
+    parameter:
+        filename (str): The journal file.
+        snapshot_checksum (Optional[int]): If given, the journal is only
+        used when it was started for the snapshot with this checksum;
+        otherwise no actions are returned.
+
+    Return value:
+        list[str]: The recorded action keys, oldest first. A missing or
+        stale journal yields an empty list.
+    """
+    try:
+        with open(filename, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return []
+    if len(data) < _JOURNAL_HEADER.size:
+        return []
+    magic, version, checksum = _JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC or version != STATE_VERSION:
+        raise SaveStateError("Not a Slug Dungeon journal")
+    if snapshot_checksum is not None and checksum != snapshot_checksum:
+        return []
+    try:
+        return [ACTIONS[code] for code in data[_JOURNAL_HEADER.size:]]
+    except IndexError:
+        raise SaveStateError("Journal is corrupt") from None
+
+
+def _symbol_byte(symbol: str, kind: str) -> bytes:
+    """Returns `symbol` as the single byte it is stored as. Raises
+    ValueError if it does not fit, or is the zero byte used for padding."""
+    encoded = symbol.encode()
+    if len(encoded) != 1 or encoded == b"\0":
+        raise ValueError(f"The {kind} symbol {symbol!r} is not a single "
+                         f"non-zero byte and cannot be saved")
+    return encoded
+
+
+def _weapon_symbol(weapon) -> bytes:
+    """Returns the one byte symbol of `weapon`, or a zero byte if None."""
+    return _symbol_byte(weapon.get_symbol(), "weapon") if weapon else b"\0"
+
+
+def _make_weapon(symbol: bytes):
+    """Inverse of `_weapon_symbol`."""
+    return None if symbol == b"\0" else WEAPON_TYPES[symbol.decode()]()
+
+
+def _pack_entity(entity) -> bytes:
+    """Pack the health, poison and weapon of an entity."""
+    return _ENTITY.pack(entity._max_health, entity.get_health(),
+                        entity.get_poison(),
+                        _weapon_symbol(entity.get_weapon()))
+
+
+def _decode_body(body: bytes) -> tuple[SlugDungeonModel, str]:
+    """Decode the decompressed body of a save state."""
+    offset = 0
+    (length,) = _LEVEL.unpack_from(body, offset)
+    offset += _LEVEL.size
+    level = body[offset:offset + length].decode()
+    offset += length
+
+    rows, cols = _DIMENSIONS.unpack_from(body, offset)
+    offset += _DIMENSIONS.size
+    tiles = []
+    for row in range(rows):
+        tile_row = []
+        for col in range(cols):
+            symbol = body[offset:offset + 1]
+            weapon = body[offset + 1:offset + 2]
+            offset += 2
+            if symbol == b"\0":
+                continue  # padding of a ragged row
+            tile = create_tile(symbol.decode())
+            tile.remove_weapon()
+            if weapon != b"\0":
+                tile.set_weapon(_make_weapon(weapon))
+            tile_row.append(tile)
+        tiles.append(tile_row)
+
+    max_health, health, poison, weapon = _ENTITY.unpack_from(body, offset)
+    offset += _ENTITY.size
+    player = Player(max_health)
+    _restore_entity(player, health, poison, weapon)
+    player_position = _POSITION.unpack_from(body, offset)
+    offset += _POSITION.size
+    prev_player_position = _POSITION.unpack_from(body, offset)
+    offset += _POSITION.size
+
+    (count,) = struct.unpack_from("<I", body, offset)
+    offset += 4
+    slugs = {}
+    for _ in range(count):
+        (symbol, row, col, max_health, health, poison, turn_count,
+         weapon) = _SLUG.unpack_from(body, offset)
+        offset += _SLUG.size
+        slug = SLUG_TYPES[symbol.decode()]()
+        slug._max_health = max_health
+        slug.turn_count = turn_count
+        _restore_entity(slug, health, poison, weapon)
+        slugs[(row, col)] = slug
+
+    model = SlugDungeonModel(tiles, slugs, player, player_position)
+    model._prev_player_position = prev_player_position
+    return model, level
+
+
+def _restore_entity(entity, health: int, poison: int, weapon: bytes) -> None:
+    """Overwrite the decoded stats of a freshly created entity."""
+    entity._current_health = health
+    entity._poison_stat = poison
+    entity._weapon = _make_weapon(weapon)
+
+
+def _write_atomic(filename: str, data: bytes) -> None:
+    """Write `data` to `filename` via an fsync'd temporary file and rename."""
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, filename)
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable
+        directory = os.open(os.path.dirname(os.path.abspath(filename)),
+                            os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
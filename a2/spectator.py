@@ -0,0 +1,429 @@
+"""
+Live spectator feed of a game over a local TCP socket.
+
+`SpectatorFeed` subscribes to a SlugDungeonModel and streams it to any
+number of viewers. A viewer that joins gets a keyframe (a save state plus
+the ids of the slugs), then one delta per turn with only what the turn
+changed: the player, the slugs that moved, were hurt or died, and the cells
+whose weapon changed. Each delta is encoded once and the same bytes are
+queued to every viewer, so encoding does not cost more with more viewers.
+Viewers that fall too far behind are resynchronised with a keyframe rather
+than buffered without bound.
+
+`SpectatorClient` applies the stream to its own copy of the model, which
+can be drawn with raster.py or terminal.py.
+
+Frames are a header (payload length, kind, turn, won/lost flags) and a
+payload. Delta records start with a one byte tag:
+    player: row, col, health, poison, weapon symbol
+    slug: id, row, col, health, poison, weapon symbol
+    died: id
+    cell: row, col, weapon symbol (zero byte for none)
+
+Usage:
+    python spectator.py serve LEVEL [--port N] [--delay S] [--seed N]
+    python spectator.py watch HOST:PORT [--frames DIR]
+"""
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from typing import Optional
+
+from core import SlugDungeonModel, Slug, ACTIONS, WEAPON_TYPES, load_level
+from events import Moved, Died, WeaponDropped, WeaponPickedUp
+from savestate import encode_state, decode_state
+
+
+PORT = 8767
+MAX_BACKLOG = 1 << 20  # bytes queued to a viewer before it is resynchronised
+
+KEYFRAME = 1
+DELTA = 2
+WON = 1  # header flags
+LOST = 2
+
+PLAYER_RECORD = 1
+SLUG_RECORD = 2
+DIED_RECORD = 3
+CELL_RECORD = 4
+
+_HEADER = struct.Struct("<IBIB")  # payload length, kind, turn, flags
+_PLAYER = struct.Struct("<BHHiic")
+_SLUG = struct.Struct("<BIHHiic")
+_DIED = struct.Struct("<BI")
+_CELL = struct.Struct("<BHHc")
+_RECORDS = {PLAYER_RECORD: _PLAYER, SLUG_RECORD: _SLUG, DIED_RECORD: _DIED,
+            CELL_RECORD: _CELL}
+
+
+class SpectatorError(Exception):
+    """Raised when the spectator stream cannot be decoded."""
+
+
+class _Viewer:
+    """One connected viewer and the frames not yet sent to it"""
+    def __init__(self, connection: socket.socket) -> None:
+        self.connection = connection
+        self.queue: deque[memoryview] = deque()
+        self.queued = 0
+
+    def flush(self) -> bool:
+        """Send as much as the socket takes. False if the viewer is gone."""
+        queue = self.queue
+        while queue:
+            try:
+                sent = self.connection.send(queue[0])
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            self.queued -= sent
+            if sent < len(queue[0]):
+                queue[0] = queue[0][sent:]
+                return True
+            queue.popleft()
+        return True
+
+
+class SpectatorFeed:
+    """
+    Streams a model to viewers connecting on `address`.
+
+    The socket is only serviced from `pump`, which runs at the end of every
+    turn; call it while the game is idle too so viewers can join.
+
+    Attribute:
+        address (tuple[str, int]): Where viewers connect.
+
+    Methods:
+        attach(model) -> None: Stream another model from now on.
+        reset() -> None: Send every viewer a keyframe, e.g. after an undo.
+        pump() -> None: Accept viewers and send queued frames.
+        close() -> None: Disconnect everybody.
+    """
+    def __init__(self, model: SlugDungeonModel, host: str = "127.0.0.1",
+                 port: int = PORT, max_backlog: int = MAX_BACKLOG) -> None:
+        self._server = socket.create_server((host, port))
+        self._server.setblocking(False)
+        self.address = self._server.getsockname()[:2]
+        self.max_backlog = max_backlog
+        self._viewers: list[_Viewer] = []
+        self._model: Optional[SlugDungeonModel] = None
+        self.attach(model)
+
+    def attach(self, model: SlugDungeonModel) -> None:
+        if self._model is not None:
+            self._model.unsubscribe(self._on_turn)
+        self._model = model
+        self._ids: dict[Slug, int] = {}
+        self._next_id = 0
+        self._turn = 0
+        model.subscribe(self._on_turn)
+        self.reset()
+
+    def reset(self) -> None:
+        self._keyframe = None
+        for viewer in self._viewers:
+            self._resync(viewer)
+        self.pump()
+
+    def _slug_id(self, slug: Slug) -> int:
+        slug_id = self._ids.get(slug)
+        if slug_id is None:
+            slug_id = self._ids[slug] = self._next_id
+            self._next_id += 1
+        return slug_id
+
+    def _flags(self) -> int:
+        model = self._model
+        return WON if model.has_won() else LOST if model.has_lost() else 0
+
+    def _get_keyframe(self) -> memoryview:
+        """The keyframe of the current turn, encoded once for all joins"""
+        if self._keyframe is None:
+            model = self._model
+            ids = array("I", (self._slug_id(slug)
+                              for slug in model.get_slugs().values()))
+            state = encode_state(model)
+            payload = struct.pack("<I", len(state)) + state + ids.tobytes()
+            self._keyframe = memoryview(
+                _HEADER.pack(len(payload), KEYFRAME, self._turn,
+                             self._flags()) + payload)
+        return self._keyframe
+
+    def _on_turn(self, model: SlugDungeonModel, events: list) -> None:
+        self._turn += 1
+        self._keyframe = None
+        if self._viewers:
+            frame = memoryview(self._encode_delta(events))
+            for viewer in self._viewers:
+                if viewer.queued + len(frame) > self.max_backlog:
+                    self._resync(viewer)
+                else:
+                    viewer.queue.append(frame)
+                    viewer.queued += len(frame)
+        else:
+            # No delta to encode, but the ids of dead slugs are still freed
+            for event in events:
+                if isinstance(event, Died):
+                    self._ids.pop(event.entity, None)
+        self.pump()
+
+    def _encode_delta(self, events: list) -> bytes:
+        model = self._model
+        player = model.get_player()
+        row, col = model.get_player_position()
+        parts = [_PLAYER.pack(PLAYER_RECORD, row, col, player.get_health(),
+                              player.get_poison(),
+                              _weapon_symbol(player.get_weapon()))]
+
+        # Deaths first and then moves in the order they were made, so every
+        # move lands on a cell that is free when the viewer applies it
+        died: list[Slug] = []
+        moved: dict[Slug, None] = {}
+        hurt: dict[Slug, None] = {}
+        cells: dict[tuple[int, int], None] = {}
+        for event in events:
+            entity = getattr(event, "entity", None)
+            if isinstance(event, Died):
+                died.append(entity)
+            elif isinstance(event, (WeaponDropped, WeaponPickedUp)):
+                cells[event.position] = None
+            elif isinstance(entity, Slug):
+                (moved if isinstance(event, Moved) else hurt)[entity] = None
+        for slug in died:
+            parts.append(_DIED.pack(DIED_RECORD, self._slug_id(slug)))
+            del self._ids[slug]
+        for slug in {**moved, **hurt}:
+            if slug in died:
+                continue
+            row, col = model.get_slug_position(slug)
+            parts.append(_SLUG.pack(SLUG_RECORD, self._slug_id(slug), row,
+                                    col, slug.get_health(), slug.get_poison(),
+                                    _weapon_symbol(slug.get_weapon())))
+        for row, col in cells:
+            weapon = model.get_tile((row, col)).get_weapon()
+            parts.append(_CELL.pack(CELL_RECORD, row, col,
+                                    _weapon_symbol(weapon)))
+        payload = b"".join(parts)
+        return _HEADER.pack(len(payload), DELTA, self._turn,
+                            self._flags()) + payload
+
+    def _resync(self, viewer: _Viewer) -> None:
+        """Drop what a viewer has queued and start it over from a keyframe"""
+        keyframe = self._get_keyframe()
+        if viewer.queue and len(viewer.queue[0]) != len(viewer.queue[0].obj):
+            # Finish the frame being sent so the stream stays aligned
+            partial = viewer.queue[0]
+            viewer.queue.clear()
+            viewer.queue.append(partial)
+            viewer.queued = len(partial)
+        else:
+            viewer.queue.clear()
+            viewer.queued = 0
+        viewer.queue.append(keyframe)
+        viewer.queued += len(keyframe)
+
+    def pump(self) -> None:
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except BlockingIOError:
+                break
+            connection.setblocking(False)
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            viewer = _Viewer(connection)
+            self._resync(viewer)
+            self._viewers.append(viewer)
+        alive = []
+        for viewer in self._viewers:
+            if viewer.flush():
+                alive.append(viewer)
+            else:
+                viewer.connection.close()
+        self._viewers = alive
+
+    def close(self) -> None:
+        self._model.unsubscribe(self._on_turn)
+        for viewer in self._viewers:
+            viewer.connection.close()
+        self._viewers = []
+        self._server.close()
+
+
+class SpectatorClient:
+    """
+    Receives a spectator stream into a local copy of the model.
+
+    Attribute:
+        model (Optional[SlugDungeonModel]): The game as of the latest
+        frame, None before the first keyframe.
+        turn (int): The turn of the latest frame.
+        won, lost (bool): Whether the game ended.
+
+    Methods:
+        receive() -> bool: Read and apply one frame, False once the feed
+        closed.
+    """
+    def __init__(self, host: str, port: int = PORT) -> None:
+        self._connection = socket.create_connection((host, port))
+        self._file = self._connection.makefile("rb")
+        self.model: Optional[SlugDungeonModel] = None
+        self.turn = 0
+        self.won = self.lost = False
+        self._slugs: dict[int, Slug] = {}
+
+    def receive(self) -> bool:
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return False
+        length, kind, self.turn, flags = _HEADER.unpack(header)
+        payload = self._file.read(length)
+        if len(payload) < length:
+            return False
+        if kind == KEYFRAME:
+            self._apply_keyframe(payload)
+        elif kind == DELTA:
+            if self.model is None:
+                raise SpectatorError("Delta before the first keyframe")
+            self._apply_delta(payload)
+        else:
+            raise SpectatorError(f"Unknown frame kind {kind}")
+        self.won, self.lost = bool(flags & WON), bool(flags & LOST)
+        return True
+
+    def _apply_keyframe(self, payload: bytes) -> None:
+        (length,) = struct.unpack_from("<I", payload)
+        self.model, _ = decode_state(payload[4:4 + length])
+        ids = array("I")
+        ids.frombytes(payload[4 + length:])
+        self._slugs = dict(zip(ids, self.model.get_slugs().values()))
+
+    def _apply_delta(self, payload: bytes) -> None:
+        model = self.model
+        offset = 0
+        while offset < len(payload):
+            record = _RECORDS.get(payload[offset])
+            if record is None:
+                raise SpectatorError(f"Unknown record {payload[offset]}")
+            tag, *values = record.unpack_from(payload, offset)
+            offset += record.size
+            if tag == PLAYER_RECORD:
+                row, col, health, poison, weapon = values
+                if (row, col) != model.get_player_position():
+                    model._set_player_position((row, col))
+                _set_stats(model.get_player(), health, poison, weapon)
+            elif tag == SLUG_RECORD:
+                slug_id, row, col, health, poison, weapon = values
+                slug = self._slugs[slug_id]
+                position = model.get_slug_position(slug)
+                if position != (row, col):
+                    model._move_slug(slug, position, (row, col))
+                _set_stats(slug, health, poison, weapon)
+            elif tag == DIED_RECORD:
+                slug = self._slugs.pop(values[0])
+                model._remove_slug(model.get_slug_position(slug))
+            else:
+                row, col, weapon = values
+                tile = model.get_tile((row, col))
+                tile.remove_weapon()
+                if weapon != b"\0":
+                    tile.set_weapon(WEAPON_TYPES[weapon.decode()]())
+        model._store.clock += 1  # every slug ended its turn
+
+    def close(self) -> None:
+        self._file.close()
+        self._connection.close()
+
+
+def _weapon_symbol(weapon) -> bytes:
+    return weapon.get_symbol().encode() if weapon else b"\0"
+
+
+def _set_stats(entity, health: int, poison: int, weapon: bytes) -> None:
+    entity._current_health = health
+    entity._poison_stat = poison
+    current = entity.get_weapon()
+    if _weapon_symbol(current) != weapon:
+        entity._weapon = None if weapon == b"\0" \
+            else WEAPON_TYPES[weapon.decode()]()
+
+
+def serve(level: str, host: str, port: int, delay: float,
+          seed: int) -> None:
+    """Play random games of `level` forever, streaming them"""
+    rng = random.Random(seed)
+    model = load_level(level)
+    feed = SpectatorFeed(model, host, port)
+    print(f"streaming {level} on port {feed.address[1]}")
+    try:
+        while True:
+            if model.has_won() or model.has_lost():
+                time.sleep(delay * 10)
+                model = load_level(level)
+                feed.attach(model)
+            model.handle_action(rng.choice(ACTIONS))
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                feed.pump()
+                time.sleep(min(0.01, delay))
+    finally:
+        feed.close()
+
+
+def watch(address: str, frames: Optional[str]) -> None:
+    """Print a line per turn of a feed, optionally rendering frames"""
+    host, _, port = address.rpartition(":")
+    client = SpectatorClient(host or "127.0.0.1", int(port or PORT))
+    rasterizer = None
+    while client.receive():
+        model = client.model
+        print(f"turn {client.turn:5d}  player {model.get_player_position()}"
+              f"  hp {model.get_player().get_health():3d}"
+              f"  slugs {len(model.get_slugs())}"
+              + ("  won" if client.won else "  lost" if client.lost else ""))
+        if frames is not None:
+            from raster import Rasterizer
+            if rasterizer is None \
+                    or rasterizer.height != model.get_dimensions()[0] \
+                    * rasterizer.cell_size:
+                os.makedirs(frames, exist_ok=True)
+                rasterizer = Rasterizer(model.get_dimensions())
+            rasterizer.render(model)
+            rasterizer.save(os.path.join(frames,
+                                         f"turn{client.turn:06d}.png"))
+    client.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="stream bot games")
+    serve_parser.add_argument("level")
+    serve_parser.add_argument("--host", default="0.0.0.0",
+                              help="address to listen on (default: all)")
+    serve_parser.add_argument("--port", type=int, default=PORT)
+    serve_parser.add_argument("--delay", type=float, default=0.2,
+                              help="seconds between turns")
+    serve_parser.add_argument("--seed", type=int, default=0)
+    watch_parser = commands.add_parser("watch", help="follow a stream")
+    watch_parser.add_argument("address", help="HOST:PORT")
+    watch_parser.add_argument("--frames", default=None,
+                              help="also render every turn as a PNG here")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.level, args.host, args.port, args.delay, args.seed)
+    else:
+        watch(args.address, args.frames)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
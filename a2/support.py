@@ -1,42 +1,7 @@
 import tkinter as tk
 from typing import Union
 
-
-Position = tuple[int, int]
-
-WEAPON_SYMBOL = "W"
-POISON_DART_SYMBOL = "D"
-POISON_SWORD_SYMBOL = "S"
-HEALING_ROCK_SYMBOL = "H"
-WALL_TILE = "#"
-FLOOR_TILE = " "
-GOAL_TILE = "G"
-ENTITY_SYMBOL = "E"
-PLAYER_SYMBOL = "P"
-SLUG_SYMBOL = "M"
-NICE_SLUG_SYMBOL = "N"  # :)
-ANGRY_SLUG_SYMBOL = "A"  # >:(
-SCARED_SLUG_SYMBOL = "L"  # :O
-
-DUNGEON_MAP_SIZE = (500, 500)
-SLUG_INFO_SIZE = (400, 500)
-MAX_SLUGS = 6
-PLAYER_INFO_SIZE = (900, 100)
-PLAYER_COLOUR = "#81b7e3"
-SLUG_COLOUR = "green"
-GOAL_COLOUR = "#f0d005"
-WALL_COLOUR = "#2e2208"
-FLOOR_COLOUR = "#f5efc9"
-
-POSITION_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-
-TITLE_FONT = ("Arial", 20, "bold")
-REGULAR_FONT = ("Arial", 14)
-
-WIN_TITLE = "You won!"
-WIN_MESSAGE = "Congratulations, you won! Play again?"
-LOSE_TITLE = "You lost!"
-LOSE_MESSAGE = "You lost! Better luck next time. Play again?"
+from constants import *
 
 
 class AbstractGrid(tk.Canvas):
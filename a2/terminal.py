@@ -0,0 +1,341 @@
+"""
+Terminal frontend, for playing over SSH without X.
+
+Plays a SlugDungeonModel with the keys of the Tk game (w/a/s/d move, space
+attacks, f toggles fog of war, Ctrl+Z / Ctrl+Y undo and redo, q quits) and
+draws the map, the player table and the slug table with ANSI escape codes.
+
+Frames are composed in a `Screen` buffer of character cells, and only the
+cells that changed since the previous frame are written: one cursor move per
+run of changes, and colour codes only when the colour changes. A turn on a
+large map costs a few dozen bytes rather than a full repaint. Maps larger
+than the terminal are shown through a viewport that follows the player.
+
+Usage:
+    python terminal.py LEVEL
+"""
+import argparse
+import os
+import select
+import shutil
+import sys
+import termios
+import tty
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from constants import (WALL_TILE, GOAL_TILE, PLAYER_SYMBOL, MAX_SLUGS,
+                       FOG_KEY, FOG_RADIUS, WIN_MESSAGE, LOSE_MESSAGE)
+from core import SlugDungeonModel, load_level
+
+
+QUIT_KEYS = ("q", "\x03")  # q and Ctrl+C
+UNDO_CHAR = "\x1a"  # Ctrl+Z, delivered as a character in raw mode
+REDO_CHAR = "\x19"  # Ctrl+Y
+VIEW_MARGIN = 4  # cells kept between the player and the viewport edge
+REWRITE_GAP = 4  # unchanged cells rewritten rather than skipped with a move
+POLL_SECONDS = 0.25  # how often to check for a terminal resize
+TABLE_LINES = MAX_SLUGS + 6  # player table, slug table and status line
+
+# Map cells as (character, SGR parameters)
+WALL_CELL = (WALL_TILE, "33")
+FLOOR_CELL = (".", "")
+GOAL_CELL = (GOAL_TILE, "1;33")
+FOG_CELL = (" ", "")
+PLAYER_STYLE = "1;36"
+SLUG_STYLE = "32"
+MOVING_SLUG_STYLE = "35"  # as DungeonMap draws slugs about to move
+WEAPON_STYLE = "1"
+REMEMBERED_STYLE = "2"  # added to cells seen before but not in view
+
+COLUMNS = (("Name", 12), ("Position", 10), ("Weapon", 14), ("Health", 7),
+           ("Poison", 7))
+
+Cell = tuple[str, str]
+
+
+class Screen:
+    """
+    A buffer of character cells and what the terminal currently shows.
+
+    Methods:
+        resize(rows, cols) -> None: Change the size, forgetting what is shown.
+        clear() -> None: Blank the buffer.
+        put(row, col, text, style) -> None: Write text into the buffer.
+        render() -> str: The escape codes updating the terminal to the
+        buffer, and remember it as shown.
+    """
+    def __init__(self, rows: int, cols: int) -> None:
+        self.resize(rows, cols)
+
+    def resize(self, rows: int, cols: int) -> None:
+        self.rows, self.cols = rows, cols
+        self._cells = [[FOG_CELL] * cols for _ in range(rows)]
+        self._shown: list[list[Cell]] = []
+        self._full = True  # the terminal contents are unknown
+
+    def clear(self) -> None:
+        for row in self._cells:
+            row[:] = [FOG_CELL] * self.cols
+
+    def put(self, row: int, col: int, text: str, style: str = "") -> None:
+        """Write `text` from (row, col), clipped to the screen"""
+        if not 0 <= row < self.rows:
+            return
+        line = self._cells[row]
+        for offset, char in enumerate(text[:max(0, self.cols - col)]):
+            line[col + offset] = (char, style)
+
+    def put_cells(self, row: int, col: int, cells: list[Cell]) -> None:
+        if 0 <= row < self.rows:
+            cells = cells[:max(0, self.cols - col)]
+            self._cells[row][col:col + len(cells)] = cells
+
+    def render(self) -> str:
+        out = []
+        if self._full:
+            out.append("\x1b[0m\x1b[2J")
+            self._shown = [[FOG_CELL] * self.cols for _ in range(self.rows)]
+            self._full = False
+        style: Optional[str] = None  # unknown until the first code
+        cursor: Optional[tuple[int, int]] = None
+
+        def emit(cell: Cell) -> None:
+            nonlocal style
+            char, cell_style = cell
+            if cell_style != style:
+                out.append(f"\x1b[0;{cell_style}m" if cell_style
+                           else "\x1b[0m")
+                style = cell_style
+            out.append(char)
+
+        for row, (cells, shown) in enumerate(zip(self._cells, self._shown)):
+            if cells == shown:
+                continue
+            for col, cell in enumerate(cells):
+                if cell == shown[col]:
+                    continue
+                if cursor != (row, col):
+                    if cursor is not None and cursor[0] == row \
+                            and col - cursor[1] <= REWRITE_GAP:
+                        # Rewriting a few cells is shorter than a move
+                        for gap in range(cursor[1], col):
+                            emit(cells[gap])
+                    else:
+                        out.append(f"\x1b[{row + 1};{col + 1}H")
+                emit(cell)
+                # Past the last column the cursor position is unreliable
+                cursor = (row, col + 1) if col + 1 < self.cols else None
+            self._shown[row] = cells.copy()
+        if style:
+            out.append("\x1b[0m")
+        return "".join(out)
+
+
+class TerminalGame:
+    """
+    The game loop of the terminal frontend, separate from the terminal
+    itself so it can be driven by any source of keys.
+
+    Methods:
+        handle_key(char) -> bool: Play one key, False once the game should
+        close.
+        draw() -> None: Compose the current state into the screen.
+        run() -> None: Play in the terminal until the player quits.
+    """
+    def __init__(self, filename: str, screen: Screen) -> None:
+        self.filename = filename
+        self.screen = screen
+        self.fog_radius = None
+        self.message = "w/a/s/d move, space attacks, f fog, " \
+                       "Ctrl+Z/Ctrl+Y undo/redo, q quits"
+        self.game_over = False
+        self._origin = (0, 0)  # map cell at the top left of the viewport
+        self.bytes_written = 0
+        self.frames = 0
+        self.set_model(load_level(filename))
+
+    def set_model(self, model: SlugDungeonModel) -> None:
+        self.model = model
+        self.model.set_fog_of_war(self.fog_radius)
+        self.model.enable_undo()
+        self.game_over = False
+
+    def handle_key(self, char: str) -> bool:
+        if self.game_over:
+            if char.lower() == "y":
+                self.set_model(load_level(self.filename))
+                self.message = ""
+                return True
+            return char.lower() not in ("n",) + QUIT_KEYS
+        if char.lower() in QUIT_KEYS:
+            return False
+        if char.lower() == FOG_KEY:
+            self.fog_radius = None if self.fog_radius else FOG_RADIUS
+            self.model.set_fog_of_war(self.fog_radius)
+        elif char == UNDO_CHAR:
+            self.model.undo()
+        elif char == REDO_CHAR:
+            self.model.redo()
+        else:
+            self.model.handle_action(char)
+
+        if self.model.has_won():
+            self.message, self.game_over = WIN_MESSAGE + " (y/n)", True
+        elif self.model.has_lost():
+            self.message, self.game_over = LOSE_MESSAGE + " (y/n)", True
+        return True
+
+    def draw(self) -> None:
+        screen = self.screen
+        screen.clear()
+        view_rows = max(1, screen.rows - TABLE_LINES)
+        view_cols = screen.cols
+        self._follow_player(view_rows, view_cols)
+        self._draw_map(view_rows, view_cols)
+
+        model = self.model
+        player = model.get_player()
+        top = min(view_rows, model.get_dimensions()[0]) + 1
+        self._draw_table(top, [(player.get_name(),
+                                model.get_player_position(), player)])
+        player_position = model.get_player_position()
+        fov = model.get_field_of_view()
+        slugs = sorted(
+            ((position, slug) for position, slug in model.get_slugs().items()
+             if fov is None or fov.is_visible(position)),
+            key=lambda item: abs(item[0][0] - player_position[0])
+            + abs(item[0][1] - player_position[1]))
+        self._draw_table(top + 3, [(slug.get_name(), position, slug)
+                                   for position, slug in slugs[:MAX_SLUGS]])
+        screen.put(screen.rows - 1, 0, self.message, "1")
+
+    def _follow_player(self, view_rows: int, view_cols: int) -> None:
+        """Move the viewport only when the player gets near its edge, so
+        the map does not scroll on every step"""
+        rows, cols = self.model.get_dimensions()
+        player_row, player_col = self.model.get_player_position()
+        top, left = self._origin
+        margin_rows = min(VIEW_MARGIN, view_rows // 2)
+        margin_cols = min(VIEW_MARGIN, view_cols // 2)
+        if not top + margin_rows <= player_row < top + view_rows - margin_rows:
+            top = player_row - view_rows // 2
+        if not left + margin_cols <= player_col \
+                < left + view_cols - margin_cols:
+            left = player_col - view_cols // 2
+        self._origin = (max(0, min(top, rows - view_rows)),
+                        max(0, min(left, cols - view_cols)))
+
+    def _draw_map(self, view_rows: int, view_cols: int) -> None:
+        model = self.model
+        tiles = model.get_tiles()
+        slugs = model.get_slugs()
+        player_position = model.get_player_position()
+        fov = model.get_field_of_view()
+        top, left = self._origin
+        for row in range(top, min(top + view_rows, len(tiles))):
+            tile_row = tiles[row]
+            cells = []
+            for col in range(left, min(left + view_cols, len(tile_row))):
+                cells.append(self._cell(tile_row[col], (row, col), slugs,
+                                        player_position, fov))
+            self.screen.put_cells(row - top, 0, cells)
+
+    @staticmethod
+    def _cell(tile, position, slugs, player_position, fov) -> Cell:
+        """What a map cell shows, following the rules of DungeonMap.redraw"""
+        visible = fov is None or fov.is_visible(position)
+        if not visible and not fov.is_seen(position):
+            return FOG_CELL
+        symbol = tile.get_symbol()
+        if position == player_position:
+            cell = (PLAYER_SYMBOL, PLAYER_STYLE)
+        elif visible and position in slugs:
+            slug = slugs[position]
+            cell = (slug.get_symbol(), MOVING_SLUG_STYLE if slug.can_move()
+                    else SLUG_STYLE)
+        elif visible and tile.get_weapon() is not None:
+            cell = (tile.get_weapon().get_symbol(), WEAPON_STYLE)
+        elif symbol == GOAL_TILE:
+            cell = GOAL_CELL
+        else:
+            cell = WALL_CELL if tile.is_blocking() else FLOOR_CELL
+        if not visible:
+            cell = (cell[0], ";".join(part for part in (cell[1],
+                                                        REMEMBERED_STYLE)
+                                      if part))
+        return cell
+
+    def _draw_table(self, top: int, rows: list) -> None:
+        col = 0
+        for header, width in COLUMNS:
+            self.screen.put(top, col, header.ljust(width), "1;4")
+            col += width
+        for row, (name, position, entity) in enumerate(rows, start=1):
+            weapon = entity.get_weapon()
+            values = (name, str(position), str(weapon) if weapon else "None",
+                      str(entity.get_health()), str(entity.get_poison()))
+            col = 0
+            for value, (_, width) in zip(values, COLUMNS):
+                self.screen.put(top + row, col, value[:width - 1])
+                col += width
+
+    def refresh(self, out) -> None:
+        """Draw and write the changed cells to the file descriptor `out`"""
+        self.draw()
+        data = self.screen.render().encode()
+        os.write(out, data)
+        self.bytes_written += len(data)
+        self.frames += 1
+
+    def run(self) -> None:
+        with raw_terminal() as (keys, out):
+            size = shutil.get_terminal_size()
+            self.refresh(out)
+            while True:
+                if shutil.get_terminal_size() != size:
+                    size = shutil.get_terminal_size()
+                    self.screen.resize(size.lines, size.columns)
+                    self.refresh(out)
+                ready, _, _ = select.select([keys], [], [], POLL_SECONDS)
+                if not ready:
+                    continue
+                char = os.read(keys, 1).decode(errors="ignore")
+                if not self.handle_key(char):
+                    break
+                self.refresh(out)
+
+
+@contextmanager
+def raw_terminal() -> Iterator[tuple[int, int]]:
+    """Switch the terminal to raw input on the alternate screen, restoring
+    it on exit. Yields the (input, output) file descriptors."""
+    keys, out = sys.stdin.fileno(), sys.stdout.fileno()
+    saved = termios.tcgetattr(keys)
+    os.write(out, b"\x1b[?1049h\x1b[?25l")  # alternate screen, hide cursor
+    try:
+        tty.setraw(keys)
+        yield keys, out
+    finally:
+        termios.tcsetattr(keys, termios.TCSADRAIN, saved)
+        os.write(out, b"\x1b[0m\x1b[?25h\x1b[?1049l")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("level")
+    args = parser.parse_args()
+    if not sys.stdin.isatty():
+        print("terminal.py needs an interactive terminal", file=sys.stderr)
+        return 1
+    size = shutil.get_terminal_size()
+    game = TerminalGame(args.level, Screen(size.lines, size.columns))
+    game.run()
+    if game.frames:
+        print(f"{game.frames} frames, "
+              f"{game.bytes_written / game.frames:.0f} bytes per frame")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Tests of batch turns (SlugDungeonModel.apply_moves), including two-phase
+moves decided on an executor.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import tempfile
+import unittest
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from chunks import load_chunked_level
+from core import ACTIONS, parse_level, read_level
+from testutils import (LEVELS, random_actions, random_level, state,
+                       write_level)
+
+
+def trace_of(model, actions: str) -> tuple:
+    """The TurnTrace that playing `actions` one handle_action at a time
+    adds up to, with the state after the last turn"""
+    consumed, entries = 0, []
+    for action in actions:
+        if model.has_won() or model.has_lost():
+            break
+        consumed += 1
+        if model.handle_action(action):
+            row, col = model.get_player_position()
+            entries.append((row, col, model.get_player().get_health(),
+                            model.get_player().get_poison(),
+                            len(model.get_slugs())))
+    return consumed, entries, state(model)
+
+
+def applied(model, actions) -> tuple:
+    """The TurnTrace of `model.apply_moves(actions)` in the form of
+    `trace_of`"""
+    trace = model.apply_moves(actions)
+    entries = list(zip(trace.rows, trace.cols, trace.health, trace.poison,
+                       trace.slugs))
+    return trace.actions, entries, state(model)
+
+
+def crowded_levels(count: int) -> list[list[str]]:
+    """The bundled levels, then `count` random levels with many slugs
+    competing for the same cells"""
+    rng = random.Random(45)
+    levels = [read_level(path) for path in LEVELS]
+    while len(levels) < len(LEVELS) + count:
+        lines = random_level(rng, rng.randint(5, 12), rng.randint(5, 12))
+        if sum(line.count("A") + line.count("L")
+               for line in lines[1:]) >= 4:
+            levels.append(lines)
+    return levels
+
+
+class ApplyMovesTestCase(unittest.TestCase):
+    def test_matches_handle_action(self) -> None:
+        for number, lines in enumerate(crowded_levels(20)):
+            for seed in range(3):
+                with self.subTest(level=number, seed=seed):
+                    actions = random_actions(seed, 120)
+                    self.assertEqual(applied(parse_level(lines), actions),
+                                     trace_of(parse_level(lines), actions))
+
+    def test_action_codes_match_keys(self) -> None:
+        actions = random_actions(3, 120)
+        codes = array("B", (ACTIONS.index(action) for action in actions))
+        for path in LEVELS:
+            with self.subTest(path=path):
+                lines = read_level(path)
+                self.assertEqual(applied(parse_level(lines), codes),
+                                 applied(parse_level(lines), actions))
+                self.assertEqual(applied(parse_level(lines), bytes(codes)),
+                                 applied(parse_level(lines), actions))
+
+    def test_stops_once_the_game_is_over(self) -> None:
+        # Walking right twice reaches the goal; the rest is not consumed
+        model = parse_level(["5\n", "#####\n", "#P G#\n", "#####\n"])
+        trace = model.apply_moves("dddwsa")
+        self.assertEqual(trace.actions, 2)
+        self.assertEqual(list(trace.cols), [2, 3])
+        self.assertTrue(model.has_won())
+
+    def test_blocked_moves_add_no_entry(self) -> None:
+        model = parse_level(["5\n", "#####\n", "#P G#\n", "#####\n"])
+        trace = model.apply_moves("wawd")
+        self.assertEqual(trace.actions, 4)
+        self.assertEqual(list(trace.cols), [2])
+
+
+class ExecutorTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_thread_pool_plays_like_no_executor(self) -> None:
+        # Chunked maps have no policy tables, so every slug that can move
+        # is decided on the executor; parsed maps only send it the others
+        with ThreadPoolExecutor(4) as threads:
+            for number, lines in enumerate(crowded_levels(20)):
+                path = write_level(self.directory, "".join(lines))
+                for chunked in (False, True):
+                    for seed in range(3):
+                        with self.subTest(level=number, chunked=chunked,
+                                          seed=seed):
+                            actions = random_actions(seed, 120)
+                            models = []
+                            for executor in (None, threads):
+                                model = load_chunked_level(path, 4) \
+                                    if chunked else parse_level(lines)
+                                model.set_two_phase_moves(True, executor)
+                                models.append(model)
+                            expected = applied(models[0], actions)
+                            self.assertEqual(applied(models[1], actions),
+                                             expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests of the packed cell tables of dense maps (SlugDungeonModel._passable,
+_neighbour_masks and _occupied) against the tiles and entities they are
+built from.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+import core
+from core import (NEIGHBOUR_DELTAS, PLAYER_CELL, SLUG_CELL, parse_level,
+                  read_level, register_tile)
+from testutils import LEVELS, keep_registries, play_random, random_level
+
+
+def levels(seed: int, count: int) -> list[list[str]]:
+    """The bundled levels and `count` random ones"""
+    rng = random.Random(seed)
+    return [read_level(path) for path in LEVELS] + \
+        [random_level(rng, rng.randint(4, 14), rng.randint(4, 14))
+         for _ in range(count)]
+
+
+class CellTablesTestCase(unittest.TestCase):
+    def assert_terrain_matches_tiles(self, model) -> None:
+        rows, cols = model.get_dimensions()
+        tiles = model.get_tiles()
+
+        def passable(row: int, col: int) -> bool:
+            return 0 <= row < rows and 0 <= col < cols \
+                and not tiles[row][col].is_blocking()
+
+        for row in range(rows):
+            for col in range(cols):
+                cell = model.get_cell_index((row, col))
+                self.assertEqual(model.get_cell_position(cell), (row, col))
+                self.assertEqual(model._passable[cell] == 1,
+                                 passable(row, col), (row, col))
+                mask = sum(1 << direction for direction, (d_row, d_col)
+                           in enumerate(NEIGHBOUR_DELTAS)
+                           if passable(row + d_row, col + d_col))
+                self.assertEqual(model._neighbour_masks[cell], mask,
+                                 (row, col))
+
+    def assert_occupancy_matches_entities(self, model) -> None:
+        rows, cols = model.get_dimensions()
+        expected = bytearray(rows * cols)
+        expected[model.get_cell_index(model.get_player_position())] |= \
+            PLAYER_CELL
+        for position in model.get_slugs():
+            expected[model.get_cell_index(position)] |= SLUG_CELL
+        self.assertEqual(model._occupied, expected)
+
+    def test_terrain_matches_tiles(self) -> None:
+        for number, lines in enumerate(levels(33, 30)):
+            with self.subTest(level=number):
+                self.assert_terrain_matches_tiles(parse_level(lines))
+
+    def test_registered_tiles(self) -> None:
+        keep_registries(self, core.TILE_TYPES, core.TILE_COLOURS)
+        register_tile("~", True, "blue")
+        register_tile(",", False, "green")
+        model = parse_level(["10\n", "#~~,#\n", "#P,~G\n", ",~###\n"])
+        self.assert_terrain_matches_tiles(model)
+        # The player's cell only opens to the right, onto the new floor
+        self.assertEqual(model._neighbour_masks[model.get_cell_index(
+            (1, 1))], 0b1000)
+
+    def test_occupancy_follows_play(self) -> None:
+        rng = random.Random(330)
+        for number, lines in enumerate(levels(34, 20)):
+            with self.subTest(level=number):
+                model = parse_level(lines)
+                self.assert_occupancy_matches_entities(model)
+                play_random(model, rng, 80,
+                            self.assert_occupancy_matches_entities)
+                # Clones share the terrain and own their occupancy
+                clone = model.clone()
+                self.assertIs(clone._passable, model._passable)
+                self.assertIs(clone._neighbour_masks, model._neighbour_masks)
+                self.assertIsNot(clone._occupied, model._occupied)
+                self.assert_occupancy_matches_entities(clone)
+
+    def test_cell_lookups_match_position_lookups(self) -> None:
+        rng = random.Random(331)
+        for number, lines in enumerate(levels(35, 20)):
+            with self.subTest(level=number):
+                model = parse_level(lines)
+                play_random(model, rng, 30)
+                rows, cols = model.get_dimensions()
+                tiles = model.get_tiles()
+                for row in range(-1, rows + 1):
+                    for col in range(-1, cols + 1):
+                        on_map = 0 <= row < rows and 0 <= col < cols
+                        self.assertEqual(
+                            model.is_valid_position((row, col)),
+                            on_map and not tiles[row][col].is_blocking()
+                            and (row, col) not in model.get_slugs())
+                taken = {*model.get_slugs(), model.get_player_position()}
+                for row, col in model.get_slugs():
+                    free = [(row + d_row, col + d_col)
+                            for d_row, d_col in NEIGHBOUR_DELTAS
+                            if model.is_valid_position((row + d_row,
+                                                        col + d_col))
+                            and (row + d_row, col + d_col) not in taken]
+                    self.assertEqual(
+                        [model.get_cell_position(cell)
+                         for cell in model.get_valid_slug_cells(
+                             model.get_cell_index((row, col)))],
+                        [(row, col)] + free)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Tests of chunked map storage (chunks.py): chunks read from the level file,
+written back and evicted by count and by idle time.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+import core
+from chunks import ChunkedTiles, LevelChunkSource, load_chunked_level
+from core import parse_level, read_level, register_tile
+from testutils import (LEVELS, keep_registries, play_random, random_level,
+                       state, write_level)
+
+
+class Clock:
+    """A stand-in for time.monotonic that only moves when told to"""
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def tiles(model) -> list[list[tuple]]:
+    return [[(tile.get_symbol(), tile.is_blocking(), repr(tile.get_weapon()))
+             for tile in row] for row in model.get_tiles()]
+
+
+class LoadTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def assert_loads_like_parse(self, path: str) -> None:
+        expected = parse_level(read_level(path))
+        for chunk_size in (1, 3, 4, 64):
+            with self.subTest(path=path, chunk_size=chunk_size):
+                model = load_chunked_level(path, chunk_size, max_loaded=2)
+                self.assertEqual(tiles(model), tiles(expected))
+                # _slugs order shows in the game
+                self.assertEqual(state(model, tiles=False),
+                                 state(expected, tiles=False))
+
+    def test_loads_like_parse_level(self) -> None:
+        rng = random.Random(32)
+        paths = list(LEVELS)
+        for number in range(20):
+            lines = random_level(rng, rng.randint(3, 20), rng.randint(3, 20))
+            paths.append(write_level(self.directory, "".join(lines),
+                                     f"level{number}.txt"))
+        for path in paths:
+            self.assert_loads_like_parse(path)
+
+    def test_crlf_line_endings(self) -> None:
+        lines = read_level(LEVELS[0])
+        path = os.path.join(self.directory, "crlf.txt")
+        with open(path, "wb") as file:
+            file.write("".join(lines).replace("\n", "\r\n").encode())
+        model = load_chunked_level(path, chunk_size=4)
+        self.assertEqual(tiles(model), tiles(parse_level(lines)))
+
+    def test_short_rows_are_padded_with_walls(self) -> None:
+        path = write_level(self.directory, "10\n#####\n#P G\n###\n")
+        model = load_chunked_level(path, chunk_size=2)
+        self.assertEqual(model.get_dimensions(), (3, 5))
+        self.assertEqual(["".join(symbol for symbol, *_ in row)
+                          for row in tiles(model)],
+                         ["#####", "#  G#", "#####"])
+
+    def test_columns_count_characters_not_bytes(self) -> None:
+        keep_registries(self, core.TILE_TYPES, core.TILE_COLOURS)
+        register_tile("≈", True, "blue")  # water, 3 bytes in UTF-8
+        path = os.path.join(self.directory, "water.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("10\n#########\n#≈≈  P D#\n#≈ A   G#\n"
+                       "#########\n")
+        expected = parse_level(read_level(path))
+        for chunk_size in (2, 3, 64):
+            with self.subTest(chunk_size=chunk_size):
+                model = load_chunked_level(path, chunk_size)
+                self.assertEqual(tiles(model), tiles(expected))
+                self.assertEqual(model.get_player_position(), (1, 5))
+                self.assertEqual(list(model.get_slugs()), [(2, 3)])
+
+    def test_level_is_not_read_into_memory(self) -> None:
+        rows = cols = 1500
+        line = "#" + " " * (cols - 2) + "#\n"
+        path = write_level(self.directory, "10\n" + "#" * cols + "\n"
+                           + "#P" + " " * (cols - 3) + "#\n"
+                           + line * (rows - 3) + "#" * cols + "\n")
+        tracemalloc.start()
+        try:
+            model = load_chunked_level(path)
+            model.handle_action("d")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(model.get_dimensions(), (rows, cols))
+        self.assertEqual(model.get_tiles().loaded_chunks(), 1)
+        # The file is 2.25 MB; what is kept is a few numbers per line and
+        # the loaded chunks
+        self.assertLess(peak, os.path.getsize(path) // 4)
+
+
+class EvictionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Chunks of 2x2: (0, 0) holds a PoisonDart at (1, 1), (0, 1) a
+        # PoisonSword at (1, 2), and (0, 2) a HealingRock at (1, 5)
+        path = write_level(directory.name, "10\n######\n#DS  H\n")
+        self.source = LevelChunkSource(path, chunk_size=2)
+        self.clock = Clock()
+        patcher = mock.patch("chunks.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def chunked(self, max_loaded: int = 8,
+                max_idle: float = 10.0) -> ChunkedTiles:
+        return ChunkedTiles((self.source.rows, self.source.cols),
+                            self.source.load_chunk, self.source.save_chunk,
+                            2, max_loaded, max_idle)
+
+    def test_least_recently_used_is_evicted_when_full(self) -> None:
+        tiles = self.chunked(max_loaded=2)
+        tiles.get_tile((1, 1)).remove_weapon()
+        tiles.get_tile((1, 2))
+        tiles.get_tile((0, 0))  # (0, 0) is used again, (0, 1) is not
+        tiles.get_tile((1, 5))
+        self.assertEqual(list(tiles._chunks), [(0, 0), (0, 2)])
+        tiles.get_tile((1, 2)).remove_weapon()
+        self.assertEqual(list(tiles._chunks), [(0, 2), (0, 1)])
+        # Evicted chunks were written back and are loaded as they were left
+        self.assertIsNone(tiles.get_tile((1, 1)).get_weapon())
+        self.assertEqual(list(tiles._chunks), [(0, 1), (0, 0)])
+        tiles.get_tile((1, 5))
+        self.assertIsNone(tiles.get_tile((1, 2)).get_weapon())
+        self.assertEqual(tiles.get_tile((1, 5)).get_weapon().get_symbol(),
+                         "H")
+
+    def test_idle_chunks_are_evicted(self) -> None:
+        tiles = self.chunked()
+        tiles.get_tile((1, 1)).remove_weapon()
+        self.clock.now = 5.0
+        tiles.get_tile((1, 2))  # (0, 0) was last accessed until now
+        self.clock.now = 14.0
+        tiles.get_tile((1, 5))
+        self.assertEqual(list(tiles._chunks), [(0, 0), (0, 1), (0, 2)])
+        self.clock.now = 16.0
+        tiles.get_tile((1, 3))
+        # (0, 0) was idle since 5 seconds, (0, 1) since 14
+        self.assertEqual(list(tiles._chunks), [(0, 2), (0, 1)])
+        self.assertIsNone(tiles.get_tile((1, 1)).get_weapon())
+
+    def test_chunk_in_use_is_not_idle(self) -> None:
+        tiles = self.chunked()
+        tiles.get_tile((1, 2))
+        self.clock.now = 30.0
+        # Lookups in the same chunk do not stamp it; evict_idle does
+        tiles.get_tile((0, 3))
+        tiles.evict_idle()
+        self.assertEqual(list(tiles._chunks), [(0, 1)])
+        self.clock.now = 45.0
+        tiles.evict_idle(40.5)
+        self.assertEqual(tiles.loaded_chunks(), 0)
+        self.assertEqual(tiles.get_tile((1, 2)).get_weapon().get_symbol(),
+                         "S")
+
+    def test_no_idle_limit(self) -> None:
+        tiles = self.chunked(max_idle=None)
+        tiles.get_tile((1, 1))
+        self.clock.now = 1e9
+        tiles.get_tile((1, 5))
+        tiles.evict_idle()
+        self.assertEqual(tiles.loaded_chunks(), 2)
+
+    def test_games_survive_eviction(self) -> None:
+        for path in LEVELS:
+            for max_idle in (None, 0.0):
+                with self.subTest(path=path, max_idle=max_idle):
+                    # Every switch to another chunk evicts the others
+                    model = load_chunked_level(path, 2, max_loaded=1,
+                                               max_idle=max_idle)
+                    expected = parse_level(read_level(path))
+                    self.assertEqual(
+                        play_random(model, random.Random(3), 150),
+                        play_random(expected, random.Random(3), 150))
+
+
+if __name__ == "__main__":
+    unittest.main()
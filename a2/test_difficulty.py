@@ -0,0 +1,101 @@
+"""
+Tests of the difficulty report (difficulty.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import json
+import random
+import unittest
+
+from core import parse_level
+from difficulty import (_run_batch, estimate, mean_interval, play_rollout,
+                        summarize, wilson_interval)
+from savestate import encode_state
+
+
+# The player is walled in between a ScaredSlug (a PoisonDart: 2 poison) and
+# an AngrySlug (a PoisonSword: 2 damage and 1 poison), with a NiceSlug
+# healing from two cells away; nobody can move, so every turn is an attack
+CORNERED_LEVEL = ["100\n", "######\n", "#NLPA#\n", "######\n"]
+# The goal is one step away and there are no slugs, so every rollout wins
+GOAL_LEVEL = ["10\n", "####\n", "#PG#\n", "####\n"]
+
+
+def rollout(won: bool, turns: int, health: int) -> dict:
+    return {"won": won, "turns": turns, "health": health,
+            "damage": {"A(1, 6)": 3}}
+
+
+class ReportTestCase(unittest.TestCase):
+    def test_mean_interval(self) -> None:
+        self.assertIsNone(mean_interval([]))
+        self.assertEqual(mean_interval([4.0]),
+                         {"mean": 4.0, "low": None, "high": None})
+        interval = mean_interval([2.0, 4.0, 6.0])
+        self.assertEqual(interval["mean"], 4.0)
+        self.assertLess(interval["low"], 4.0)
+        self.assertGreater(interval["high"], 4.0)
+
+    def test_wilson_interval(self) -> None:
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        low, high = wilson_interval(5, 10)
+        self.assertLess(low, 0.5)
+        self.assertGreater(high, 0.5)
+
+    def test_report_is_strict_json(self) -> None:
+        for results in ([rollout(True, 12, 5)],
+                        [rollout(True, 12, 5), rollout(False, 30, 0)],
+                        [rollout(False, 30, 0)]):
+            with self.subTest(rollouts=len(results)):
+                # allow_nan=False rejects Infinity and NaN
+                json.dumps(summarize(results), allow_nan=False)
+
+
+class AttributionTestCase(unittest.TestCase):
+    def test_damage_and_poison_are_attributed_to_each_slug(self) -> None:
+        report = play_rollout(parse_level(CORNERED_LEVEL), random.Random(0),
+                              epsilon=0, max_turns=4)
+        self.assertEqual(report["turns"], 4)
+        # Healing is not damage, so the NiceSlug is not reported
+        self.assertEqual(report["damage"], {"L@1,2": 4 * 2, "A@1,4": 4 * 3})
+
+    def test_slugs_out_of_range_are_not_attributed(self) -> None:
+        # The AngrySlug cannot reach the player through the wall
+        report = play_rollout(
+            parse_level(["100\n", "#######\n", "#NLP#A#\n", "#######\n"]),
+            random.Random(0), epsilon=0, max_turns=3)
+        self.assertEqual(report["damage"], {"L@1,2": 3 * 2})
+
+    def test_clones_keep_the_labels_of_the_original(self) -> None:
+        state = encode_state(parse_level(CORNERED_LEVEL))
+        results = _run_batch(state, [0, 1], 0, 2)
+        self.assertEqual([result["damage"] for result in results],
+                         [{"L@1,2": 2 * 2, "A@1,4": 2 * 3}] * 2)
+
+
+class EarlyStopTestCase(unittest.TestCase):
+    def test_stops_once_the_interval_is_narrow_enough(self) -> None:
+        # With every rollout won, the half-width of the Wilson interval of
+        # n rollouts is z^2 / (2 (n + z^2)), which is 0.02 from n = 93 on;
+        # one worker plays rounds of 32 rollouts
+        report = estimate(parse_level(GOAL_LEVEL), jobs=1, tolerance=0.02,
+                          min_rollouts=32)
+        self.assertEqual(report["rollouts"], 96)
+        self.assertTrue(report["converged"])
+        self.assertEqual(report["win_rate"]["mean"], 1.0)
+
+    def test_plays_at_least_min_rollouts(self) -> None:
+        report = estimate(parse_level(GOAL_LEVEL), jobs=1, tolerance=0.5,
+                          min_rollouts=64)
+        self.assertEqual(report["rollouts"], 64)
+        self.assertTrue(report["converged"])
+
+    def test_gives_up_at_max_rollouts(self) -> None:
+        report = estimate(parse_level(GOAL_LEVEL), jobs=1, tolerance=0.001,
+                          min_rollouts=32, max_rollouts=64)
+        self.assertEqual(report["rollouts"], 64)
+        self.assertFalse(report["converged"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Tests of the reinforcement-learning environments (env.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+from array import array
+
+import core
+from core import (ACTIONS, AngrySlug, PoisonDart, parse_level, read_level,
+                  register_slug, register_tile, register_weapon)
+from env import SlugDungeonEnv, VectorSlugDungeonEnv, cell_codes
+from testutils import LEVELS, keep_registries, state
+
+
+def play_env(env: SlugDungeonEnv, seed: int, steps: int) -> list:
+    rng = random.Random(seed)
+    trace = []
+    for _ in range(steps):
+        observation, reward, done, _ = env.step(
+            rng.randrange(len(ACTIONS)))
+        trace.append((bytes(observation), reward, done, state(env.model)))
+        if done:
+            break
+    return trace
+
+
+class Harpoon(PoisonDart):
+    def __init__(self) -> None:
+        super().__init__()
+        self._name = "Harpoon"
+        self._symbol = "X"
+
+
+class CrabSlug(AngrySlug):
+    def get_symbol(self) -> str:
+        return "C"
+
+
+# A level with a registered blocking tile "~", mud "m" that does not block,
+# a Harpoon "X" and a CrabSlug "C"
+REGISTERED_LEVEL = """\
+20
+########
+#P m X #
+# ~~   #
+#  C  G#
+########
+""".splitlines(keepends=True)
+
+
+def expected_observation(model, codes: dict[str, int]) -> bytes:
+    """The observation of `model` cell by cell, from the symbols shown"""
+    cells = []
+    for row, tile_row in enumerate(model.get_tiles()):
+        for col, tile in enumerate(tile_row):
+            if (row, col) == model.get_player_position():
+                symbol = model.get_player().get_symbol()
+            elif (row, col) in model.get_slugs():
+                symbol = model.get_slugs()[(row, col)].get_symbol()
+            elif tile.get_weapon() is not None:
+                symbol = tile.get_weapon().get_symbol()
+            else:
+                symbol = tile.get_symbol()
+            cells.append(codes[symbol])
+    return bytes(cells)
+
+
+class CellCodeTestCase(unittest.TestCase):
+    def register(self) -> None:
+        """Register the types of REGISTERED_LEVEL until the test ends"""
+        keep_registries(self, core.TILE_TYPES, core.TILE_COLOURS,
+                        core.WEAPON_TYPES, core.SLUG_TYPES, core.SLUG_LABELS)
+        register_tile("~", True, "blue")
+        register_tile("m", False, "brown")
+        register_weapon(Harpoon)
+        register_slug(CrabSlug, "Crab\nSlug")
+
+    def test_builtin_codes(self) -> None:
+        self.assertEqual(cell_codes(), {" ": 0, "#": 1, "G": 2, "D": 3,
+                                        "S": 4, "H": 5, "P": 6, "A": 7,
+                                        "N": 8, "L": 9})
+
+    def test_codes_are_distinct(self) -> None:
+        self.register()
+        codes = cell_codes()
+        self.assertEqual(len(set(codes.values())), len(codes))
+        for symbol in "~mXC":
+            self.assertIn(symbol, codes)
+
+    def test_observations_use_the_symbols_shown(self) -> None:
+        for path in LEVELS:
+            for seed in range(3):
+                with self.subTest(path=path, seed=seed):
+                    env = SlugDungeonEnv(path)
+                    codes = cell_codes()
+                    self.assertEqual(bytes(env.reset()),
+                                     expected_observation(env.model, codes))
+                    rng = random.Random(seed)
+                    for _ in range(80):
+                        observation, _, done, _ = env.step(
+                            rng.randrange(len(ACTIONS)))
+                        if done:
+                            break
+                        self.assertEqual(
+                            bytes(observation),
+                            expected_observation(env.model, codes))
+
+    def test_registered_types_have_their_own_codes(self) -> None:
+        self.register()
+        codes = cell_codes()
+        env = SlugDungeonEnv(REGISTERED_LEVEL)
+        observation = bytes(env.reset())
+        self.assertEqual(observation, expected_observation(env.model, codes))
+        cols = env.get_dimensions()[1]
+        self.assertEqual(observation[2 * cols + 2], codes["~"])
+        self.assertEqual(observation[1 * cols + 3], codes["m"])
+        self.assertEqual(observation[1 * cols + 5], codes["X"])
+        self.assertEqual(observation[3 * cols + 3], codes["C"])
+        self.assertEqual(observation[3 * cols + 6], codes["G"])
+        # Walk onto the mud and on to pick up the Harpoon
+        right = ACTIONS.index("d")
+        for _ in range(4):
+            observation, _, _, _ = env.step(right)
+            self.assertEqual(bytes(observation),
+                             expected_observation(env.model, codes))
+        self.assertIsInstance(env.model.get_player().get_weapon(), Harpoon)
+
+    def test_vector_env_pads_with_the_wall_code(self) -> None:
+        self.register()
+        codes = cell_codes()
+        env = VectorSlugDungeonEnv([LEVELS[1], REGISTERED_LEVEL])
+        observations = bytes(env.reset())
+        cells = env.rows * env.cols
+        rows, cols = env.models[1].get_dimensions()
+        padded = observations[cells:]
+        for row in range(env.rows):
+            for col in range(env.cols):
+                if row >= rows or col >= cols:
+                    self.assertEqual(padded[row * env.cols + col],
+                                     codes["#"])
+        self.assertEqual(
+            bytes(padded[row * env.cols + col] for row in range(rows)
+                  for col in range(cols)),
+            expected_observation(env.models[1], codes))
+
+
+class EnvResetTestCase(unittest.TestCase):
+    def test_reset_matches_a_fresh_parse(self) -> None:
+        for path in LEVELS:
+            with self.subTest(path=path):
+                env = SlugDungeonEnv(path)
+                first = bytes(env.reset())
+                self.assertEqual(state(env.model),
+                                 state(parse_level(read_level(path))))
+                for seed in range(3):
+                    played = play_env(env, seed, 80)
+                    self.assertEqual(bytes(env.reset()), first)
+                    self.assertEqual(play_env(SlugDungeonEnv(path), seed, 80),
+                                     played)
+                    env.reset()
+
+    def test_template_is_never_played(self) -> None:
+        env = SlugDungeonEnv(LEVELS[1])
+        start = state(env._template)
+        play_env(env, 0, 80)
+        self.assertEqual(state(env._template), start)
+        self.assertIsNot(env.reset(), None)
+        self.assertIsNot(env.model, env._template)
+
+    def test_vector_games_are_independent(self) -> None:
+        levels = [LEVELS[0], LEVELS[1], LEVELS[0]]
+        env = VectorSlugDungeonEnv(levels, max_steps=7)
+        first = bytes(env.reset())
+        # Games of the same level share a template but not their state
+        self.assertIs(env._templates[0], env._templates[2])
+        self.assertIsNot(env.models[0], env.models[2])
+        start = [state(template) for template in env._templates]
+        rng = random.Random(1)
+        for _ in range(7):
+            env.step(array("B", (rng.randrange(len(ACTIONS))
+                                 for _ in levels)))
+        self.assertTrue(all(env.dones))
+        # Every game hit max_steps and was reset to its starting state
+        self.assertEqual(bytes(env.observations), first)
+        self.assertEqual([state(model) for model in env.models], start)
+        self.assertEqual([state(template) for template in env._templates],
+                         start)
+
+
+if __name__ == "__main__":
+    unittest.main()
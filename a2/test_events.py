@@ -0,0 +1,203 @@
+"""
+Tests of the events a model publishes to its subscribers (events.py,
+SlugDungeonModel.subscribe).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+from core import ACTIONS, ATTACK_KEY, parse_level, read_level
+from events import (Damaged, Died, Healed, Lost, Moved, Poisoned,
+                    WeaponDropped, WeaponPickedUp, Won)
+from testutils import LEVELS, random_level
+
+
+# The order the events of one turn come in: the player's move and pickup,
+# then the deaths of the poison sweep, slug moves, and the end of the game
+RANKS = {WeaponPickedUp: 1, Died: 2, WeaponDropped: 2, Won: 4, Lost: 4}
+
+
+def record(model) -> list[list]:
+    """Subscribe to `model`; the returned list collects the events of each
+    turn"""
+    turns = []
+    model.subscribe(lambda model, events: turns.append(list(events)))
+    return turns
+
+
+def structural(events: list) -> list:
+    """`events` without the health events"""
+    return [event for event in events
+            if not isinstance(event, (Damaged, Healed, Poisoned))]
+
+
+class ScriptedEventTestCase(unittest.TestCase):
+    def test_pickup_and_win(self) -> None:
+        model = parse_level(["10\n", "#####\n", "#PDG#\n", "#####\n"])
+        turns = record(model)
+        player = model.get_player()
+        dart = model.get_tile((1, 2)).get_weapon()
+        for action in "dd" + ATTACK_KEY * 2:
+            model.handle_action(action)
+        self.assertEqual(turns, [
+            [Moved(player, (1, 1), (1, 2)),
+             WeaponPickedUp(player, dart, (1, 2))],
+            [Moved(player, (1, 2), (1, 3)), Won()],
+            [], []])
+
+    def test_kill_and_drop(self) -> None:
+        # The ScaredSlug is walled in; one hit of the sword and its poison
+        # kill it
+        model = parse_level(["10\n", "######\n", "#PSL##\n", "######\n"])
+        turns = record(model)
+        player = model.get_player()
+        slug = model.get_slugs()[(1, 3)]
+        sword = model.get_tile((1, 2)).get_weapon()
+        dart = slug.get_weapon()
+        model.handle_action("d")
+        self.assertEqual(turns[0], [
+            Moved(player, (1, 1), (1, 2)),
+            WeaponPickedUp(player, sword, (1, 2)),
+            Damaged(slug, (1, 3), 2), Poisoned(slug, (1, 3), 1),
+            Damaged(slug, (1, 3), 1),
+            Died(slug, (1, 3)), WeaponDropped(dart, (1, 3))])
+        model.handle_action("d")
+        self.assertEqual(structural(turns[1]), [
+            Moved(player, (1, 2), (1, 3)),
+            WeaponPickedUp(player, dart, (1, 3))])
+
+    def test_slug_moves(self) -> None:
+        model = parse_level(["100\n", "#########\n", "#P     A#\n",
+                             "#########\n"])
+        turns = record(model)
+        slug = model.get_slugs()[(1, 7)]
+        positions = [(1, 7)]
+        for _ in range(6):
+            model.handle_action(ATTACK_KEY)
+            positions.append(next(iter(model.get_slugs())))
+        expected = [[Moved(slug, old, new)] if old != new else []
+                    for old, new in zip(positions, positions[1:])]
+        self.assertEqual([structural(events) for events in turns],
+                         expected)
+        self.assertEqual(positions[-1], (1, 4))
+
+    def test_loss_is_published_once(self) -> None:
+        model = parse_level(["1\n", "#####\n", "#PA##\n", "#####\n"])
+        turns = record(model)
+        for _ in range(3):
+            model.handle_action(ATTACK_KEY)
+        self.assertTrue(model.has_lost())
+        self.assertEqual([structural(events) for events in turns],
+                         [[Lost()], [], []])
+
+    def test_undone_win_is_published_again(self) -> None:
+        model = parse_level(["10\n", "####\n", "#PG#\n", "####\n"])
+        model.enable_undo()
+        turns = record(model)
+        model.handle_action("d")
+        model.undo()
+        model.handle_action("d")
+        self.assertEqual(turns, [[Moved(model.get_player(), (1, 1), (1, 2)),
+                                  Won()]] * 2)
+
+    def test_unsubscribed_models_build_no_events(self) -> None:
+        model = parse_level(read_level(LEVELS[0]))
+        self.assertIsNone(model._events)
+        turns = record(model)
+        model.handle_action(ATTACK_KEY)
+        model.unsubscribe(model._subscribers[0])
+        model.handle_action(ATTACK_KEY)
+        self.assertIsNone(model._events)
+        self.assertEqual(len(turns), 1)
+
+
+class EventFuzzTestCase(unittest.TestCase):
+    """Random games, checking every turn's events against how the state
+    changed"""
+    def check_turn(self, model, events: list, slugs: dict, player_position,
+                   weapons: dict, ended: bool) -> None:
+        player = model.get_player()
+        after = {id(slug): position
+                 for position, slug in model.get_slugs().items()}
+        events = structural(events)
+
+        ranks = [0 if isinstance(event, Moved) and event.entity is player
+                 else 3 if isinstance(event, Moved)
+                 else RANKS[type(event)] for event in events]
+        self.assertEqual(ranks, sorted(ranks))
+
+        new_position = model.get_player_position()
+        moves = [event for event in events if isinstance(event, Moved)]
+        expected = []
+        if new_position != player_position:
+            expected.append(Moved(player, player_position, new_position))
+        # Slugs that moved were re-inserted in _slugs in the order they
+        # moved in
+        for position, slug in model.get_slugs().items():
+            old = slugs.get(id(slug), (None, None, None))[1]
+            if old != position:
+                expected.append(Moved(slug, old, position))
+        self.assertEqual(moves, expected)
+
+        picked = weapons.get(new_position) \
+            if new_position != player_position else None
+        self.assertEqual(
+            [event for event in events
+             if isinstance(event, WeaponPickedUp)],
+            [WeaponPickedUp(player, picked, new_position)] if picked else [])
+
+        deaths = []
+        for key, (slug, position, weapon) in slugs.items():
+            if key not in after:
+                deaths.append(Died(slug, position))
+                if weapon is not None:
+                    deaths.append(WeaponDropped(weapon, position))
+        self.assertEqual([event for event in events
+                          if isinstance(event, (Died, WeaponDropped))],
+                         deaths)
+
+        over = model.has_won() or model.has_lost()
+        end = [Won()] if model.has_won() else [Lost()]
+        self.assertEqual([event for event in events
+                          if isinstance(event, (Won, Lost))],
+                         end if over and not ended else [])
+
+    def test_events_match_state_changes(self) -> None:
+        rng = random.Random(42)
+        levels = [read_level(path) for path in LEVELS] + \
+            [random_level(rng, rng.randint(4, 12), rng.randint(4, 12))
+             for _ in range(40)]
+        for number, lines in enumerate(levels):
+            for seed in range(2):
+                with self.subTest(level=number, seed=seed):
+                    model = parse_level(lines)
+                    turns = record(model)
+                    game = random.Random(seed)
+                    ended, turns_after_end = False, 0
+                    # Play a few turns past the end of the game, which must
+                    # repeat neither Won nor Lost
+                    for _ in range(150):
+                        if turns_after_end == 3:
+                            break
+                        slugs = {id(slug): (slug, position, slug.get_weapon())
+                                 for position, slug
+                                 in model.get_slugs().items()}
+                        player_position = model.get_player_position()
+                        weapons = {(row, col): tile.get_weapon()
+                                   for row, tile_row
+                                   in enumerate(model.get_tiles())
+                                   for col, tile in enumerate(tile_row)
+                                   if tile.get_weapon() is not None}
+                        count = len(turns)
+                        played = model.handle_action(game.choice(ACTIONS))
+                        self.assertEqual(len(turns), count + played)
+                        if not played:
+                            continue
+                        self.check_turn(model, turns[-1], slugs,
+                                        player_position, weapons, ended)
+                        turns_after_end += ended
+                        ended = model.has_won() or model.has_lost()
+
+if __name__ == "__main__":
+    unittest.main()
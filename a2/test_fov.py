@@ -0,0 +1,144 @@
+"""
+Tests of the fog-of-war field of view (fov.py) against a brute-force line
+of sight check.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+from fractions import Fraction
+
+from fov import FieldOfView
+
+
+# Far smaller than the distance between any two cell edges within the radii
+# used here, so lines this close to another one cross the same cells
+EPSILON = Fraction(1, 10 ** 6)
+
+
+def random_walls(rng: random.Random, rows: int, cols: int,
+                 density: float) -> list[list[bool]]:
+    return [[rng.random() < density for _ in range(cols)]
+            for _ in range(rows)]
+
+
+def blocker(walls: list[list[bool]]):
+    """is_blocking for FieldOfView.update: walls, and everything off the
+    map"""
+    def is_blocking(row: int, col: int) -> bool:
+        return not (0 <= row < len(walls) and 0 <= col < len(walls[0])) \
+            or walls[row][col]
+    return is_blocking
+
+
+def quadrants(origin: tuple[int, int]):
+    """Map (depth, offset) in each quadrant to a map position, like
+    fov._quadrants"""
+    row, col = origin
+    return [lambda depth, offset: (row - depth, col + offset),
+            lambda depth, offset: (row + depth, col + offset),
+            lambda depth, offset: (row + offset, col + depth),
+            lambda depth, offset: (row + offset, col - depth)]
+
+
+def in_sight(origin: tuple[int, int], target: tuple[int, int],
+             is_blocking, radius: int) -> bool:
+    """
+    Brute force: whether a floor `target` is in sight of `origin`. Within a
+    quadrant, a wall blocks the lines crossing its row strictly between its
+    two edges, and light is a beam: the line between the centres of the two
+    cells must have unblocked lines right next to it on one side at least.
+    A line grazing a wall on one side is in sight; a line squeezed between
+    walls on both sides is not.
+    """
+    if origin == target:
+        return True
+    for transform in quadrants(origin):
+        for depth in range(1, radius + 1):
+            for offset in range(-depth, depth + 1):
+                if transform(depth, offset) == target:
+                    break
+            else:
+                continue
+            break
+        else:
+            continue  # the target is not in this quadrant within the radius
+        if depth * depth + offset * offset > radius * radius:
+            return False
+        for side in (-EPSILON, EPSILON):
+            slope = Fraction(offset, depth) + side
+            if abs(slope) <= 1 and not any(
+                    is_blocking(*transform(step, round(slope * step)))
+                    for step in range(1, depth)):
+                return True
+    return False
+
+
+class FieldOfViewTestCase(unittest.TestCase):
+    def test_floor_visibility_matches_lines_of_sight(self) -> None:
+        rng = random.Random(31)
+        for case in range(60):
+            rows, cols = rng.randint(3, 16), rng.randint(3, 16)
+            walls = random_walls(rng, rows, cols, rng.choice((0.1, 0.25,
+                                                              0.4)))
+            is_blocking = blocker(walls)
+            radius = rng.randint(1, 10)
+            floor = [(row, col) for row in range(rows)
+                     for col in range(cols) if not walls[row][col]]
+            for origin in rng.sample(floor, min(4, len(floor))):
+                fov = FieldOfView(radius)
+                fov.update(origin, is_blocking)
+                with self.subTest(case=case, origin=origin, radius=radius):
+                    self.assertEqual(
+                        [cell for cell in floor if fov.is_visible(cell)],
+                        [cell for cell in floor
+                         if in_sight(origin, cell, is_blocking, radius)])
+
+    def test_visibility_is_symmetric(self) -> None:
+        rng = random.Random(310)
+        for case in range(30):
+            rows, cols = rng.randint(3, 12), rng.randint(3, 12)
+            walls = random_walls(rng, rows, cols, 0.3)
+            is_blocking = blocker(walls)
+            radius = rng.randint(2, 8)
+            floor = [(row, col) for row in range(rows)
+                     for col in range(cols) if not walls[row][col]]
+            visible = {}
+            for origin in floor:
+                fov = FieldOfView(radius)
+                fov.update(origin, is_blocking)
+                visible[origin] = {cell for cell in floor
+                                   if fov.is_visible(cell)}
+            with self.subTest(case=case):
+                for origin in floor:
+                    for cell in visible[origin]:
+                        self.assertIn(origin, visible[cell],
+                                      f"{cell} is seen from {origin}")
+
+    def test_walls_are_seen_but_hide_what_is_behind(self) -> None:
+        walls = [[False, False, True, False, False]]
+        fov = FieldOfView(8)
+        fov.update((0, 0), blocker(walls))
+        self.assertEqual([fov.is_visible((0, col)) for col in range(5)],
+                         [True, True, True, False, False])
+        self.assertFalse(fov.is_visible((0, 6)))  # off the map
+
+    def test_seen_cells_are_remembered(self) -> None:
+        walls = [[False] * 9, [True] * 4 + [False] + [True] * 4,
+                 [False] * 9]
+        is_blocking = blocker(walls)
+        fov = FieldOfView(4)
+        fov.update((0, 0), is_blocking)
+        first = {(row, col) for row in range(3) for col in range(9)
+                 if fov.is_visible((row, col))}
+        fov.update((2, 8), is_blocking)
+        self.assertFalse(fov.is_visible((0, 0)))
+        for cell in first:
+            self.assertTrue(fov.is_seen(cell))
+        copy = fov.copy()
+        fov.update((0, 0), is_blocking)
+        self.assertFalse(copy.is_visible((0, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
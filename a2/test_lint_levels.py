@@ -0,0 +1,146 @@
+"""
+Tests of the level linter (lint_levels.py): the problems it finds in known
+broken levels, and its reachability against a plain breadth-first search.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import os
+import random
+import tempfile
+import unittest
+from collections import deque
+
+from core import SLUG_TYPES, TILE_TYPES
+from lint_levels import lint_directory, lint_level
+from testutils import LEVELS, random_level, write_level
+
+
+def codes(report: dict, kind: str) -> list[str]:
+    return [problem["code"] for problem in report[kind]]
+
+
+def reachable(lines: list[str]) -> set[tuple[int, int]]:
+    """The cells a breadth-first search can walk to from the player"""
+    grid = [line.rstrip("\n") for line in lines[1:]]
+    start = next((row, line.index("P")) for row, line in enumerate(grid)
+                 if "P" in line)
+    seen, queue = {start}, deque([start])
+    while queue:
+        row, col = queue.popleft()
+        for d_row, d_col in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            position = (row + d_row, col + d_col)
+            if position not in seen and 0 <= position[0] < len(grid) \
+                    and 0 <= position[1] < len(grid[position[0]]) \
+                    and not TILE_TYPES.get(grid[position[0]][position[1]]):
+                seen.add(position)
+                queue.append(position)
+    return seen
+
+
+class LintLevelTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def lint(self, text: str) -> dict:
+        return lint_level(write_level(self.directory, text))
+
+    def test_bundled_levels_are_ok(self) -> None:
+        for path in LEVELS:
+            with self.subTest(path=path):
+                report = lint_level(path)
+                self.assertTrue(report["ok"], report)
+                self.assertEqual(report["errors"], [])
+
+    def test_walled_off_goal(self) -> None:
+        report = self.lint("10\n#######\n#P A#G#\n#######\n")
+        self.assertFalse(report["ok"])
+        self.assertEqual(codes(report, "errors"), ["goal-unreachable"])
+        self.assertEqual(report["reachable_slugs"], 1)
+
+    def test_goal_behind_a_slug_is_reachable(self) -> None:
+        # Slugs stand on floor and can be killed, so they do not block
+        report = self.lint("10\n######\n#PNLG#\n######\n")
+        self.assertTrue(report["ok"])
+        self.assertEqual((report["slugs"], report["reachable_slugs"]),
+                         (2, 2))
+
+    def test_one_of_many_goals_is_enough(self) -> None:
+        report = self.lint("10\n#######\n#P G#G#\n#######\n")
+        self.assertTrue(report["ok"])
+
+    def test_unreachable_slug_is_a_warning(self) -> None:
+        report = self.lint("10\n######\n#P G#A\n######\n")
+        self.assertTrue(report["ok"])
+        self.assertEqual(codes(report, "warnings"), ["slug-unreachable"])
+        self.assertIn("(1, 5)", report["warnings"][0]["message"])
+
+    def test_broken_levels(self) -> None:
+        cases = [("", ["empty"]),
+                 ("ten\n###\n#PG\n", ["bad-health"]),
+                 ("0\n####\n#PG#\n", ["bad-health"]),
+                 ("10\n#####\n#PG#\n####\n", ["ragged"]),
+                 ("10\n####\n# G#\n", ["no-player"]),
+                 ("10\n#####\n#PGP#\n", ["many-players"]),
+                 ("10\n", ["no-map", "no-player"])]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                report = self.lint(text)
+                self.assertFalse(report["ok"])
+                self.assertEqual(codes(report, "errors"), expected)
+
+    def test_warnings(self) -> None:
+        report = self.lint("10\n####\n#P?#\n####\n")
+        self.assertTrue(report["ok"])
+        self.assertEqual(codes(report, "warnings"),
+                         ["unknown-symbol", "no-goal"])
+
+    def test_unreadable_file(self) -> None:
+        report = lint_level(os.path.join(self.directory, "missing.txt"))
+        self.assertEqual(codes(report, "errors"), ["unreadable"])
+
+    def test_crlf_line_endings(self) -> None:
+        report = self.lint("10\r\n#####\r\n#P G#\r\n#####\r\n")
+        self.assertTrue(report["ok"], report)
+        self.assertEqual((report["rows"], report["cols"]), (3, 5))
+
+    def test_reachability_matches_search(self) -> None:
+        rng = random.Random(39)
+        for number in range(60):
+            lines = random_level(rng, rng.randint(4, 16), rng.randint(4, 16))
+            with self.subTest(level=number):
+                report = self.lint("".join(lines))
+                reach = reachable(lines)
+                cells = {(row, col): symbol
+                         for row, line in enumerate(lines[1:])
+                         for col, symbol in enumerate(line.rstrip("\n"))}
+                goal = next(cell for cell, symbol in cells.items()
+                            if symbol == "G")
+                slugs = [cell for cell, symbol in cells.items()
+                         if symbol in SLUG_TYPES]
+                self.assertEqual("goal-unreachable" in codes(report,
+                                                             "errors"),
+                                 goal not in reach)
+                self.assertEqual(report["reachable_slugs"],
+                                 sum(slug in reach for slug in slugs))
+
+
+class LintDirectoryTestCase(unittest.TestCase):
+    def test_reports_every_level(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "more"))
+            write_level(directory, "10\n####\n#PG#\n####\n", "good.txt")
+            write_level(directory, "10\n####\n#P #\n####\n", "notes.md")
+            write_level(os.path.join(directory, "more"),
+                        "10\n#####\n#P#G#\n#####\n", "bad.txt")
+            reports = sorted(lint_directory(directory, jobs=2),
+                             key=lambda report: report["file"])
+        self.assertEqual(
+            [(os.path.relpath(report["file"], directory), report["ok"])
+             for report in reports],
+            [("good.txt", True), (os.path.join("more", "bad.txt"), False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests of the game metrics (metrics.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import gc
+import threading
+import unittest
+from unittest import mock
+
+import core
+import metrics
+from core import ATTACK_KEY, load_level, parse_level
+from metrics import PREFIX, RATE_WINDOW, GameMetrics, MetricsRegistry
+from testutils import LEVELS
+
+
+def sample(text: str, name: str) -> float:
+    """The value of the sample `name` in rendered metrics"""
+    for line in text.splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    raise KeyError(name)
+
+
+class GameMetricsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metrics = GameMetrics(MetricsRegistry(labels={}))
+        core.set_metrics(self.metrics)
+        self.addCleanup(core.set_metrics, None)
+
+    def value(self, name: str) -> float:
+        return sample(self.metrics.render(), f"{PREFIX}_{name}")
+
+    def test_a_won_game_counts_once(self) -> None:
+        model = parse_level(["10\n", "#####\n", "#P G#\n", "#####\n"])
+        model.handle_action("d")
+        model.handle_action("d")
+        self.assertTrue(model.has_won())
+        for _ in range(3):
+            model.handle_action(ATTACK_KEY)  # still standing on the goal
+        self.assertEqual(self.value("turns_total"), 5)
+        self.assertEqual(self.value("wins_total"), 1)
+        self.assertEqual(self.value("losses_total"), 0)
+
+    def test_a_lost_game_counts_once(self) -> None:
+        model = load_level(LEVELS[2])
+        while not model.has_lost():
+            model.handle_action(ATTACK_KEY)
+        for _ in range(3):
+            model.handle_action(ATTACK_KEY)
+        self.assertEqual(self.value("losses_total"), 1)
+        self.assertEqual(self.value("wins_total"), 0)
+
+    def test_render_changes_nothing(self) -> None:
+        model = load_level(LEVELS[0])
+        model.handle_action(ATTACK_KEY)
+        self.assertEqual(self.metrics.render(), self.metrics.render())
+
+    def test_turns_per_second(self) -> None:
+        model = load_level(LEVELS[1])
+        clock = mock.patch.object(metrics.time, "monotonic")
+        monotonic = clock.start()
+        self.addCleanup(clock.stop)
+        # 3 turns a second for RATE_WINDOW seconds, then 50 in the current
+        # second, which is not over yet and does not count
+        for second in range(100, 100 + RATE_WINDOW):
+            monotonic.return_value = second + 0.5
+            for _ in range(3):
+                model.handle_action(ATTACK_KEY)
+        monotonic.return_value = 100 + RATE_WINDOW + 0.25
+        for _ in range(50):
+            model.handle_action(ATTACK_KEY)
+        self.assertEqual(self.value("turns_per_second"), 3.0)
+        monotonic.return_value = 100 + 3 * RATE_WINDOW
+        self.assertEqual(self.value("turns_per_second"), 0.0)
+        self.assertEqual(self.value("turns_total"), 3 * RATE_WINDOW + 50)
+
+    def test_slugs_alive_are_summed_over_games(self) -> None:
+        first, second = load_level(LEVELS[0]), load_level(LEVELS[1])
+        first.handle_action(ATTACK_KEY)
+        second.handle_action(ATTACK_KEY)
+        self.assertEqual(self.value("slugs_alive"),
+                         len(first.get_slugs()) + len(second.get_slugs()))
+        del second
+        gc.collect()
+        self.assertEqual(self.value("slugs_alive"), len(first.get_slugs()))
+
+    def test_recording_takes_no_lock(self) -> None:
+        model = load_level(LEVELS[2])  # slugs all around attack every turn
+        ready, go = threading.Event(), threading.Event()
+
+        def play() -> None:
+            model.handle_action(ATTACK_KEY)  # registers this thread's shard
+            ready.set()
+            go.wait()
+            for _ in range(3):
+                model.handle_action(ATTACK_KEY)
+            core.load_level(LEVELS[0])
+
+        player = threading.Thread(target=play, daemon=True)
+        player.start()
+        ready.wait()
+        with self.metrics._lock:  # as if a render were in progress
+            go.set()
+            player.join(timeout=10)
+            self.assertFalse(player.is_alive())
+        self.assertEqual(self.value("turns_total"), 4)
+        self.assertGreater(self.value("attack_hits_total"), 0)
+        self.assertEqual(self.value("load_level_seconds_count"), 2)
+
+    def test_renders_from_other_threads_are_consistent(self) -> None:
+        model = load_level(LEVELS[1])
+        model.enable_undo()
+        renders = []
+        done = threading.Event()
+
+        def scrape() -> None:
+            while not done.is_set():
+                renders.append(self.metrics.render())
+
+        scrapers = [threading.Thread(target=scrape) for _ in range(2)]
+        for scraper in scrapers:
+            scraper.start()
+        try:
+            for _ in range(2000):
+                model.handle_action(ATTACK_KEY)
+                model.undo()  # keep the game going
+        finally:
+            done.set()
+            for scraper in scrapers:
+                scraper.join()
+        self.assertTrue(renders)
+        for text in renders:
+            self.assertEqual(sample(text, f"{PREFIX}_turns_total"),
+                             sample(text, f"{PREFIX}_end_turn_seconds_count"))
+
+
+if __name__ == "__main__":
+    unittest.main()
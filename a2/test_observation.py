@@ -0,0 +1,97 @@
+"""
+Tests of the NumPy observation encoder (observation.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+import numpy as np
+
+from core import ACTIONS, ATTACK_KEY, load_level, parse_level, read_level
+from observation import (HEALTH_CHANNEL, PLAYER_CHANNEL, ObservationEncoder,
+                         make_buffer)
+from testutils import LEVELS, random_level
+
+
+def full_encoding(model) -> np.ndarray:
+    return ObservationEncoder().encode(model, make_buffer(model))
+
+
+class UpdateTestCase(unittest.TestCase):
+    def levels(self) -> list[list[str]]:
+        rng = random.Random(7)
+        return ([read_level(path) for path in LEVELS]
+                + [random_level(rng, rng.randint(4, 14), rng.randint(4, 14))
+                   for _ in range(40)])
+
+    def test_updates_every_few_turns_match_encode(self) -> None:
+        for number, lines in enumerate(self.levels()):
+            for seed in range(3):
+                with self.subTest(level=number, seed=seed):
+                    rng = random.Random(seed)
+                    model = parse_level(lines)
+                    encoder = ObservationEncoder()
+                    self.addCleanup(encoder.close)
+                    out = encoder.encode(model, make_buffer(model))
+                    for _ in range(40):
+                        if model.has_won() or model.has_lost():
+                            break
+                        # 1 to 3 turns between observations
+                        for _ in range(rng.randint(1, 3)):
+                            model.handle_action(rng.choice(ACTIONS))
+                        encoder.update(model, out)
+                        np.testing.assert_array_equal(out,
+                                                      full_encoding(model))
+
+    def test_update_only_rewrites_touched_cells(self) -> None:
+        model = load_level(LEVELS[0])
+        encoder = ObservationEncoder()
+        self.addCleanup(encoder.close)
+        out = encoder.encode(model, make_buffer(model))
+        out[PLAYER_CHANNEL, 0, 0] = 5.0  # a wall no turn can touch
+        model.handle_action(ATTACK_KEY)
+        encoder.update(model, out)
+        self.assertEqual(out[PLAYER_CHANNEL, 0, 0], 5.0)
+        out[PLAYER_CHANNEL, 0, 0] = 0.0
+        np.testing.assert_array_equal(out, full_encoding(model))
+
+    def test_encode_after_undo(self) -> None:
+        model = load_level(LEVELS[1])
+        model.enable_undo()
+        encoder = ObservationEncoder()
+        self.addCleanup(encoder.close)
+        out = encoder.encode(model, make_buffer(model))
+        for action in "ddss  ":
+            model.handle_action(action)
+        encoder.update(model, out)
+        while model.undo():
+            pass
+        encoder.encode(model, out)  # undo publishes no events
+        model.handle_action(ATTACK_KEY)
+        encoder.update(model, out)
+        np.testing.assert_array_equal(out, full_encoding(model))
+
+    def test_update_needs_the_encoded_model(self) -> None:
+        model = load_level(LEVELS[0])
+        encoder = ObservationEncoder()
+        self.addCleanup(encoder.close)
+        out = encoder.encode(model, make_buffer(model))
+        with self.assertRaises(ValueError):
+            encoder.update(load_level(LEVELS[0]), out)
+
+    def test_close_unsubscribes(self) -> None:
+        model = load_level(LEVELS[0])
+        encoder = ObservationEncoder()
+        out = encoder.encode(model, make_buffer(model))
+        other = load_level(LEVELS[1])
+        encoder.encode(other, make_buffer(other))  # moves to the new model
+        self.assertEqual(model._subscribers, [])
+        encoder.close()
+        self.assertEqual(other._subscribers, [])
+        self.assertEqual(out[HEALTH_CHANNEL].sum(),
+                         full_encoding(model)[HEALTH_CHANNEL].sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
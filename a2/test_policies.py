@@ -0,0 +1,93 @@
+"""
+Tests of the compiled slug policy tables (policies.py and their use by
+SlugDungeonModel).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+import core
+from chunks import load_chunked_level
+from core import (ATTACK_KEY, NEIGHBOUR_DELTAS, POLICY_SLUG_TYPES, AngrySlug,
+                  NiceSlug, ScaredSlug, get_policy_table, is_stationary,
+                  load_level)
+from policies import (STAY, TABLE_SIZE, PolicyMismatchError,
+                      canonical_offset, verify_policy)
+from testutils import LEVELS, keep_registries, play_random
+
+
+def sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+class PolicyTableTestCase(unittest.TestCase):
+    def test_canonical_offset_keeps_signs(self) -> None:
+        for dr in range(-30, 31):
+            for dc in range(-30, 31):
+                cr, cc = canonical_offset(dr, dc)
+                self.assertTrue(-2 <= cr <= 2 and -2 <= cc <= 2)
+                self.assertEqual(
+                    (sign(cr), sign(cc), sign(cr - cc), sign(cr + cc)),
+                    (sign(dr), sign(dc), sign(dr - dc), sign(dr + dc)))
+
+    def test_tables_match_choose_move(self) -> None:
+        for slug_type in POLICY_SLUG_TYPES:
+            with self.subTest(slug_type=slug_type.__name__):
+                table = get_policy_table(slug_type)
+                self.assertEqual(len(table), TABLE_SIZE)
+                verify_policy(slug_type, table, NEIGHBOUR_DELTAS, span=20)
+
+    def test_wrong_table_is_caught(self) -> None:
+        table = bytes((STAY,)) * TABLE_SIZE  # an AngrySlug that never moves
+        with self.assertRaises(PolicyMismatchError):
+            verify_policy(AngrySlug, table, NEIGHBOUR_DELTAS)
+
+    def test_only_table_types_have_tables(self) -> None:
+        class CustomSlug(AngrySlug):
+            pass
+
+        self.assertIsNone(get_policy_table(CustomSlug))
+        self.assertTrue(is_stationary(NiceSlug))
+        self.assertFalse(is_stationary(AngrySlug))
+        self.assertFalse(is_stationary(ScaredSlug))
+        self.assertFalse(is_stationary(CustomSlug))
+
+
+class PolicyMoveTestCase(unittest.TestCase):
+    def play(self, make, seed: int) -> list[tuple]:
+        return play_random(make(), random.Random(seed), 60)
+
+    def test_table_moves_match_choose_move_moves(self) -> None:
+        # Chunked maps have no cell tables, so every move goes through
+        # choose_move there
+        for path in LEVELS:
+            for seed in range(5):
+                with self.subTest(path=path, seed=seed):
+                    tables = self.play(lambda: load_level(path), seed)
+                    chunked = self.play(
+                        lambda: load_chunked_level(path, chunk_size=4), seed)
+                    self.assertEqual(tables, chunked)
+
+    def test_verify_policies_during_play(self) -> None:
+        for path in LEVELS:
+            for seed in range(5):
+                with self.subTest(path=path, seed=seed):
+                    def make():
+                        model = load_level(path)
+                        model.verify_policies = True
+                        return model
+                    self.play(make, seed)  # raises on a mismatch
+
+    def test_verify_policies_reports_a_wrong_table(self) -> None:
+        # AngrySlugs that run away like ScaredSlugs
+        keep_registries(self, core._policy_tables)
+        core._policy_tables[AngrySlug] = get_policy_table(ScaredSlug)
+        model = load_level(LEVELS[0])
+        model.verify_policies = True
+        with self.assertRaises(PolicyMismatchError):
+            model.handle_action(ATTACK_KEY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests of the headless renderer (raster.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+from core import ACTIONS, load_level
+from raster import Rasterizer
+from testutils import LEVELS
+
+
+def full_frame(model) -> bytes:
+    """The frame of `model` drawn from scratch"""
+    rasterizer = Rasterizer(model.get_dimensions(), cell_size=4)
+    rasterizer.render(model)
+    return bytes(rasterizer.pixels)
+
+
+class FollowTestCase(unittest.TestCase):
+    def check_play(self, path: str, seed: int, fog: bool,
+                   every: int) -> None:
+        rng = random.Random(seed)
+        model = load_level(path)
+        if fog:
+            model.set_fog_of_war(3)
+        rasterizer = Rasterizer(model.get_dimensions(), cell_size=4)
+        rasterizer.follow(model)
+        self.addCleanup(rasterizer.close)
+        rows, cols = model.get_dimensions()
+        self.assertEqual(rasterizer.render(model), rows * cols)
+        for turn in range(150):
+            if model.has_won() or model.has_lost():
+                break
+            model.handle_action(rng.choice(ACTIONS))
+            if turn % every == 0:
+                redrawn = rasterizer.render(model)
+                self.assertLess(redrawn, rows * cols)
+                self.assertEqual(bytes(rasterizer.pixels), full_frame(model))
+
+    def test_followed_frames_match_full_frames(self) -> None:
+        for path in LEVELS:
+            for fog in (False, True):
+                for every in (1, 3):
+                    for seed in range(4):
+                        with self.subTest(path=path, fog=fog, every=every,
+                                          seed=seed):
+                            self.check_play(path, seed, fog, every)
+
+    def test_invalidate_after_undo(self) -> None:
+        model = load_level(LEVELS[1])
+        model.set_fog_of_war(3)
+        model.enable_undo()
+        rasterizer = Rasterizer(model.get_dimensions(), cell_size=4)
+        rasterizer.follow(model)
+        self.addCleanup(rasterizer.close)
+        rng = random.Random(2)
+        rasterizer.render(model)
+        for _ in range(20):
+            model.handle_action(rng.choice(ACTIONS))
+            rasterizer.render(model)
+        while model.undo():
+            pass
+        rasterizer.invalidate()
+        rasterizer.render(model)
+        self.assertEqual(bytes(rasterizer.pixels), full_frame(model))
+
+    def test_other_models_are_drawn_in_full(self) -> None:
+        model = load_level(LEVELS[0])
+        rasterizer = Rasterizer(model.get_dimensions(), cell_size=4)
+        rasterizer.follow(model)
+        self.addCleanup(rasterizer.close)
+        rasterizer.render(model)
+        other = load_level(LEVELS[0])
+        other.set_fog_of_war(2)
+        rasterizer.render(other)
+        self.assertEqual(bytes(rasterizer.pixels), full_frame(other))
+
+    def test_close_unsubscribes(self) -> None:
+        model = load_level(LEVELS[0])
+        rasterizer = Rasterizer(model.get_dimensions())
+        rasterizer.follow(model)
+        rasterizer.close()
+        self.assertEqual(model._subscribers, [])
+        self.assertIsNone(model._events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests of save states and the autosave journal (savestate.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+from core import ACTIONS, Tile, Weapon, load_level, parse_level
+from savestate import (AutosaveJournal, SaveStateError, decode_state,
+                       encode_state, read_journal)
+from testutils import LEVELS, play_random, state
+
+
+class Trident(Weapon):
+    def __init__(self):
+        super().__init__()
+        self._name = "Trident"
+        self._symbol = "Ψ"  # two bytes in UTF-8
+
+
+class EncodeDecodeTestCase(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        for path in LEVELS:
+            for seed in range(5):
+                with self.subTest(path=path, seed=seed):
+                    rng = random.Random(seed)
+                    model = load_level(path)
+                    play_random(model, rng, rng.randrange(20))
+                    restored, level = decode_state(
+                        encode_state(model, "level.txt"))
+                    self.assertEqual(level, "level.txt")
+                    self.assertEqual(state(restored), state(model))
+                    # and the restored game goes on the same way
+                    actions = "".join(rng.choice(ACTIONS)
+                                      for _ in range(30))
+                    play_random(model, random.Random(actions), 30)
+                    play_random(restored, random.Random(actions), 30)
+                    self.assertEqual(state(restored), state(model))
+
+    def test_ragged_rows_round_trip(self) -> None:
+        model = parse_level(["10\n", "######\n", "#P #\n", "# A G#\n",
+                             "#####\n"])
+        restored, _ = decode_state(encode_state(model))
+        self.assertEqual(state(restored), state(model))
+
+    def test_row_longer_than_first_is_rejected(self) -> None:
+        model = parse_level(["10\n", "####\n", "#P A#\n", "#    G#\n",
+                             "######\n"])
+        with self.assertRaises(ValueError):
+            encode_state(model)
+
+    def test_multibyte_tile_symbol_is_rejected(self) -> None:
+        model = load_level(LEVELS[0])
+        model.get_tiles()[2][2] = Tile("é", False)
+        with self.assertRaises(ValueError):
+            encode_state(model)
+
+    def test_multibyte_weapon_symbol_is_rejected(self) -> None:
+        model = load_level(LEVELS[0])
+        model.get_tile((2, 2)).set_weapon(Trident())
+        with self.assertRaises(ValueError):
+            encode_state(model)
+
+    def test_corrupt_states_are_rejected(self) -> None:
+        data = encode_state(load_level(LEVELS[1]))
+        for broken in (data[:5], b"NOPE" + data[4:],
+                       data[:-1] + bytes((data[-1] ^ 1,))):
+            with self.assertRaises(SaveStateError):
+                decode_state(broken)
+
+
+class AutosaveJournalTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "autosave.sav")
+
+    def test_resume_replays_the_journal(self) -> None:
+        model = load_level(LEVELS[1])
+        journal = AutosaveJournal(self.filename, model, "level2.txt",
+                                  sync_every=4, checkpoint_every=10)
+        rng = random.Random(0)
+        for _ in range(25):
+            if model.has_won() or model.has_lost():
+                break
+            journal.play(rng.choice(ACTIONS))
+        journal.close()
+        self.assertLess(len(read_journal(self.filename + ".journal")), 10)
+
+        resumed = AutosaveJournal.resume(self.filename)
+        self.assertEqual(resumed.level, "level2.txt")
+        self.assertEqual(state(resumed.model), state(model))
+        resumed.discard()
+        self.assertFalse(os.path.exists(self.filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests of slug speeds and the timing wheel that schedules slug moves
+(Slug.move_every, SlugScheduler).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import unittest
+
+from constants import SLUG_SPEED_FAST, SLUG_SPEED_NORMAL, SLUG_SPEED_SLOW
+from core import (ATTACK_KEY, AngrySlug, Player, SlugDungeonModel,
+                  create_tile)
+from events import Moved
+
+
+class FastSlug(AngrySlug):
+    move_every = SLUG_SPEED_FAST
+
+
+class SlowSlug(AngrySlug):
+    move_every = SLUG_SPEED_SLOW
+
+
+class EveryThirdSlug(AngrySlug):
+    """Decides for itself when it moves, so the scheduler polls it"""
+    asked = 0
+
+    def can_move(self) -> bool:
+        EveryThirdSlug.asked += 1
+        return self.turn_count % 3 == 0
+
+
+def make_model(rows: list[str], slug_types: dict[str, type]
+               ) -> SlugDungeonModel:
+    """A model of `rows`, with "P" for the player and the keys of
+    `slug_types` for slugs"""
+    tiles, slugs, player_position = [], {}, None
+    for row, line in enumerate(rows):
+        tiles.append([create_tile("#" if symbol == "#" else " ")
+                      for symbol in line])
+        for col, symbol in enumerate(line):
+            if symbol == "P":
+                player_position = (row, col)
+            elif symbol in slug_types:
+                slugs[(row, col)] = slug_types[symbol]()
+    return SlugDungeonModel(tiles, slugs, Player(1000), player_position)
+
+
+def move_turns(model: SlugDungeonModel, turns: int) -> dict[type, list[int]]:
+    """Play `turns` attack turns; returns the turns on which slugs of each
+    type moved"""
+    moved: dict[type, list[int]] = {}
+    turn = 0
+
+    def record(model, events) -> None:
+        for event in events:
+            if isinstance(event, Moved) and event.entity is not \
+                    model.get_player():
+                moved.setdefault(type(event.entity), []).append(turn)
+
+    model.subscribe(record)
+    for turn in range(turns):
+        model.handle_action(ATTACK_KEY)
+    return moved
+
+
+# Each slug is alone in a long corridor, so it moves whenever it can
+CORRIDORS = [
+    "#P                              #",
+    "##################################",
+    "#                              F#",
+    "##################################",
+    "#                              A#",
+    "##################################",
+    "#                              L#",
+    "##################################",
+    "#                              E#",
+    "##################################",
+]
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def test_speeds(self) -> None:
+        model = make_model(CORRIDORS, {"F": FastSlug, "A": AngrySlug,
+                                       "L": SlowSlug, "E": EveryThirdSlug})
+        moved = move_turns(model, 20)
+        self.assertEqual(moved[FastSlug], list(range(20)))
+        self.assertEqual(moved[AngrySlug],
+                         list(range(0, 20, SLUG_SPEED_NORMAL)))
+        self.assertEqual(moved[SlowSlug],
+                         list(range(0, 20, SLUG_SPEED_SLOW)))
+        self.assertEqual(moved[EveryThirdSlug], list(range(0, 20, 3)))
+
+    def test_only_due_slugs_are_visited(self) -> None:
+        model = make_model(CORRIDORS, {"F": FastSlug, "A": AngrySlug,
+                                       "L": SlowSlug})
+        scheduler = model._scheduler
+        clock = model._store.clock
+        due = scheduler.pop_due(clock)
+        self.assertEqual(len(due), 3)  # every slug moves on turn 0
+        model._store.clock += 1  # as end_turn does
+        for slug in due:
+            scheduler.schedule(slug)
+        self.assertEqual([type(slug) for slug in
+                          scheduler.pop_due(clock + 1)], [FastSlug])
+
+    def test_dead_polled_slugs_are_dropped(self) -> None:
+        model = make_model(CORRIDORS, {"E": EveryThirdSlug})
+        (slug,) = model.get_slugs().values()
+        model.handle_action(ATTACK_KEY)
+        slug._current_health = 0
+        model.handle_action(ATTACK_KEY)  # swept on a turn it is not due
+        self.assertEqual(model.get_slugs(), {})
+        asked = EveryThirdSlug.asked
+        for _ in range(5):
+            model.handle_action(ATTACK_KEY)
+        self.assertEqual(EveryThirdSlug.asked, asked)
+        self.assertEqual(model._scheduler._polled, [])
+
+    def test_polled_slugs_are_asked_once_per_turn(self) -> None:
+        model = make_model(CORRIDORS, {"E": EveryThirdSlug})
+        scheduler, store = model._scheduler, model._store
+        asked = EveryThirdSlug.asked
+        for _ in range(6):
+            for slug in scheduler.pop_due(store.clock):
+                scheduler.schedule(slug)
+            store.clock += 1
+        self.assertEqual(EveryThirdSlug.asked - asked, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
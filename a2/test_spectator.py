@@ -0,0 +1,98 @@
+"""
+Loopback tests of the spectator feed (spectator.py): a SpectatorFeed and
+SpectatorClients talking over a local socket.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import unittest
+
+from core import ACTIONS, parse_level, read_level
+from spectator import SpectatorClient, SpectatorFeed
+from testutils import LEVELS, random_level
+
+
+def view(model) -> tuple:
+    """What a viewer sees of a model: everything but the order of _slugs,
+    which viewers do not follow"""
+    player = model.get_player()
+    return (model.get_player_position(), player.get_health(),
+            player.get_poison(), repr(player.get_weapon()),
+            sorted((position, type(slug).__name__, slug.get_health(),
+                    slug.get_poison(), slug.turn_count,
+                    repr(slug.get_weapon()))
+                   for position, slug in model.get_slugs().items()),
+            [[repr(tile.get_weapon()) for tile in row]
+             for row in model.get_tiles()],
+            model.has_won(), model.has_lost())
+
+
+class LoopbackTestCase(unittest.TestCase):
+    def start(self, model) -> SpectatorFeed:
+        feed = SpectatorFeed(model, port=0)
+        self.addCleanup(feed.close)
+        return feed
+
+    def join(self, feed: SpectatorFeed) -> SpectatorClient:
+        """Connect a viewer and read its keyframe"""
+        client = SpectatorClient(*feed.address)
+        self.addCleanup(client.close)
+        client._connection.settimeout(5)  # fail rather than hang
+        feed.pump()
+        self.assertTrue(client.receive())
+        return client
+
+    def test_keyframe_and_deltas(self) -> None:
+        rng = random.Random(48)
+        levels = [read_level(path) for path in LEVELS] + \
+            [random_level(rng, rng.randint(4, 12), rng.randint(4, 12))
+             for _ in range(10)]
+        for number, lines in enumerate(levels):
+            with self.subTest(level=number):
+                model = parse_level(lines)
+                feed = self.start(model)
+                client = self.join(feed)
+                self.assertEqual(view(client.model), view(model))
+                game = random.Random(number)
+                turn = 0
+                while turn < 100 and not (model.has_won()
+                                          or model.has_lost()):
+                    if not model.handle_action(game.choice(ACTIONS)):
+                        continue
+                    turn += 1
+                    self.assertTrue(client.receive())
+                    self.assertEqual(client.turn, turn)
+                    self.assertEqual(view(client.model), view(model))
+                    self.assertEqual((client.won, client.lost),
+                                     (model.has_won(), model.has_lost()))
+
+    def test_late_joiner_gets_a_keyframe(self) -> None:
+        model = parse_level(read_level(LEVELS[1]))
+        feed = self.start(model)
+        early = self.join(feed)
+        game = random.Random(1)
+        for _ in range(10):
+            if model.handle_action(game.choice(ACTIONS)):
+                self.assertTrue(early.receive())
+        late = self.join(feed)
+        self.assertEqual(late.turn, early.turn)
+        self.assertEqual(view(late.model), view(model))
+        for _ in range(10):
+            if model.handle_action(game.choice(ACTIONS)):
+                for client in (early, late):
+                    self.assertTrue(client.receive())
+                    self.assertEqual(view(client.model), view(model))
+
+    def test_dead_slugs_give_up_their_ids_without_viewers(self) -> None:
+        # The walled in ScaredSlug dies of the sword the player picks up
+        model = parse_level(["10\n", "######\n", "#PSL##\n", "######\n"])
+        feed = self.start(model)
+        feed._get_keyframe()  # as for a viewer that joined and left
+        self.assertEqual(len(feed._ids), 1)
+        model.handle_action("d")
+        self.assertEqual(model.get_slugs(), {})
+        self.assertEqual(feed._ids, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Tests that the headless core stays cheap to import (see bench_startup.py).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import subprocess
+import sys
+import unittest
+
+from testutils import HERE
+
+
+# Modules that `import core` must not load: the GUI, and standard library
+# packages that only some features need and that cost milliseconds each
+HEAVY_MODULES = ("tkinter", "concurrent.futures", "logging", "fov",
+                 "fractions", "decimal")
+
+
+def modules_loaded_by(statement: str) -> set[str]:
+    """The modules in sys.modules after running `statement` in a fresh
+    interpreter"""
+    probe = f"import sys\n{statement}\nprint('\\n'.join(sys.modules))"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=HERE,
+                            capture_output=True, text=True,
+                            check=True).stdout
+    return set(output.split())
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_core_imports_no_heavy_modules(self) -> None:
+        loaded = modules_loaded_by(
+            "import core\ncore.load_level('levels/level2.txt')")
+        for module in HEAVY_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
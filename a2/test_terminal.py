@@ -0,0 +1,167 @@
+"""
+Tests of the terminal frontend (terminal.py): the escape codes a Screen
+writes, replayed on a small model of a terminal, and what TerminalGame draws.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import re
+import tempfile
+import unittest
+
+from core import ATTACK_KEY
+from terminal import (FOG_CELL, PLAYER_STYLE, REWRITE_GAP, TABLE_LINES,
+                      Screen, TerminalGame)
+from testutils import LEVELS, write_level
+
+
+ESCAPE = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])|(.)", re.DOTALL)
+
+
+class Terminal:
+    """Just enough of an ANSI terminal to replay what Screen.render writes:
+    clearing, cursor moves, and SGR codes starting with a reset"""
+    def __init__(self, rows: int, cols: int) -> None:
+        self.rows, self.cols = rows, cols
+        self.cells = [[FOG_CELL] * cols for _ in range(rows)]
+        self.cursor = (0, 0)
+        self.style = ""
+
+    def write(self, data: str) -> None:
+        for match in ESCAPE.finditer(data):
+            parameters, command, char = match.groups()
+            if char is not None:
+                row, col = self.cursor
+                self.cells[row][col] = (char, self.style)
+                self.cursor = (row, col + 1)
+            elif command == "J":
+                self.cells = [[FOG_CELL] * self.cols
+                              for _ in range(self.rows)]
+            elif command == "H":
+                row, col = parameters.split(";")
+                self.cursor = (int(row) - 1, int(col) - 1)
+            elif command == "m":
+                reset, _, self.style = parameters.partition(";")
+                assert reset == "0", parameters
+
+
+def styles(rng: random.Random) -> str:
+    return rng.choice(("", "", "1", "33", "1;36"))
+
+
+class ScreenTestCase(unittest.TestCase):
+    def test_unchanged_frame_writes_nothing(self) -> None:
+        screen = Screen(3, 10)
+        screen.put(1, 2, "hello", "1")
+        first = screen.render()
+        self.assertTrue(first.startswith("\x1b[0m\x1b[2J"))
+        self.assertEqual(screen.render(), "")
+        screen.clear()
+        screen.put(1, 2, "hello", "1")
+        self.assertEqual(screen.render(), "")
+
+    def test_only_changed_cells_are_written(self) -> None:
+        screen = Screen(3, 10)
+        screen.put(0, 0, "abcdefghij")
+        screen.render()
+        screen.put(2, 4, "x")
+        # Each frame starts with a reset, as the style shown is unknown
+        self.assertEqual(screen.render(), "\x1b[3;5H\x1b[0mx")
+        screen.put(2, 4, "y", PLAYER_STYLE)
+        self.assertEqual(screen.render(),
+                         f"\x1b[3;5H\x1b[0;{PLAYER_STYLE}my\x1b[0m")
+
+    def test_short_gaps_are_rewritten(self) -> None:
+        screen = Screen(2, 20)
+        screen.put(0, 0, "." * 20)
+        screen.render()
+        screen.put(0, 1, "a")
+        screen.put(0, 2 + REWRITE_GAP, "b")  # as far as a rewrite goes
+        self.assertEqual(screen.render(),
+                         "\x1b[1;2H\x1b[0ma" + "." * REWRITE_GAP + "b")
+        screen.put(0, 1, "c")
+        screen.put(0, 3 + REWRITE_GAP, "d")
+        self.assertEqual(screen.render(),
+                         f"\x1b[1;2H\x1b[0mc\x1b[1;{4 + REWRITE_GAP}Hd")
+
+    def test_text_is_clipped(self) -> None:
+        screen = Screen(2, 4)
+        screen.put(1, 2, "long text")
+        screen.put(2, 0, "off the screen")
+        screen.put_cells(0, 3, [("a", ""), ("b", "")])
+        terminal = Terminal(2, 4)
+        terminal.write(screen.render())
+        self.assertEqual(["".join(char for char, _ in row)
+                          for row in terminal.cells], ["   a", "  lo"])
+
+    def test_resize_repaints(self) -> None:
+        screen = Screen(2, 4)
+        screen.put(0, 0, "ab")
+        screen.render()
+        screen.resize(3, 5)
+        screen.put(0, 0, "ab")
+        self.assertTrue(screen.render().startswith("\x1b[0m\x1b[2J"))
+
+    def test_terminal_follows_the_buffer(self) -> None:
+        rng = random.Random(47)
+        screen = Screen(8, 30)
+        terminal = Terminal(8, 30)
+        for frame in range(200):
+            if rng.random() < 0.3:
+                screen.clear()
+            for _ in range(rng.randint(0, 6)):
+                text = "".join(rng.choice("ab.# ")
+                               for _ in range(rng.randint(1, 12)))
+                screen.put(rng.randrange(8), rng.randrange(30), text,
+                           styles(rng))
+            terminal.write(screen.render())
+            with self.subTest(frame=frame):
+                self.assertEqual(terminal.cells, screen._cells)
+                self.assertEqual(terminal.style, "")  # left reset
+
+
+class TerminalGameTestCase(unittest.TestCase):
+    def test_frames_show_the_game(self) -> None:
+        game = TerminalGame(LEVELS[0], Screen(40, 80))
+        terminal = Terminal(40, 80)
+        game.draw()
+        first = game.screen.render()
+        terminal.write(first)
+        model = game.model
+        row, col = model.get_player_position()
+        self.assertEqual(terminal.cells[row][col], ("P", PLAYER_STYLE))
+        game.handle_key(ATTACK_KEY)
+        game.draw()
+        update = game.screen.render()
+        terminal.write(update)
+        self.assertEqual(terminal.cells, game.screen._cells)
+        self.assertLess(len(update), len(first) // 4)
+        game.draw()
+        self.assertEqual(game.screen.render(), "")
+
+    def test_viewport_follows_the_player(self) -> None:
+        # The screen is too small for the map: the player stays in view as
+        # they walk
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_level(directory, "10\n" + "#" * 60 + "\n"
+                               + "#P" + " " * 57 + "#\n"
+                               + ("#" + " " * 58 + "#\n") * 28
+                               + "#" * 60 + "\n")
+            game = TerminalGame(path, Screen(TABLE_LINES + 10, 16))
+        rng = random.Random(470)
+        origins = set()
+        for _ in range(300):
+            game.handle_key(rng.choice("wassdd"))
+            game.draw()
+            game.screen.render()
+            top, left = game._origin
+            origins.add(game._origin)
+            row, col = game.model.get_player_position()
+            self.assertTrue(0 <= row - top < 10 and 0 <= col - left < 16)
+            self.assertEqual(game.screen._cells[row - top][col - left],
+                             ("P", PLAYER_STYLE))
+        self.assertGreater(len(origins), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Seeded fuzz tests of SlugDungeonModel.end_turn against the original turn
+rules (testutils.ReferenceModel): poison, the death sweep, moves in _slugs
+order with re-insertion, then attacks in _slugs order.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import tempfile
+import unittest
+
+import core
+from chunks import load_chunked_level
+from core import parse_level, read_level
+from metrics import GameMetrics, MetricsRegistry
+from testutils import (LEVELS, ReferenceModel, play_random, random_level,
+                       state, write_level)
+
+
+def make_plain(lines: list[str], directory: str):
+    return parse_level(lines)
+
+
+def make_chunked(lines: list[str], directory: str):
+    return load_chunked_level(write_level(directory, "".join(lines)),
+                              chunk_size=4)
+
+
+def make_subscribed(lines: list[str], directory: str):
+    # Building events takes other code paths through end_turn
+    model = parse_level(lines)
+    model.subscribe(lambda model, events: None)
+    return model
+
+
+def make_undoable(lines: list[str], directory: str):
+    model = parse_level(lines)
+    model.enable_undo()
+    return model
+
+
+MAKERS = {"plain": make_plain, "chunked": make_chunked,
+          "subscribed": make_subscribed, "undoable": make_undoable}
+
+
+class EndTurnFuzzTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def levels(self, count: int) -> list[list[str]]:
+        """The bundled levels, then `count` random ones"""
+        rng = random.Random(2024)
+        return ([read_level(path) for path in LEVELS]
+                + [random_level(rng, rng.randint(4, 14), rng.randint(4, 14))
+                   for _ in range(count)])
+
+    def check(self, make, games_per_level: int = 2) -> None:
+        for number, lines in enumerate(self.levels(40)):
+            for seed in range(games_per_level):
+                with self.subTest(level=number, seed=seed):
+                    expected = play_random(ReferenceModel(lines),
+                                           random.Random(seed), 120)
+                    actual = play_random(make(lines, self.directory),
+                                         random.Random(seed), 120)
+                    self.assertEqual(actual, expected)
+
+    def test_traces_match_the_original_rules(self) -> None:
+        for name, make in MAKERS.items():
+            with self.subTest(model=name):
+                self.check(make)
+
+    def test_traces_match_with_metrics(self) -> None:
+        core.set_metrics(GameMetrics(MetricsRegistry(labels={})))
+        self.addCleanup(core.set_metrics, None)
+        self.check(make_plain, games_per_level=1)
+
+    def test_starting_states_match(self) -> None:
+        for lines in self.levels(10):
+            self.assertEqual(state(parse_level(lines)),
+                             state(ReferenceModel(lines)))
+
+
+if __name__ == "__main__":
+    unittest.main()
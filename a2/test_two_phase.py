@@ -0,0 +1,165 @@
+"""
+Tests of two-phase slug moves (SlugDungeonModel.set_two_phase_moves) and of
+copying models, whose slugs share one SlugStore.
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import copy
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from chunks import load_chunked_level
+from core import (ATTACK_KEY, AngrySlug, Player, SlugDungeonModel,
+                  create_tile, load_level)
+from testutils import LEVELS, play, random_actions, write_level
+
+
+# Two AngrySlugs both want (2, 2), the cell nearest to the player
+CONFLICT_LEVEL = """\
+10
+#######
+# A  G#
+#A    #
+#  P  #
+#######
+"""
+CROWDED_LEVEL = """\
+200
+##############
+#A  L   A   G#
+#  ##  A  L  #
+# A  N   #   #
+#L   A  ##  A#
+#   #   L    #
+#A    P    A #
+#  L  ##  L  #
+# A  A    A  #
+##############
+"""
+
+
+class PacedSlug(AngrySlug):
+    """An AngrySlug whose speed is a constructor argument"""
+    def __init__(self, move_every: int) -> None:
+        super().__init__()
+        self.move_every = move_every
+
+
+class TwoPhaseTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+
+    def write_level(self, text: str) -> str:
+        return write_level(self._directory.name, text)
+
+    def test_sequential_moves_see_earlier_moves(self) -> None:
+        model = load_level(self.write_level(CONFLICT_LEVEL))
+        model.handle_action(ATTACK_KEY)
+        # The second slug goes around the first one
+        self.assertEqual(sorted(model.get_slugs()), [(2, 2), (3, 1)])
+
+    def test_two_phase_conflict_loser_stays(self) -> None:
+        model = load_level(self.write_level(CONFLICT_LEVEL))
+        model.set_two_phase_moves(True)
+        model.handle_action(ATTACK_KEY)
+        # Both chose (2, 2); the first in _slugs order gets it
+        self.assertEqual(sorted(model.get_slugs()), [(2, 1), (2, 2)])
+
+    def test_two_phase_without_conflicts_matches_sequential(self) -> None:
+        # A lone slug has nobody to compete with
+        path = self.write_level(CONFLICT_LEVEL.replace("#A    #",
+                                                       "#     #"))
+        sequential = load_level(path)
+        two_phase = load_level(path)
+        two_phase.set_two_phase_moves(True)
+        actions = random_actions(0)
+        self.assertEqual(play(two_phase, actions),
+                         play(sequential, actions))
+
+    def test_executors_decide_like_inline(self) -> None:
+        # Chunked maps have no policy tables, so every slug that can move is
+        # decided on the executor
+        paths = LEVELS + [self.write_level(CROWDED_LEVEL)]
+        with ThreadPoolExecutor(2) as threads, \
+                ProcessPoolExecutor(2) as processes:
+            for path in paths:
+                for seed in range(3):
+                    actions = random_actions(seed)
+                    inline = load_chunked_level(path, chunk_size=4)
+                    inline.set_two_phase_moves(True)
+                    expected = play(inline, actions)
+                    for executor in (threads, processes):
+                        with self.subTest(path=path, seed=seed,
+                                          executor=type(executor).__name__):
+                            model = load_chunked_level(path, chunk_size=4)
+                            model.set_two_phase_moves(True, executor)
+                            self.assertEqual(play(model, actions), expected)
+
+    def test_decisions_leave_slugs_in_the_model_store(self) -> None:
+        model = load_chunked_level(self.write_level(CROWDED_LEVEL),
+                                   chunk_size=4)
+        with ThreadPoolExecutor(2) as threads:
+            model.set_two_phase_moves(True, threads)
+            play(model, random_actions(1, 10))
+        store = model._store
+        for position, slug in model.get_slugs().items():
+            self.assertIs(slug._store, store)
+            self.assertEqual(store.positions[slug._index], position)
+
+
+class CopyTestCase(unittest.TestCase):
+    def assert_copy_plays_like(self, make_copy) -> None:
+        for path in LEVELS:
+            for two_phase in (False, True):
+                for seed in range(3):
+                    with self.subTest(path=path, two_phase=two_phase,
+                                      seed=seed):
+                        model = load_level(path)
+                        model.set_two_phase_moves(two_phase)
+                        actions = random_actions(seed)
+                        # Copy mid-game, so the store clock is not 0
+                        play(model, actions[:5])
+                        copied = make_copy(model)
+                        self.assertEqual(play(copied, actions[5:]),
+                                         play(model, actions[5:]))
+
+    def test_deepcopy_plays_like_original(self) -> None:
+        self.assert_copy_plays_like(copy.deepcopy)
+
+    def test_pickle_plays_like_original(self) -> None:
+        self.assert_copy_plays_like(
+            lambda model: pickle.loads(pickle.dumps(model)))
+
+    def test_copied_slugs_share_the_copied_store(self) -> None:
+        model = copy.deepcopy(load_level(LEVELS[1]))
+        for position, slug in model.get_slugs().items():
+            self.assertIs(slug._store, model._store)
+            self.assertEqual(model._store.positions[slug._index], position)
+
+    def test_clone_plays_like_original(self) -> None:
+        self.assert_copy_plays_like(lambda model: model.clone())
+
+    def test_clone_keeps_slug_constructor_arguments(self) -> None:
+        tiles = [[create_tile("#" if symbol == "#" else " ")
+                  for symbol in line]
+                 for line in ("#######", "#     #", "#     #", "#######")]
+        slugs = {(1, 1): PacedSlug(3), (2, 5): PacedSlug(2)}
+        model = SlugDungeonModel(tiles, slugs, Player(100), (1, 4))
+        model.handle_action(ATTACK_KEY)
+        clone = model.clone()
+        self.assertEqual([slug.move_every
+                          for slug in clone.get_slugs().values()],
+                         [slug.move_every
+                          for slug in model.get_slugs().values()])
+        for position, slug in clone.get_slugs().items():
+            self.assertIs(slug._store, clone._store)
+            self.assertIsNot(slug, model.get_slugs()[position])
+        actions = random_actions(0, 20)
+        self.assertEqual(play(clone, actions), play(model, actions))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Tests of undo and redo (SlugDungeonModel.enable_undo).
+
+Run from this directory with `python -m unittest` or `python -m pytest`.
+"""
+import random
+import tempfile
+import unittest
+
+from chunks import load_chunked_level
+from core import ACTIONS, ATTACK_KEY, load_level
+from testutils import LEVELS, play_random, state, write_level
+
+
+# Weapons to pick up next to the player and slugs to kill with them
+ARMOURY_LEVEL = """\
+60
+############
+#A  L  N  G#
+#   ##   A #
+# L  DSH   #
+#A  HPD  L #
+#   S  A   #
+# N    ##  #
+#A   L    A#
+############
+"""
+
+
+def snapshot(model) -> tuple:
+    """Everything undo and redo must restore: the state, and the occupancy
+    table of maps that have one"""
+    return state(model) + (None if model._occupied is None
+                           else bytes(model._occupied),)
+
+
+def play(model, rng: random.Random, turns: int) -> list[tuple]:
+    """Play random turns; returns the snapshot before and after each one"""
+    return [snapshot(model)] + play_random(model, rng, turns, snapshot)
+
+
+class UndoTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.armoury = write_level(directory.name, ARMOURY_LEVEL,
+                                   "armoury.txt")
+
+    def makers(self) -> list:
+        """Ways to build a model of each level"""
+        paths = LEVELS + [self.armoury]
+        return ([lambda path=path: load_level(path) for path in paths]
+                + [lambda path=path: load_chunked_level(path, chunk_size=4)
+                   for path in paths])
+
+    def test_undo_all_then_redo_all(self) -> None:
+        for number, make in enumerate(self.makers()):
+            for seed in range(5):
+                with self.subTest(level=number, seed=seed):
+                    model = make()
+                    model.enable_undo()
+                    snapshots = play(model, random.Random(seed), 80)
+                    for expected in reversed(snapshots[:-1]):
+                        self.assertTrue(model.undo())
+                        self.assertEqual(snapshot(model), expected)
+                    self.assertFalse(model.undo())
+                    for expected in snapshots[1:]:
+                        self.assertTrue(model.redo())
+                        self.assertEqual(snapshot(model), expected)
+                    self.assertFalse(model.redo())
+
+    def test_play_after_undo_matches_fresh_game(self) -> None:
+        for number, make in enumerate(self.makers()):
+            for seed in range(5):
+                with self.subTest(level=number, seed=seed):
+                    rng = random.Random(seed)
+                    model = make()
+                    model.enable_undo()
+                    actions = [rng.choice(ACTIONS) for _ in range(40)]
+                    played = [action for action in actions
+                              if not model.has_won() and not model.has_lost()
+                              and model.handle_action(action)]
+                    undone = rng.randrange(len(played) + 1)
+                    for _ in range(undone):
+                        model.undo()
+                    fresh = make()
+                    for action in played[:len(played) - undone]:
+                        fresh.handle_action(action)
+                    for action in [rng.choice(ACTIONS) for _ in range(30)]:
+                        if fresh.has_won() or fresh.has_lost():
+                            break
+                        model.handle_action(action)
+                        fresh.handle_action(action)
+                        self.assertEqual(snapshot(model), snapshot(fresh))
+                    self.assertFalse(model.can_redo())
+
+    def test_limit(self) -> None:
+        model = load_level(self.armoury)
+        model.enable_undo(limit=3)
+        for _ in range(5):
+            model.handle_action(ATTACK_KEY)
+        undone = 0
+        while model.undo():
+            undone += 1
+        self.assertEqual(undone, 3)
+
+    def test_ignored_actions_are_not_recorded(self) -> None:
+        model = load_level(LEVELS[0])
+        model.enable_undo()
+        self.assertFalse(model.handle_action("a"))  # into the wall
+        self.assertFalse(model.can_undo())
+
+    def test_deltas_only_list_what_changed(self) -> None:
+        model = load_level(self.armoury)
+        model.enable_undo()
+        slugs = len(model.get_slugs())
+        model.handle_action(ATTACK_KEY)  # every slug is due on turn 0
+        model.handle_action(ATTACK_KEY)  # and none on turn 1
+        first, second = model._undo
+        self.assertEqual(len(first.moves), slugs)
+        self.assertEqual(second.clock, (1, 2))
+        self.assertEqual((second.moves, second.deaths, second.weapons),
+                         ([], [], []))
+        # The player holds no weapon yet, so no slug was hurt
+        self.assertEqual(second.stats, [])
+
+    def test_deaths_and_weapons_are_recorded(self) -> None:
+        deaths = weapons = 0
+        for seed in range(20):
+            model = load_level(self.armoury)
+            model.enable_undo()
+            play(model, random.Random(seed), 80)
+            deaths += sum(len(delta.deaths) for delta in model._undo)
+            weapons += sum(len(delta.weapons) for delta in model._undo)
+        # Otherwise the other tests would not cover them
+        self.assertGreater(deaths, 0)
+        self.assertGreater(weapons, 0)
+
+    def test_two_phase_undo(self) -> None:
+        model = load_level(self.armoury)
+        model.set_two_phase_moves(True)
+        model.enable_undo()
+        snapshots = play(model, random.Random(0), 60)
+        while model.undo():
+            pass
+        self.assertEqual(snapshot(model), snapshots[0])
+        while model.redo():
+            pass
+        self.assertEqual(snapshot(model), snapshots[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,239 @@
+"""
+Helpers shared by the test_*.py modules: the bundled levels, snapshots of
+game state, random play, type registries restored after a test, and a plain
+model of the original turn rules to check SlugDungeonModel against.
+"""
+import os
+import random
+import unittest
+from typing import Callable, Optional
+
+from constants import FLOOR_TILE, PLAYER_SYMBOL
+from core import (ACTION_DELTAS, ACTIONS, ATTACK_KEY, SLUG_TYPES, Player,
+                  Slug, Tile, create_tile)
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LEVEL_NAMES = ("level1.txt", "level2.txt", "surround.txt")
+LEVELS = [os.path.join(HERE, "levels", name) for name in LEVEL_NAMES]
+
+
+def write_level(directory: str, text: str, name: str = "level.txt") -> str:
+    """Write the text of a level file into `directory`; returns its path"""
+    path = os.path.join(directory, name)
+    with open(path, "w") as file:
+        file.write(text)
+    return path
+
+
+def random_level(rng: random.Random, rows: int, cols: int) -> list[str]:
+    """The lines of a random walled level with a player, a goal, and some
+    slugs and weapons; inner walls may seal parts of it off"""
+    cells = [["#" if row in (0, rows - 1) or col in (0, cols - 1)
+              or rng.random() < 0.15 else " " for col in range(cols)]
+             for row in range(rows)]
+    free = [(row, col) for row in range(rows) for col in range(cols)
+            if cells[row][col] == " "]
+    rng.shuffle(free)
+    for symbol in "PG":
+        row, col = free.pop()
+        cells[row][col] = symbol
+    for _ in range(rng.randint(0, min(12, len(free)))):
+        row, col = free.pop()
+        cells[row][col] = rng.choice("AANLLNDSH")
+    return ([f"{rng.randint(5, 40)}\n"]
+            + ["".join(row) + "\n" for row in cells])
+
+
+def random_actions(seed: int, count: int = 60) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(ACTIONS) for _ in range(count))
+
+
+def state(model, tiles: bool = True) -> tuple:
+    """Everything about a model that turns can change, _slugs order
+    included; with `tiles`, the terrain and the weapons lying on it too"""
+    player = model.get_player()
+    snapshot = (model.get_player_position(), model._prev_player_position,
+                player._max_health, player.get_health(), player.get_poison(),
+                repr(player.get_weapon()),
+                [(position, type(slug).__name__, slug._max_health,
+                  slug.get_health(), slug.get_poison(), slug.turn_count,
+                  repr(slug.get_weapon()))
+                 for position, slug in model.get_slugs().items()],
+                model.has_won(), model.has_lost())
+    if tiles:
+        snapshot += ([[(tile.get_symbol(), tile.is_blocking(),
+                        repr(tile.get_weapon())) for tile in row]
+                      for row in model.get_tiles()],)
+    return snapshot
+
+
+def play(model, actions, snapshot: Callable = state) -> list[tuple]:
+    """Play `actions` until the game is over; returns the snapshot after
+    each turn played"""
+    snapshots = []
+    for action in actions:
+        if model.has_won() or model.has_lost():
+            break
+        if model.handle_action(action):
+            snapshots.append(snapshot(model))
+    return snapshots
+
+
+def play_random(model, rng: random.Random, turns: int,
+                snapshot: Callable = state) -> list[tuple]:
+    """Play up to `turns` random actions; returns the snapshot after each
+    turn played"""
+    return play(model, (rng.choice(ACTIONS) for _ in range(turns)), snapshot)
+
+
+def keep_registries(test: unittest.TestCase, *registries: dict) -> None:
+    """Restore `registries` (e.g. core.TILE_TYPES) to their current contents
+    when `test` ends, whatever it registers meanwhile"""
+    saved = [dict(registry) for registry in registries]
+
+    def restore() -> None:
+        for registry, contents in zip(registries, saved):
+            registry.clear()
+            registry.update(contents)
+
+    test.addCleanup(restore)
+
+
+class ReferenceModel:
+    """
+    The turn rules of the original game, written out as plainly as they
+    were before any optimisation: the player's poison, then every slug's
+    poison and the death sweep, then every slug that can move chooses among
+    its valid positions in _slugs order and is re-inserted at the end of
+    _slugs, and finally every slug attacks in _slugs order.
+
+    Tiles, weapons and entities are the core classes, so registered types
+    behave the same in both; only the model is separate.
+    """
+    def __init__(self, lines: list[str]) -> None:
+        self._tiles: list[list[Tile]] = []
+        self._slugs: dict[tuple[int, int], Slug] = {}
+        self._player = Player(int(lines[0].strip()))
+        self._player_position: Optional[tuple[int, int]] = None
+        for row, line in enumerate(lines[1:]):
+            tile_row = []
+            for col, symbol in enumerate(line.strip("\n")):
+                if symbol in SLUG_TYPES:
+                    self._slugs[(row, col)] = SLUG_TYPES[symbol]()
+                    symbol = FLOOR_TILE
+                elif symbol == PLAYER_SYMBOL:
+                    self._player_position = (row, col)
+                    symbol = FLOOR_TILE
+                tile_row.append(create_tile(symbol))
+            self._tiles.append(tile_row)
+        self._prev_player_position = self._player_position
+
+    def get_tiles(self) -> list[list[Tile]]:
+        return self._tiles
+
+    def get_slugs(self) -> dict[tuple[int, int], Slug]:
+        return self._slugs
+
+    def get_player(self) -> Player:
+        return self._player
+
+    def get_player_position(self) -> tuple[int, int]:
+        return self._player_position
+
+    def get_tile(self, position: tuple[int, int]) -> Tile:
+        return self._tiles[position[0]][position[1]]
+
+    def get_dimensions(self) -> tuple[int, int]:
+        return len(self._tiles), len(self._tiles[0]) if self._tiles else 0
+
+    def get_valid_slug_positions(self, position: tuple[int, int]
+                                 ) -> list[tuple[int, int]]:
+        row, col = position
+        max_row, max_col = self.get_dimensions()
+        valid = []
+        for candidate in ((row, col), (row - 1, col), (row + 1, col),
+                          (row, col - 1), (row, col + 1)):
+            if 0 <= candidate[0] < max_row and 0 <= candidate[1] < max_col \
+                    and not self.get_tile(candidate).is_blocking() \
+                    and (candidate not in self._slugs
+                         or candidate == position) \
+                    and candidate != self._player_position:
+                valid.append(candidate)
+        return valid or [position]
+
+    def perform_attack(self, entity, position: tuple[int, int]) -> None:
+        weapon = entity.get_weapon()
+        if not weapon:
+            return
+        effect = entity.get_weapon_effect()
+        for target in weapon.get_targets(position):
+            if isinstance(entity, Player) and target in self._slugs:
+                self._slugs[target].apply_effects(effect)
+            elif isinstance(entity, Slug) and \
+                    target == self._player_position:
+                self._player.apply_effects(effect)
+
+    def end_turn(self) -> None:
+        self._player.apply_poison()
+
+        dead = []
+        for position, slug in self._slugs.copy().items():
+            slug.apply_poison()
+            if not slug.is_alive():
+                if slug.get_weapon():
+                    self.get_tile(position).set_weapon(slug.get_weapon())
+                dead.append(position)
+        for position in dead:
+            del self._slugs[position]
+
+        for position, slug in self._slugs.copy().items():
+            if slug.can_move():
+                new_position = slug.choose_move(
+                    self.get_valid_slug_positions(position), position,
+                    self._prev_player_position)
+                del self._slugs[position]
+                self._slugs[new_position] = slug
+            slug.end_turn()
+
+        for position, slug in self._slugs.items():
+            self.perform_attack(slug, position)
+
+        self._prev_player_position = self._player_position
+
+    def is_valid_position(self, position: tuple[int, int]) -> bool:
+        row, col = position
+        max_row, max_col = self.get_dimensions()
+        return (0 <= row < max_row and 0 <= col < max_col
+                and not self.get_tile(position).is_blocking()
+                and position not in self._slugs)
+
+    def handle_action(self, key: str) -> bool:
+        if key == ATTACK_KEY:
+            self.perform_attack(self._player, self._player_position)
+            self.end_turn()
+            return True
+        delta = ACTION_DELTAS.get(key)
+        if delta is None:
+            return False
+        position = (self._player_position[0] + delta[0],
+                    self._player_position[1] + delta[1])
+        if not self.is_valid_position(position):
+            return False
+        self._player_position = position
+        tile = self.get_tile(position)
+        weapon = tile.get_weapon()
+        if weapon:
+            self._player.equip(weapon)
+            tile.remove_weapon()
+        self.perform_attack(self._player, position)
+        self.end_turn()
+        return True
+
+    def has_won(self) -> bool:
+        return not self._slugs and \
+            str(self.get_tile(self._player_position)) == "G"
+
+    def has_lost(self) -> bool:
+        return not self._player.is_alive()